@@ -0,0 +1,47 @@
+"""add request coalescing
+
+Revision ID: 2d7c5a9e4b16
+Revises: 9b4e1f7a2c58
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2d7c5a9e4b16"
+down_revision: Union[str, Sequence[str], None] = "9b4e1f7a2c58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_api_requests",
+        sa.Column(
+            "coalesce_enabled",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+            comment="是否合并并发的相同请求(仅 GET/HEAD/OPTIONS)",
+        ),
+    )
+    op.add_column(
+        "exile_api_request_runs",
+        sa.Column(
+            "coalesced",
+            sa.Boolean(),
+            nullable=False,
+            server_default=sa.false(),
+            comment="是否复用了其它执行中相同请求的结果(未单独发送)",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_api_request_runs", "coalesced")
+    op.drop_column("exile_api_requests", "coalesce_enabled")
@@ -0,0 +1,35 @@
+"""add environment max concurrency
+
+Revision ID: 3c6d9b2e7f15
+Revises: 8e3f1a6c2b70
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3c6d9b2e7f15"
+down_revision: Union[str, Sequence[str], None] = "8e3f1a6c2b70"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_api_environments",
+        sa.Column(
+            "max_concurrency",
+            sa.Integer(),
+            nullable=True,
+            comment="每个目标主机最大并发请求数(执行器自适应并发上限的硬上限), 为空不限制",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_api_environments", "max_concurrency")
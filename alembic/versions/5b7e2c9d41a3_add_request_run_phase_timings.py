@@ -0,0 +1,35 @@
+"""add request run phase timings
+
+Revision ID: 5b7e2c9d41a3
+Revises: d0e5e02f03c1
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b7e2c9d41a3"
+down_revision: Union[str, Sequence[str], None] = "d0e5e02f03c1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_api_request_runs",
+        sa.Column(
+            "phase_timings",
+            sa.JSON(),
+            nullable=True,
+            comment="请求阶段耗时(毫秒):setup/connect/tls/send/ttfb/download/total",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_api_request_runs", "phase_timings")
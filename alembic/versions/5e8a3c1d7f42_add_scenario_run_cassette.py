@@ -0,0 +1,35 @@
+"""add scenario run cassette
+
+Revision ID: 5e8a3c1d7f42
+Revises: 2d7c5a9e4b16
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8a3c1d7f42"
+down_revision: Union[str, Sequence[str], None] = "2d7c5a9e4b16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_test_scenario_runs",
+        sa.Column("cassette_name", sa.String(length=128), nullable=True, comment="录制文件名称"),
+    )
+    op.add_column(
+        "exile_test_scenario_runs",
+        sa.Column("cassette_mode", sa.String(length=16), nullable=True, comment="录制回放模式:record/replay, 为空正常发送"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_test_scenario_runs", "cassette_mode")
+    op.drop_column("exile_test_scenario_runs", "cassette_name")
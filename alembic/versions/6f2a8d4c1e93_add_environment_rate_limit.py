@@ -0,0 +1,35 @@
+"""add environment rate limit
+
+Revision ID: 6f2a8d4c1e93
+Revises: 3c6d9b2e7f15
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6f2a8d4c1e93"
+down_revision: Union[str, Sequence[str], None] = "3c6d9b2e7f15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_api_environments",
+        sa.Column(
+            "rate_limit_rps",
+            sa.Float(),
+            nullable=True,
+            comment="每个目标主机每秒请求数上限(所有 worker 共享), 为空不限制",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_api_environments", "rate_limit_rps")
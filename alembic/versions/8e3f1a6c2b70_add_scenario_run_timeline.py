@@ -0,0 +1,35 @@
+"""add scenario run timeline
+
+Revision ID: 8e3f1a6c2b70
+Revises: 5b7e2c9d41a3
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f1a6c2b70"
+down_revision: Union[str, Sequence[str], None] = "5b7e2c9d41a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_test_scenario_runs",
+        sa.Column(
+            "timeline",
+            sa.JSON(),
+            nullable=True,
+            comment="执行瀑布图(各步骤/请求/断言/提取/落库的相对偏移与耗时)",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_test_scenario_runs", "timeline")
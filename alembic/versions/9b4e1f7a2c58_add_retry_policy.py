@@ -0,0 +1,50 @@
+"""add retry policy
+
+Revision ID: 9b4e1f7a2c58
+Revises: 6f2a8d4c1e93
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4e1f7a2c58"
+down_revision: Union[str, Sequence[str], None] = "6f2a8d4c1e93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "exile_api_requests",
+        sa.Column(
+            "retry_policy",
+            sa.JSON(),
+            nullable=True,
+            comment="重试策略:max_attempts/retry_status_codes/retry_exceptions/backoff_ms/deadline_ms/hedge 等",
+        ),
+    )
+    op.add_column(
+        "exile_test_scenario_cases",
+        sa.Column("retry_policy", sa.JSON(), nullable=True, comment="重试策略覆盖(按字段覆盖测试用例的重试策略)"),
+    )
+    op.add_column(
+        "exile_api_request_runs",
+        sa.Column(
+            "attempts",
+            sa.JSON(),
+            nullable=True,
+            comment="重试/对冲的每次尝试:[{n, status, ms, error, hedged, winner, backoff_ms}]",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("exile_api_request_runs", "attempts")
+    op.drop_column("exile_test_scenario_cases", "retry_policy")
+    op.drop_column("exile_api_requests", "retry_policy")
@@ -12,12 +12,12 @@ from pydantic import BaseModel, Field, EmailStr
 from sqlalchemy import and_, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_cache import invalidate_admin
 from app.core.exceptions import CustomException
 from app.core.pagination import CommonPaginateQuery
-from app.core.password import hash_password
+from app.core.password import hash_password_async
 from app.core.response import api_response
-from app.core.security import check_admin_existence
-from app.db.redis_client import delete_value
+from app.core.security import Token, build_token_key_prefix, check_admin_existence
 from app.db.session import get_db_session
 from app.models.admin import Admin
 from app.schemas.common import CommonPydanticCreate, CommonPydanticUpdate
@@ -140,7 +140,7 @@ async def create_admin(
     request_data.creator = admin.username
     save_data = request_data.dict()
     save_data["phone"] = str(request_data.phone)
-    save_data["password"] = hash_password(request_data.password)
+    save_data["password"] = await hash_password_async(request_data.password)
     db.add(Admin(**save_data))
     await db.commit()
     return api_response(http_code=status.HTTP_201_CREATED, code=201)
@@ -199,6 +199,7 @@ async def update_admin(
         setattr(query_admin, k, v)
     query_admin.touch()
     await db.commit()
+    await invalidate_admin(query_admin.id)
     return api_response(http_code=status.HTTP_201_CREATED, code=201)
 
 
@@ -227,6 +228,7 @@ async def delete_admin(
     query_admin.status = request_data.status
     query_admin.touch()
     await db.commit()
+    await invalidate_admin(query_admin.id)
     return api_response()
 
 
@@ -272,5 +274,7 @@ async def reset_password(
     await query_admin.set_password(request_data.new_password)
     query_admin.touch()
     await db.commit()
-    await delete_value(token)
+    # 吊销被重置用户的全部 token(而不是操作者自己的 token)
+    await Token.revoke_user_tokens(build_token_key_prefix(query_admin.id, query_admin.username))
+    await invalidate_admin(query_admin.id)
     return api_response(message="重置成功")
@@ -14,8 +14,13 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.response import api_response
-from app.core.security import Token
-from app.db.redis_client import delete_value
+from app.core.security import (
+    Token,
+    build_token_key_prefix,
+    check_login_throttle,
+    record_login_failure,
+    reset_login_failures,
+)
 from app.db.session import get_db_session
 from app.models.admin import Admin
 
@@ -43,12 +48,19 @@ async def admin_login(request_data: AdminLogin, db: AsyncSession = Depends(get_d
     if admin.status == 99:
         return api_response(code=10002, message=f"用户 {admin.username} 已禁用")
 
+    await check_login_throttle(username)
     verify_result = await admin.verify_password(password)
     if not verify_result:
+        await record_login_failure(username)
         return api_response(code=10005, message="密码错误")
     else:
+        await reset_login_failures(username)
+        if admin.password_needs_rehash():  # 成本因子调高后, 登录成功时使用明文重新加密
+            await admin.set_password(password)
+            admin.touch()
+            await db.commit()
 
-        admin_key_prefix = f"tk_{admin.id}_{admin.username}_"
+        admin_key_prefix = build_token_key_prefix(admin.id, admin.username)
         user_info_str = json.dumps(jsonable_encoder(admin.to_dict()))
 
         new_auth = Token()
@@ -67,5 +79,5 @@ async def admin_login(request_data: AdminLogin, db: AsyncSession = Depends(get_d
 async def admin_logout(token: str = Header()):
     """admin退出"""
 
-    await delete_value(token)
+    await Token.revoke(token)
     return api_response(message=f"操作成功:{token}")
@@ -3,15 +3,19 @@
 # @Author  : yangyuexiong
 # @File    : api_request.py
 
+from typing import Any
+
 from fastapi import APIRouter, Depends, status
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_config
 from app.core.exceptions import CustomException
 from app.core.pagination import CommonPaginateQuery
 from app.core.response import api_response
 from app.core.security import check_admin_existence
+from app.db.redis_client import get_redis_pool
 from app.db.session import get_db_session
 from app.models.admin import Admin
 from app.models.api_request import (
@@ -25,6 +29,14 @@ from app.models.api_request import (
 )
 from app.services.assertion_evaluator import evaluate_assert_rules
 from app.services.api_request_executor import execute_api_request
+from app.services.distributed_load import (
+    collect_load_report,
+    get_load_meta,
+    request_abort,
+    start_distributed_load,
+)
+from app.services.load_runner import build_load_limits, build_load_snapshots
+from app.tasks.load_tasks import dispatch_load_coordinator_task, dispatch_load_shard_task
 from app.services.variable_extractor import ExtractRequiredError, apply_extract_rules
 from app.schemas.api_request import (
     ApiAssertRuleCreateReqData,
@@ -43,11 +55,15 @@ from app.schemas.api_request import (
     ApiRequestDatasetSetEnabledReqData,
     ApiRequestDatasetUpdateReqData,
     ApiRequestDeleteReqData,
+    ApiRequestDistributedLoadRunReqData,
+    ApiRequestLoadRunReqData,
     ApiRequestPageReqData,
     ApiRequestRunReqData,
     ApiRequestUpdateReqData,
 )
 
+project_config = get_config()
+
 router = APIRouter()
 
 
@@ -130,6 +146,54 @@ async def _resolve_dataset_for_run(
     return dataset_obj
 
 
+async def _resolve_datasets_for_load(
+    db: AsyncSession,
+    request_obj: ApiRequest,
+    dataset_ids: list[int] | None,
+) -> list[ApiRequestDataset]:
+    if dataset_ids is None:
+        stmt = (
+            select(ApiRequestDataset)
+            .where(
+                and_(
+                    ApiRequestDataset.request_id == request_obj.id,
+                    ApiRequestDataset.is_deleted == 0,
+                    ApiRequestDataset.is_enabled.is_(True),
+                )
+            )
+            .order_by(ApiRequestDataset.sort, ApiRequestDataset.id)
+        )
+        return list((await db.execute(stmt)).scalars().all())
+
+    dataset_list = []
+    for dataset_id in dataset_ids:
+        dataset_obj = await _resolve_dataset_for_run(db, request_obj, dataset_id)
+        dataset_list.append(dataset_obj)
+    return dataset_list
+
+
+async def _load_targets(db: AsyncSession, request_data: ApiRequestLoadRunReqData):
+    request_obj = await _get_api_request_or_404(db, request_data.request_id)
+    dataset_list = await _resolve_datasets_for_load(db, request_obj, request_data.dataset_ids)
+    env_id = request_data.env_id if request_data.env_id is not None else request_obj.env_id
+    env_obj = None
+    if env_id is not None:
+        env_obj = await _get_environment_or_404(db, env_id)
+    return request_obj, dataset_list, env_obj
+
+
+def _validate_load_profile(request_data: ApiRequestLoadRunReqData, shards: int = 1):
+    total_duration = sum(stage.duration for stage in request_data.stages)
+    if total_duration > project_config.LOAD_TEST_MAX_DURATION:
+        raise CustomException(detail=f"压测总时长不能超过 {project_config.LOAD_TEST_MAX_DURATION} 秒", custom_code=10005)
+    peak_rps = max([request_data.start_rps, *(stage.target_rps for stage in request_data.stages)])
+    max_rps = project_config.LOAD_TEST_MAX_RPS * shards
+    if peak_rps > max_rps:
+        raise CustomException(detail=f"目标 RPS 不能超过 {max_rps}", custom_code=10005)
+    if request_data.max_in_flight > project_config.LOAD_TEST_MAX_IN_FLIGHT:
+        raise CustomException(detail=f"最大并发不能超过 {project_config.LOAD_TEST_MAX_IN_FLIGHT}", custom_code=10005)
+
+
 async def _list_extract_rules(db: AsyncSession, request_id: int, dataset_id: int | None) -> list[ApiExtractRule]:
     stmt = (
         select(ApiExtractRule)
@@ -300,8 +364,11 @@ async def run_api_request(
         response_headers=exec_result["response_headers"],
         response_body=exec_result["response_body"],
         response_time_ms=exec_result["response_time_ms"],
+        phase_timings=exec_result.get("phase_timings"),
         is_success=exec_result["is_success"],
         error_message=exec_result["error_message"],
+        coalesced=exec_result.get("coalesced", False),
+        attempts=exec_result.get("attempts"),
     )
     db.add(run_obj)
     await db.flush()
@@ -367,7 +434,10 @@ async def run_api_request(
             "is_success": run_obj.is_success,
             "response_status_code": run_obj.response_status_code,
             "response_time_ms": run_obj.response_time_ms,
+            "phase_timings": run_obj.phase_timings,
             "error_message": run_obj.error_message,
+            "coalesced": run_obj.coalesced,
+            "attempts": run_obj.attempts,
             "assertion_total": len(assert_records),
             "assertion_passed": len([item for item in assert_records if item["passed"]]),
             "assertion_failed": len(assert_fail_reasons),
@@ -387,6 +457,86 @@ async def request_run_detail(
     return api_response(data=jsonable_encoder(obj.to_dict()))
 
 
+async def _dispatch_load_run(
+    db: AsyncSession, request_data: ApiRequestLoadRunReqData, shards: int
+) -> dict[str, Any]:
+    """写入压测配置并派发分片与协调端 Celery 任务(压测不在 API 进程内执行)"""
+
+    request_obj, dataset_list, env_obj = await _load_targets(db, request_data)
+    # 派发后不再访问数据库, 提前归还连接
+    await db.close()
+
+    abort_error_rate = request_data.abort_error_rate
+    if abort_error_rate is None:
+        abort_error_rate = project_config.LOAD_TEST_ABORT_ERROR_RATE
+    meta = await start_distributed_load(
+        await get_redis_pool(),
+        snapshots=build_load_snapshots(request_obj, dataset_list, env_obj),
+        stages=[stage.model_dump() for stage in request_data.stages],
+        start_rps=request_data.start_rps,
+        shards=shards,
+        max_in_flight=request_data.max_in_flight,
+        abort_error_rate=abort_error_rate,
+        dispatch=dispatch_load_shard_task,
+        extra={
+            "request_id": request_obj.id,
+            "dataset_ids": [dataset_obj.id for dataset_obj in dataset_list],
+            **build_load_limits(env_obj),
+        },
+    )
+    dispatch_load_coordinator_task(meta["load_id"])
+    return {"load_id": meta["load_id"], "shards": meta["shards"], "start_at": meta["start_at"]}
+
+
+@router.post("/load_run", summary="单用例压测(开放模型)")
+async def load_run_api_request(
+    request_data: ApiRequestLoadRunReqData,
+    admin: Admin = Depends(check_admin_existence),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    按阶段配置压测单个测试用例(由一个 Celery worker 执行, 即 1 个分片), 返回 load_id,
+    通过 GET /load_run/distributed/{load_id} 查询整体及每秒的吞吐、错误率与延迟分位(结果不落 ApiRequestRun 明细)
+    每个请求同样经过目标的熔断、限流与 host 并发上限
+    """
+
+    _validate_load_profile(request_data)
+    return api_response(data=await _dispatch_load_run(db, request_data, shards=1))
+
+
+@router.post("/load_run/distributed", summary="分布式压测(按 Celery worker 分片)")
+async def distributed_load_run_api_request(
+    request_data: ApiRequestDistributedLoadRunReqData,
+    admin: Admin = Depends(check_admin_existence),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """派发压测分片与协调端 Celery 任务, 返回 load_id, 通过 GET /load_run/distributed/{load_id} 查询合并结果"""
+
+    if request_data.shards > project_config.LOAD_TEST_MAX_SHARDS:
+        raise CustomException(detail=f"分片数不能超过 {project_config.LOAD_TEST_MAX_SHARDS}", custom_code=10005)
+    _validate_load_profile(request_data, shards=request_data.shards)
+    return api_response(data=await _dispatch_load_run(db, request_data, shards=request_data.shards))
+
+
+@router.get("/load_run/distributed/{load_id}", summary="分布式压测结果")
+async def distributed_load_run_detail(load_id: str, admin: Admin = Depends(check_admin_existence)):
+    """运行中返回各分片已上报数据的合并结果, 结束后返回最终报告"""
+
+    report = await collect_load_report(await get_redis_pool(), load_id)
+    if report is None:
+        raise CustomException(detail=f"{load_id} 压测任务不存在", custom_code=10002)
+    return api_response(data=report)
+
+
+@router.post("/load_run/distributed/{load_id}/abort", summary="终止分布式压测")
+async def abort_distributed_load_run(load_id: str, admin: Admin = Depends(check_admin_existence)):
+    redis = await get_redis_pool()
+    if await get_load_meta(redis, load_id) is None:
+        raise CustomException(detail=f"{load_id} 压测任务不存在", custom_code=10002)
+    await request_abort(redis, load_id, f"{admin.username} 手动终止")
+    return api_response()
+
+
 @router.post("/extract", summary="新增变量提取规则")
 async def create_extract_rule(
     request_data: ApiExtractRuleCreateReqData,
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : aps_task.py
+
+from fastapi import APIRouter, Depends, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.exceptions import CustomException
+from app.core.pagination import CommonPaginateQuery
+from app.core.response import api_response
+from app.core.security import check_admin_existence
+from app.db.session import get_db_session
+from app.models.admin import Admin
+from app.models.aps_task import ApsTask
+from app.schemas.aps_task import (
+    ApsTaskCreateReqData,
+    ApsTaskDeleteReqData,
+    ApsTaskPageReqData,
+    ApsTaskUpdateReqData,
+)
+from app.tasks.scheduler import build_task_handler, publish_aps_task_event
+
+router = APIRouter()
+
+
+async def _get_aps_task_or_404(db: AsyncSession, aps_task_id: int) -> ApsTask:
+    stmt = select(ApsTask).where(and_(ApsTask.id == aps_task_id, ApsTask.is_deleted == 0))
+    obj = (await db.execute(stmt)).scalars().first()
+    if not obj:
+        raise CustomException(detail=f"定时任务 {aps_task_id} 不存在", custom_code=10002)
+    return obj
+
+
+def _validate_aps_task(obj: ApsTask):
+    """构造触发器与任务函数, 提前暴露参数错误(不写入调度器)"""
+
+    task_handler = build_task_handler(obj)
+    if not task_handler:
+        raise CustomException(detail="trigger_param 不能为空", custom_code=10001)
+    try:
+        task_handler.get_trigger()
+        task_handler.get_task_function()
+    except Exception as exc:
+        raise CustomException(detail=f"定时任务参数错误: {exc}", custom_code=10006)
+
+
+@router.post("", summary="新增定时任务")
+async def create_aps_task(
+        request_data: ApsTaskCreateReqData,
+        admin: Admin = Depends(check_admin_existence),
+        db: AsyncSession = Depends(get_db_session),
+):
+    stmt = select(ApsTask).where(and_(ApsTask.task_id == request_data.task_id, ApsTask.is_deleted == 0))
+    if (await db.execute(stmt)).scalars().first():
+        raise CustomException(detail=f"任务ID: {request_data.task_id} 已存在", custom_code=10003)
+
+    obj = ApsTask(**request_data.model_dump())
+    _validate_aps_task(obj)
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    await publish_aps_task_event("upsert", obj.id, obj.task_id)
+    return api_response(http_code=status.HTTP_201_CREATED, code=201, data={"id": obj.id})
+
+
+@router.put("", summary="编辑定时任务")
+async def update_aps_task(
+        request_data: ApsTaskUpdateReqData,
+        admin: Admin = Depends(check_admin_existence),
+        db: AsyncSession = Depends(get_db_session),
+):
+    obj = await _get_aps_task_or_404(db, request_data.id)
+    update_data = request_data.model_dump(exclude_unset=True, exclude_none=True)
+    update_data.pop("id", None)
+    if update_data:
+        for k, v in update_data.items():
+            setattr(obj, k, v)
+        _validate_aps_task(obj)
+        obj.touch()
+        await db.commit()
+        await publish_aps_task_event("upsert", obj.id, obj.task_id)
+    return api_response(http_code=status.HTTP_201_CREATED, code=201)
+
+
+@router.get("/{aps_task_id}", summary="定时任务详情")
+async def aps_task_detail(
+        aps_task_id: int,
+        admin: Admin = Depends(check_admin_existence),
+        db: AsyncSession = Depends(get_db_session),
+):
+    obj = await _get_aps_task_or_404(db, aps_task_id)
+    return api_response(data=jsonable_encoder(obj.to_dict()))
+
+
+@router.post("/page", summary="定时任务分页")
+async def aps_task_page(
+        request_data: ApsTaskPageReqData,
+        admin: Admin = Depends(check_admin_existence),
+        db: AsyncSession = Depends(get_db_session),
+):
+    pq = CommonPaginateQuery(
+        request_data=request_data,
+        orm_model=ApsTask,
+        db_session=db,
+        like_list=["task_id", "task_function_name"],
+        where_list=["is_deleted", "trigger_type"],
+        order_by_list=["-update_time"],
+        skip_list=["is_deleted"],
+    )
+    await pq.build_query()
+    return api_response(data=pq.normal_data)
+
+
+@router.delete("", summary="删除定时任务")
+async def delete_aps_task(
+        request_data: ApsTaskDeleteReqData,
+        admin: Admin = Depends(check_admin_existence),
+        db: AsyncSession = Depends(get_db_session),
+):
+    obj = await _get_aps_task_or_404(db, request_data.id)
+    obj.is_deleted = admin.id
+    obj.touch()
+    await db.commit()
+    await publish_aps_task_event("remove", obj.id, obj.task_id)
+    return api_response(code=204)
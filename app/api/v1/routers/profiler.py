@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : profiler.py
+
+import asyncio
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.core.config import get_config
+from app.core.exceptions import CustomException
+from app.core.profiler import profile
+from app.core.security import check_admin_existence
+from app.models.admin import Admin
+from app.tasks.worker_control import request_worker_profile
+
+project_config = get_config()
+
+router = APIRouter()
+
+
+async def check_profiler_admin(admin: Admin = Depends(check_admin_existence)) -> Admin:
+    """采样分析仅限管理员: 配置了 PROFILER_ADMIN_USERNAMES 时按名单校验, 否则仅限非游客账户"""
+
+    if not project_config.PROFILER_ENABLED:
+        raise CustomException(detail="采样分析未启用", custom_code=10005)
+    allowed = {name.strip() for name in project_config.PROFILER_ADMIN_USERNAMES.split(",") if name.strip()}
+    if (allowed and admin.username not in allowed) or (not allowed and admin.is_tourist == 0):
+        raise CustomException(detail="无权限执行采样分析", custom_code=10005)
+    return admin
+
+
+@router.post("/profile", summary="在线采样分析")
+async def profile_process(
+    seconds: float = Query(default=10, gt=0, description="采样时长(秒)"),
+    fmt: Literal["collapsed", "speedscope"] = Query(default="collapsed", description="输出格式"),
+    worker: Optional[str] = Query(default=None, description="Celery worker 名称(如 celery@host), 为空时分析当前 API 进程"),
+    admin: Admin = Depends(check_profiler_admin),
+):
+    """
+    对当前 API 进程(或指定 Celery worker) 采样 seconds 秒
+        collapsed: 纯文本, 每行 "栈;帧 次数", 可直接导入 speedscope / flamegraph.pl
+        speedscope: JSON 文件, 可直接拖入 https://www.speedscope.app
+    """
+
+    if worker:
+        result = await asyncio.to_thread(request_worker_profile, worker, seconds, fmt)
+    else:
+        result = await asyncio.to_thread(profile, seconds, fmt)
+
+    headers = {"x-profile-pid": str(result["pid"]), "x-profile-samples": str(result["samples"])}
+    if fmt == "collapsed":
+        return PlainTextResponse(content=result["profile"], headers=headers)
+    headers["Content-Disposition"] = f'attachment; filename="profile_{result["pid"]}.speedscope.json"'
+    return JSONResponse(content=result["profile"], headers=headers)
@@ -7,6 +7,7 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, status
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -17,7 +18,10 @@ from app.core.security import check_admin_existence
 from app.db.session import get_db_session
 from app.models.admin import Admin
 from app.models.api_request import ApiRequest, ApiRequestDataset, ApiRequestRun, TestScenario, TestScenarioCase, TestScenarioRun
+from app.services.cassette import cassette_exists
 from app.services.scenario_task_dispatcher import dispatch_scenario_run_task
+from app.services.http_phase_timer import average_phase_timings
+from app.services.run_timeline import build_chrome_trace
 from app.services.scenario_runner import build_scenario_run_result
 from app.schemas.scenario import (
     TestScenarioCancelRunReqData,
@@ -37,8 +41,10 @@ from app.schemas.scenario import (
 router = APIRouter()
 
 
-async def _get_scenario_or_404(db: AsyncSession, scenario_id: int) -> TestScenario:
+async def _get_scenario_or_404(db: AsyncSession, scenario_id: int, for_update: bool = False) -> TestScenario:
     stmt = select(TestScenario).where(and_(TestScenario.id == scenario_id, TestScenario.is_deleted == 0))
+    if for_update:
+        stmt = stmt.with_for_update()
     obj = (await db.execute(stmt)).scalars().first()
     if not obj:
         raise CustomException(detail=f"测试场景 {scenario_id} 不存在", custom_code=10002)
@@ -176,7 +182,9 @@ def _build_scenario_run_report(
             "last_run_id": None,
             "last_status_code": None,
             "last_error_message": None,
+            "avg_phase_timings": None,
             "_timed_count": 0,
+            "_phase_timings": [],
         }
 
     failed_runs: list[dict[str, Any]] = []
@@ -205,7 +213,9 @@ def _build_scenario_run_report(
                 "last_run_id": None,
                 "last_status_code": None,
                 "last_error_message": None,
+                "avg_phase_timings": None,
                 "_timed_count": 0,
+                "_phase_timings": [],
             }
 
         report_item = step_report_map[step_key]
@@ -227,6 +237,9 @@ def _build_scenario_run_report(
                 }
             )
 
+        if run_obj.phase_timings:
+            report_item["_phase_timings"].append(run_obj.phase_timings)
+
         if run_obj.response_time_ms is not None:
             report_item["total_response_time_ms"] += run_obj.response_time_ms
             report_item["_timed_count"] += 1
@@ -251,6 +264,7 @@ def _build_scenario_run_report(
     step_reports = list(step_report_map.values())
     for item in step_reports:
         timed_count = item.pop("_timed_count")
+        item["avg_phase_timings"] = average_phase_timings(item.pop("_phase_timings"))
         item["is_success"] = item["run_count"] > 0 and item["failed_count"] == 0
         if timed_count > 0:
             item["avg_response_time_ms"] = round(item["total_response_time_ms"] / timed_count, 2)
@@ -288,6 +302,7 @@ def _build_scenario_run_report(
         "avg_response_time_ms": round(total_response_time_ms / total_timed_count, 2) if total_timed_count > 0 else None,
         "max_response_time_ms": max_response_time_ms,
         "min_response_time_ms": min_response_time_ms,
+        "avg_phase_timings": average_phase_timings([item.phase_timings for item in run_list]),
     }
 
     return {
@@ -304,7 +319,10 @@ async def run_scenario(
     admin: Admin = Depends(check_admin_existence),
     db: AsyncSession = Depends(get_db_session),
 ):
-    scenario_obj = await _get_scenario_or_404(db, request_data.scenario_id)
+    # 与定时触发(app.tasks.tasks.run_scenario)相同, 持有场景行锁到新增运行记录提交, 保证定时触发的运行数上限计数准确
+    scenario_obj = await _get_scenario_or_404(db, request_data.scenario_id, for_update=True)
+    if request_data.cassette_mode == "replay" and not cassette_exists(request_data.cassette_name):
+        raise CustomException(detail=f"录制文件 {request_data.cassette_name} 不存在", custom_code=10002)
 
     scenario_run = TestScenarioRun(
         scenario_id=scenario_obj.id,
@@ -318,6 +336,8 @@ async def run_scenario(
         is_success=False,
         runtime_variables=request_data.initial_variables,
         error_message=None,
+        cassette_name=request_data.cassette_name,
+        cassette_mode=request_data.cassette_mode,
     )
     db.add(scenario_run)
     await db.commit()
@@ -368,6 +388,33 @@ async def scenario_run_report(
     return api_response(data=report_data)
 
 
+@router.get("/run/{scenario_run_id}/timeline", summary="测试场景执行瀑布图")
+async def scenario_run_timeline(
+    scenario_run_id: int,
+    admin: Admin = Depends(check_admin_existence),
+    db: AsyncSession = Depends(get_db_session),
+):
+    scenario_run = await _get_scenario_run_or_404(db, scenario_run_id)
+    return api_response(data=scenario_run.timeline or {"spans": [], "dropped": 0})
+
+
+@router.get("/run/{scenario_run_id}/trace", summary="导出测试场景执行 Chrome Trace")
+async def export_scenario_run_trace(
+    scenario_run_id: int,
+    admin: Admin = Depends(check_admin_existence),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """直接返回 Trace Event JSON(不包裹 api_response), 下载后可用 Perfetto / chrome://tracing 打开"""
+
+    scenario_run = await _get_scenario_run_or_404(db, scenario_run_id)
+    if not scenario_run.timeline:
+        raise CustomException(detail=f"运行记录 {scenario_run_id} 没有瀑布图数据", custom_code=10002)
+    return JSONResponse(
+        content=build_chrome_trace(scenario_run.id, scenario_run.timeline),
+        headers={"Content-Disposition": f'attachment; filename="scenario_run_{scenario_run.id}.trace.json"'},
+    )
+
+
 @router.post("/run/cancel", summary="取消测试场景运行")
 async def cancel_scenario_run(
     request_data: TestScenarioCancelRunReqData,
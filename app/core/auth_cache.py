@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : auth_cache.py
+
+from collections.abc import Iterable
+
+from loguru import logger
+
+from app.core.config import get_config
+from app.db.redis_pubsub import RedisChannelSubscriber, publish_message
+from app.utils.ttl_cache import TTLLRUCache
+
+project_config = get_config()
+
+token_cache = TTLLRUCache(maxsize=project_config.AUTH_CACHE_MAXSIZE, ttl=project_config.AUTH_CACHE_TTL)  # token -> user_info
+admin_cache = TTLLRUCache(maxsize=project_config.AUTH_CACHE_MAXSIZE, ttl=project_config.AUTH_CACHE_TTL)  # admin_id -> Admin字段
+
+
+def _evict_local(kind: str, keys: Iterable):
+    cache = token_cache if kind == "token" else admin_cache
+    for key in keys:
+        cache.pop(key)
+
+
+async def _publish_invalidation(kind: str, keys: list):
+    try:
+        await publish_message(project_config.AUTH_CACHE_CHANNEL, {"kind": kind, "keys": keys})
+    except Exception:
+        # 广播失败时其他进程最多在 AUTH_CACHE_TTL 秒后自然过期
+        logger.exception(f"鉴权缓存失效广播失败: kind={kind}, keys={len(keys)}")
+
+
+async def invalidate_tokens(tokens: Iterable[str]):
+    """失效 token 缓存(退出/重置密码/单点登录踢下线)"""
+    keys = [token for token in tokens if token]
+    if not keys:
+        return
+    _evict_local("token", keys)
+    await _publish_invalidation("token", keys)
+
+
+async def invalidate_admin(admin_id: int):
+    """失效后台用户缓存(编辑/禁用/重置密码)"""
+    _evict_local("admin", [int(admin_id)])
+    await _publish_invalidation("admin", [int(admin_id)])
+
+
+async def apply_invalidation_event(data: dict):
+    """处理其他进程广播的失效事件"""
+    kind = data.get("kind")
+    if kind not in {"token", "admin"}:
+        return
+    keys = data.get("keys") or []
+    if kind == "admin":
+        keys = [int(key) for key in keys]
+    _evict_local(kind, keys)
+
+
+auth_cache_subscriber = RedisChannelSubscriber(project_config.AUTH_CACHE_CHANNEL, apply_invalidation_event)
@@ -125,9 +125,144 @@ class BaseConfig(BaseSettings):
     REDIS_PWD: str
     REDIS_DB: int
     DECODE_RESPONSES: bool
+    REDIS_MAX_CONNECTIONS: int = 64  # 每个进程连接池上限
+    REDIS_POOL_TIMEOUT: float = 5  # 连接池耗尽时等待空闲连接的时长(秒), 超时抛出异常
+    REDIS_SOCKET_TIMEOUT: float = 5  # 读写超时(秒), 同样作用于 pubsub.listen(), 订阅端需用 get_message(timeout=...) 轮询
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 3  # 建连超时(秒)
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # 空闲超过该时长的连接在复用前先 PING(秒)
+    REDIS_CLIENT_CACHE_ENABLED: bool = False  # 热点只读键的客户端缓存(CLIENT TRACKING, 需 Redis >= 6)
+    REDIS_CLIENT_CACHE_MAXSIZE: int = 10000
+    REDIS_CLIENT_CACHE_TTL: int = 60  # 兜底有效期(秒), 失效通知丢失时最多缓存该时长
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_RESULT_BACKEND: Optional[str] = None
     CELERY_TASK_QUEUE: str = "exile_scenario_tasks"
+    # 分布式压测协调端独立队列, 避免分片占满执行槽位后协调端排在分片之后(需单独启动消费该队列的 worker)
+    CELERY_LOAD_COORDINATOR_QUEUE: str = "exile_load_coordinator"
+
+    # 定时任务选主配置(多进程部署时仅 leader 运行调度器)
+    SCHEDULER_LEADER_ENABLED: bool = True
+    SCHEDULER_LEADER_KEY: str = "exile:scheduler:leader"
+    SCHEDULER_LEASE_TTL: int = 15  # 租约有效期(秒), 故障切换窗口 <= 租约有效期 + 续约间隔
+    SCHEDULER_LEASE_RENEW_INTERVAL: int = 5  # 续约/竞选间隔(秒)
+    SCHEDULER_JOB_TOKEN_TTL: int = 86400  # 定时任务触发幂等令牌有效期(秒)
+    SCHEDULER_TASK_CHANNEL: str = "exile:scheduler:aps_task_events"  # 定时任务变更广播频道
+    SCHEDULER_DEFAULT_JITTER: int = 60  # 默认触发抖动上限(秒), 按任务ID散列出固定偏移, 打散同一时刻的 cron
+    SCHEDULER_MISFIRE_GRACE_TIME: int = 300  # 错过触发后允许补执行的宽限期(秒), 多次错过合并为一次
+    SCHEDULER_SCENARIO_MAX_CONCURRENT_RUNS: int = 1  # 同一场景 queued/running 的最大运行数
+    SCHEDULER_SCENARIO_RUN_STALE_SECONDS: int = 21600  # 超过该时长的 queued/running 记录视为僵死, 不计入并发
+
+    # 鉴权缓存配置(进程内 token->user_info / admin_id->Admin, 通过 Redis 广播失效)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL: int = 10  # 缓存有效期(秒)
+    AUTH_CACHE_MAXSIZE: int = 10000  # 每类缓存最大条目数
+    AUTH_CACHE_CHANNEL: str = "exile:auth_cache:invalidate"
+
+    # 密码哈希配置(bcrypt 在独立线程池执行, 不阻塞事件循环)
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # bcrypt 成本因子, 调高后旧哈希在下次登录成功时自动重新加密
+    PASSWORD_HASH_MAX_WORKERS: int = 2  # 每个进程 bcrypt 并发上限
+    PASSWORD_HASH_MAX_PENDING: int = 64  # 每个进程排队等待的 bcrypt 任务上限, 超过直接拒绝
+    LOGIN_THROTTLE_MAX_FAILURES: int = 5  # 同一用户名在窗口内允许的最大失败次数
+    LOGIN_THROTTLE_WINDOW: int = 300  # 登录失败计数窗口(秒)
+
+    # 访问日志配置
+    LOG_LEVEL: str = "DEBUG"
+    ACCESS_LOG_JSON: bool = True  # 访问日志以单行 JSON 输出到 stdout(enqueue 后台线程写出)
+    ACCESS_LOG_SAMPLE_RATES: str = ""  # 高频路径采样率, 例如 "/api/health*:0.01,/metrics:0"
+    ACCESS_LOG_SLOW_MS: float = 1000  # 慢请求阈值(毫秒), 慢请求/5xx/异常不参与采样, 始终记录
+
+    # Prometheus 指标配置(多进程部署需设置环境变量 PROMETHEUS_MULTIPROC_DIR)
+    METRICS_ENABLED: bool = True
+    METRICS_MAX_EXECUTOR_HOSTS: int = 200  # 执行器指标 host 标签上限, 超出归入 <other>
+    METRICS_POOL_SAMPLE_INTERVAL: float = 5  # 连接池指标采集间隔(秒)
+
+    # 事件循环延迟监控(API 进程与 Celery worker 均启用)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.5  # 探测间隔(秒)
+    LOOP_MONITOR_SLOW_THRESHOLD: float = 0.2  # 事件循环被阻塞超过该时长(秒)时输出阻塞位置的调用栈
+
+    # 在线采样分析(默认关闭, 未调用时没有任何开销)
+    PROFILER_ENABLED: bool = False
+    PROFILER_ADMIN_USERNAMES: str = ""  # 允许调用的后台用户名(逗号分隔), 为空时仅限非游客账户
+    PROFILER_MAX_SECONDS: float = 60  # 单次采样最长时长(秒)
+    PROFILER_INTERVAL_MS: float = 10  # 采样间隔(毫秒)
+
+    # 执行器按目标主机的自适应并发限制(AIMD)
+    HOST_LIMIT_ENABLED: bool = True
+    HOST_LIMIT_INITIAL: int = 10  # 新 host 的初始并发上限
+    HOST_LIMIT_MIN: int = 1
+    HOST_LIMIT_MAX: int = 200  # 全局上限, ApiEnvironment.max_concurrency 可进一步收紧
+    HOST_LIMIT_BACKOFF: float = 0.7  # 过载时上限乘以该系数
+    HOST_LIMIT_ERROR_RATE: float = 0.1  # 窗口内 5xx/超时/连接失败比例超过该值视为过载
+    HOST_LIMIT_LATENCY_TOLERANCE: float = 2.0  # 延迟超过基准延迟的倍数视为变慢
+    HOST_LIMIT_LATENCY_SLACK_MS: float = 50  # 变慢还需超出基准延迟的绝对值(毫秒), 避免低延迟目标抖动误判
+    HOST_LIMIT_WINDOW_MIN_SAMPLES: int = 10  # 每个调整窗口最少样本数
+
+    # 按目标的分布式限流(Redis 令牌桶, 所有 API/Celery 进程共享)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_HOST_RULES: dict[str, float] = {}  # host 通配模式 -> 每秒请求数, 例如 {"*.staging.example.com": 200}
+    RATE_LIMIT_BURST_SECONDS: float = 1.0  # 令牌桶容量 = 速率 * 该值
+    RATE_LIMIT_BATCH_FRACTION: float = 0.05  # 每次从 Redis 批量取的令牌数占速率的比例
+    RATE_LIMIT_BATCH_MAX: int = 20  # 每次批量取令牌的上限
+    RATE_LIMIT_LOCAL_TTL: float = 0.5  # 本地未用完令牌的有效期(秒)
+    RATE_LIMIT_MAX_WAIT: float = 60  # 单个请求等待令牌的最长时间(秒), 超过则该请求失败
+    RATE_LIMIT_FAIL_OPEN: bool = True  # Redis 不可用时放行
+
+    # 按目标主机的熔断器(状态通过 Redis 在所有 worker 间共享)
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败次数达到该值后熔断
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30  # 熔断持续时间(秒), 之后进入半开状态发送探测请求
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = 1  # 半开状态同时允许的探测请求数
+    CIRCUIT_BREAKER_SYNC_INTERVAL: float = 1.0  # 本进程缓存熔断状态的时长(秒)
+    CIRCUIT_BREAKER_FAILURE_STATUS_CODES: list[int] = [502, 503, 504]  # 视为目标不可用的状态码(另含超时/连接失败)
+
+    # 重试与对冲请求(策略配置在 ApiRequest/TestScenarioCase.retry_policy)
+    RETRY_LATENCY_WINDOW: int = 200  # 每个目标主机保留的最近成功请求耗时样本数(用于计算对冲延迟 p95)
+    RETRY_HEDGE_MIN_SAMPLES: int = 20  # 未配置 hedge_delay_ms 时, 样本数达到该值才启用对冲
+
+    # 相同幂等请求合并(ApiRequest.coalesce_enabled 开启的 GET/HEAD/OPTIONS)
+    COALESCE_ENABLED: bool = True
+    COALESCE_WINDOW_MS: int = 100  # 请求完成后多久内到达的相同请求直接复用结果(毫秒), 0 表示只合并进行中的请求
+
+    # 场景执行的请求录制与回放
+    # 录制文件目录(相对路径基于项目根目录); API 进程检查、Celery worker 读写, 跨主机部署时必须是共享存储(NFS 等)
+    CASSETTE_DIR: str = "cassettes"
+    CASSETTE_IGNORE_HEADERS: list[str] = [
+        "authorization",
+        "cookie",
+        "date",
+        "user-agent",
+        "x-request-id",
+        "x-trace-id",
+        "traceparent",
+    ]  # 不参与匹配的请求头
+    CASSETTE_VOLATILE_FIELDS: list[str] = [
+        "timestamp",
+        "ts",
+        "nonce",
+        "sign",
+        "signature",
+        "token",
+        "access_token",
+    ]  # query/body 中只匹配字段名、不匹配值的字段
+    CASSETTE_VOLATILE_PATTERNS: dict[str, str] = {}  # 额外的易变值正则(占位符名 -> 正则), 内置时间戳/日期/UUID/JWT/十六进制串
+
+    # 单用例压测(开放模型)配置
+    LOAD_TEST_MAX_DURATION: float = 600  # 所有阶段总时长上限(秒)
+    LOAD_TEST_MAX_RPS: float = 1000  # 单次压测目标 RPS 上限
+    LOAD_TEST_MAX_IN_FLIGHT: int = 500  # 单次压测最大并发请求数上限
+    LOAD_TEST_MAX_SHARDS: int = 16  # 分布式压测最大分片数(每个分片占用一个 Celery 执行槽位, 协调端在 CELERY_LOAD_COORDINATOR_QUEUE 执行)
+    LOAD_TEST_SHARD_START_DELAY: float = 5  # 派发后延迟多久统一开始(秒), 需大于 worker 领取任务的耗时
+    LOAD_TEST_SHARD_MAX_SKEW: float = 3  # 分片晚于统一开始时间超过该值则放弃执行(秒)
+    LOAD_TEST_SHARD_GRACE_SECONDS: float = 60  # 压测结束后等待分片上报的最长时间(秒)
+    LOAD_TEST_FLUSH_INTERVAL: float = 1  # 分片上报/协调端合并间隔(秒)
+    LOAD_TEST_ABORT_ERROR_RATE: float = 0.5  # 总体错误率超过该值时终止所有分片
+    LOAD_TEST_ABORT_MIN_REQUESTS: int = 50  # 样本数达到该值后才判断错误率
+    LOAD_TEST_RESULT_TTL: int = 86400  # 分布式压测结果在 Redis 中保留时长(秒)
+
+    # SQL 查询统计配置(按 HTTP 请求/场景运行统计语句数与耗时)
+    DB_QUERY_STATS_ENABLED: bool = True
+    DB_QUERY_STATS_HEADERS: bool = True  # 非生产环境返回 x-db-queries / x-db-time 响应头, 生产环境始终不返回
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # 同一语句在一次请求内执行超过该次数时告警(疑似 N+1)
 
     # 日志脱敏配置
     SENSITIVE_HEADERS: str = "authorization,cookie,set-cookie,x-api-key"
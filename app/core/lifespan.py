@@ -14,10 +14,15 @@ from fastapi import FastAPI
 from loguru import logger
 
 import app.db.redis_client as redis_module
+from app.core.auth_cache import auth_cache_subscriber
 from app.core.config import get_config
+from app.core.loop_monitor import loop_lag_monitor
+from app.core.metrics import pool_metrics_collector
+from app.core.password import shutdown_password_executor
+from app.core.security import migrate_legacy_token_index
 from app.db.redis_client import close_redis_connection_pool, create_redis_connection_pool
 from app.db.session import close_db, init_db
-from app.tasks.scheduler import scheduler, scheduler_init
+from app.tasks.scheduler import aps_task_subscriber, scheduler, scheduler_init, scheduler_leader
 
 project_config = get_config()
 
@@ -46,14 +51,35 @@ async def _init_redis():
     await create_redis_connection_pool()
     logger.debug(f"redis_pool: {redis_module.redis_pool!r}")
     logger.info(">>> Redis 连接池初始化完成")
+    try:
+        # 旧版本 token 补建用户索引(全局只执行一次)
+        await migrate_legacy_token_index()
+    except Exception:
+        logger.exception("旧 token 索引迁移失败")
+    if project_config.AUTH_CACHE_ENABLED:
+        # 订阅鉴权缓存失效事件(退出/重置密码/禁用/单点登录踢下线)
+        auth_cache_subscriber.start()
 
 
 async def _init_scheduler():
+    # 订阅定时任务变更事件, 运行中的调度器增量更新单个任务
+    aps_task_subscriber.start()
+    if project_config.SCHEDULER_LEADER_ENABLED:
+        # 多进程部署时仅 leader 加载并运行定时任务
+        await scheduler_leader.start()
+        logger.info(">>> 定时任务选主初始化")
+        return
     await scheduler_init()
     logger.info(">>> 定时任务初始化")
 
 
 async def _shutdown_scheduler():
+    try:
+        await aps_task_subscriber.stop()
+        await scheduler_leader.stop()
+    except Exception:
+        logger.exception(">>> 定时任务选主关闭失败")
+
     if getattr(scheduler, "running", False):
         try:
             with suppress(SchedulerNotRunningError):
@@ -67,6 +93,7 @@ async def _shutdown_scheduler():
 
 async def _shutdown_redis():
     try:
+        await auth_cache_subscriber.stop()
         await close_redis_connection_pool()
         logger.info(">>> Redis 连接池已关闭")
     except Exception:
@@ -91,6 +118,10 @@ async def startup_event():
         await _init_db()
         await _init_redis()
         await _init_scheduler()
+        if project_config.METRICS_ENABLED:
+            pool_metrics_collector.start()
+        if project_config.LOOP_MONITOR_ENABLED:
+            loop_lag_monitor.start()
     except Exception:
         logger.exception("应用启动失败，开始回收资源")
         await _shutdown_scheduler()
@@ -103,9 +134,13 @@ async def shutdown_event():
     """应用关闭后执行"""
 
     logger.info(">>> shutdown")
+    await loop_lag_monitor.stop()
+    await pool_metrics_collector.stop()
     await _shutdown_scheduler()
     await _shutdown_redis()
     await _shutdown_db()
+    shutdown_password_executor()
+    await logger.complete()  # 等待 enqueue sink 写完队列中的日志
 
 
 @asynccontextmanager
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : log_config.py
+
+import json
+import sys
+from typing import Optional, TextIO
+
+from loguru import logger
+
+from app.core.config import get_config
+
+project_config = get_config()
+
+_configured = False
+
+ACCESS_LOG_RESERVED_KEYS = {"log_type"}
+
+
+def _is_access_record(record) -> bool:
+    return record["extra"].get("log_type") == "access"
+
+
+def _is_not_access_record(record) -> bool:
+    return record["extra"].get("log_type") != "access"
+
+
+class JsonAccessLogSink:
+    """
+    访问日志 JSON sink
+        配合 enqueue=True 使用, 请求线程只负责把记录放入队列, 序列化与写出都在 loguru 后台线程完成
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+
+    def __call__(self, message):
+        record = message.record
+        payload = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+        }
+        payload.update({k: v for k, v in record["extra"].items() if k not in ACCESS_LOG_RESERVED_KEYS})
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        stream.flush()
+
+
+def setup_logging(force: bool = False):
+    """
+    配置 loguru(进程内只执行一次)
+        ACCESS_LOG_JSON=True 时访问日志以单行 JSON 输出到 stdout, 其余日志仍输出到 stderr,
+        两个 sink 均为 enqueue 模式, 不在请求路径上做 I/O
+    """
+
+    global _configured
+    if _configured and not force:
+        return
+    _configured = True
+
+    if not project_config.ACCESS_LOG_JSON:
+        return
+
+    logger.remove()
+    logger.add(sys.stderr, level=project_config.LOG_LEVEL, filter=_is_not_access_record, enqueue=True)
+    logger.add(JsonAccessLogSink(), level="INFO", format="{message}", filter=_is_access_record, enqueue=True)
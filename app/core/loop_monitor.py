@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : loop_monitor.py
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+from typing import Any, Coroutine, TypeVar
+
+from loguru import logger
+
+from app.core.config import get_config
+from app.core.metrics import EVENT_LOOP_LAG
+
+project_config = get_config()
+
+T = TypeVar("T")
+
+"""
+事件循环延迟监控
+    1.协程按固定间隔 sleep, 实际唤醒时间与预期的差值即调度延迟, 写入 exile_event_loop_lag_seconds 直方图
+    2.看门狗线程检查协程是否按时唤醒, 超过阈值仍未唤醒说明事件循环正被同步代码阻塞(bcrypt/大 JSON/deepcopy 等),
+      此时采集事件循环线程当前的调用栈并输出, 每次阻塞只输出一次
+"""
+
+
+class LoopLagMonitor:
+
+    def __init__(self, role: str, interval: float, threshold: float):
+        self.role = role
+        self.interval = interval
+        self.threshold = threshold
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._deadline: float | None = None  # 协程预期被唤醒的时间(perf_counter)
+        self._reported_deadline: float | None = None
+
+    async def _run(self):
+        while True:
+            self._deadline = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - self._deadline, 0.0)
+            EVENT_LOOP_LAG.labels(role=self.role).observe(lag)
+            if lag >= self.threshold:
+                logger.warning(f"事件循环阻塞: role={self.role} lag={lag * 1000:.1f}ms")
+
+    def _format_loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return ""
+        return "".join(traceback.format_stack(frame, limit=30))
+
+    def check(self, now: float | None = None) -> bool:
+        """看门狗检查一次, 发现阻塞并输出调用栈时返回 True"""
+
+        deadline = self._deadline
+        if deadline is None or deadline == self._reported_deadline:
+            return False
+        overdue = (time.perf_counter() if now is None else now) - deadline
+        if overdue < self.threshold:
+            return False
+        self._reported_deadline = deadline
+        logger.warning(
+            f"事件循环阻塞超过 {overdue * 1000:.1f}ms: role={self.role}, 当前调用栈:\n{self._format_loop_stack()}"
+        )
+        return True
+
+    def _watch(self):
+        check_interval = max(self.threshold / 2, 0.01)
+        while not self._stopped.wait(check_interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("事件循环看门狗检查失败")
+
+    def start(self):
+        if self._task:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name=f"loop-watchdog-{self.role}", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self._deadline = None
+        self._watchdog = None
+
+
+def create_loop_monitor(role: str) -> LoopLagMonitor:
+    return LoopLagMonitor(
+        role=role,
+        interval=project_config.LOOP_MONITOR_INTERVAL,
+        threshold=project_config.LOOP_MONITOR_SLOW_THRESHOLD,
+    )
+
+
+loop_lag_monitor = create_loop_monitor("api")
+
+
+def run_with_loop_monitor(coro: Coroutine[Any, Any, T], role: str = "worker") -> T:
+    """asyncio.run 的替代: Celery worker 每个任务新建事件循环, 在循环内同时启动延迟监控"""
+
+    async def _main() -> T:
+        if not project_config.LOOP_MONITOR_ENABLED:
+            return await coro
+        monitor = create_loop_monitor(role)
+        monitor.start()
+        try:
+            return await coro
+        finally:
+            await monitor.stop()
+
+    return asyncio.run(_main())
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : metrics.py
+
+import asyncio
+import os
+import time
+from contextlib import suppress
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+import app.db.redis_client as rp
+from app.core.config import get_config
+
+project_config = get_config()
+
+"""
+Prometheus 指标
+    1.单进程直接使用默认 REGISTRY
+    2.gunicorn 多进程部署时设置环境变量 PROMETHEUS_MULTIPROC_DIR, 各 worker 写入共享目录, /metrics 汇总全部 worker
+      (Gauge 使用 livesum, 只累加存活进程; 进程退出由 gunicorn.conf.py 的 child_exit 清理)
+"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "exile_http_request_duration_seconds",
+    "API 请求耗时",
+    ["method", "route", "status_class"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "exile_http_requests_in_progress",
+    "处理中的 API 请求数",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge("exile_db_pool_size", "数据库连接池大小", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("exile_db_pool_checked_out", "数据库连接池已借出连接数", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("exile_db_pool_overflow", "数据库连接池溢出连接数", multiprocess_mode="livesum")
+REDIS_POOL_IN_USE = Gauge("exile_redis_pool_in_use", "Redis 连接池使用中连接数", multiprocess_mode="livesum")
+REDIS_POOL_IDLE = Gauge("exile_redis_pool_idle", "Redis 连接池空闲连接数", multiprocess_mode="livesum")
+REDIS_POOL_MAX = Gauge("exile_redis_pool_max_connections", "Redis 连接池上限", multiprocess_mode="livesum")
+EXECUTOR_REQUEST_DURATION = Histogram(
+    "exile_executor_request_duration_seconds",
+    "执行器对外请求耗时",
+    ["host", "status_class"],
+    buckets=LATENCY_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "exile_event_loop_lag_seconds",
+    "事件循环调度延迟",
+    ["role"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HOST_CONCURRENCY_LIMIT = Gauge(
+    "exile_executor_host_concurrency_limit",
+    "执行器按目标主机的自适应并发上限",
+    ["host"],
+    multiprocess_mode="livesum",
+)
+HOST_IN_FLIGHT = Gauge(
+    "exile_executor_host_in_flight",
+    "执行器按目标主机的进行中请求数",
+    ["host"],
+    multiprocess_mode="livesum",
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+OTHER_HOST = "<other>"
+_executor_hosts: set[str] = set()
+
+
+def status_class(status_code: int | None) -> str:
+    """200 -> 2xx; 无响应(超时/连接失败等) -> error"""
+    if not status_code:
+        return "error"
+    return f"{status_code // 100}xx"
+
+
+def _host_label(url: str | None) -> str:
+    # 目标 host 由用户配置, 超过上限后归入 <other>, 避免标签基数无限增长
+    try:
+        host = urlsplit(url or "").hostname or ""
+    except ValueError:
+        host = ""
+    return _bounded_host(host)
+
+
+def _bounded_host(host: str | None) -> str:
+    if not host:
+        return OTHER_HOST
+    if host in _executor_hosts:
+        return host
+    if len(_executor_hosts) >= project_config.METRICS_MAX_EXECUTOR_HOSTS:
+        return OTHER_HOST
+    _executor_hosts.add(host)
+    return host
+
+
+def observe_executor_request(url: str | None, status_code: int | None, elapsed_seconds: float):
+    """记录执行器对外请求耗时"""
+    if not project_config.METRICS_ENABLED:
+        return
+    EXECUTOR_REQUEST_DURATION.labels(host=_host_label(url), status_class=status_class(status_code)).observe(
+        elapsed_seconds
+    )
+
+
+def observe_host_limit(host: str, limit: int, in_flight: int):
+    """记录目标主机当前并发上限与进行中请求数"""
+    if not project_config.METRICS_ENABLED:
+        return
+    label = _bounded_host(host)
+    if label == OTHER_HOST:
+        return
+    HOST_CONCURRENCY_LIMIT.labels(host=label).set(limit)
+    HOST_IN_FLIGHT.labels(host=label).set(in_flight)
+
+
+def collect_pool_metrics():
+    """采集当前进程的数据库/Redis 连接池状态"""
+
+    from app.db.session import engine
+
+    pool = engine.sync_engine.pool
+    for gauge, attr in ((DB_POOL_SIZE, "size"), (DB_POOL_CHECKED_OUT, "checkedout"), (DB_POOL_OVERFLOW, "overflow")):
+        method = getattr(pool, attr, None)
+        if method is not None:
+            gauge.set(max(method(), 0))
+
+    redis_pool = rp.redis_pool.connection_pool if rp.redis_pool is not None else None
+    if redis_pool is not None:
+        REDIS_POOL_IN_USE.set(len(getattr(redis_pool, "_in_use_connections", ())))
+        REDIS_POOL_IDLE.set(len(getattr(redis_pool, "_available_connections", ())))
+        REDIS_POOL_MAX.set(getattr(redis_pool, "max_connections", 0) or 0)
+
+
+class PoolMetricsCollector:
+    """按固定间隔采集连接池指标(每个 worker 各自采集, 多进程模式下汇总)"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            try:
+                collect_pool_metrics()
+            except Exception:
+                logger.exception("连接池指标采集失败")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+
+pool_metrics_collector = PoolMetricsCollector(project_config.METRICS_POOL_SAMPLE_INTERVAL)
+
+
+class PrometheusMiddleware:
+    """记录每个路由的耗时与处理中请求数, route 标签使用路由模板(如 /api/case/{case_id}) 而不是实际路径"""
+
+    def __init__(self, app: ASGIApp, exclude_paths=None):
+        self.app = app
+        self.exclude_paths = set(exclude_paths or [])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message.get("status")
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status_code = 500
+            raise
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=method,
+                route=getattr(route, "path", UNMATCHED_ROUTE),
+                status_class=status_class(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> bytes:
+    """输出指标, 多进程模式下汇总共享目录中所有 worker 的数据"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", summary="Prometheus 指标", include_in_schema=False)
+async def metrics():
+    collect_pool_metrics()
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
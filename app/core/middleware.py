@@ -4,16 +4,89 @@
 # @File    : middleware.py
 
 import json
+import random
 import time
-from typing import Iterable, Optional, Union
+from typing import Any, Iterable, Mapping, Optional, Union
 
 import shortuuid
 from loguru import logger
 from starlette.types import ASGIApp, Receive, Scope, Send
 
+# 访问日志统一打上 log_type=access, 由 app.core.log_config 中的 JSON sink 在后台线程输出
+access_logger = logger.bind(log_type="access")
+
+
 def _decode_headers(raw_headers) -> dict:
     # ASGI 原始 headers 为 bytes，这里统一转小写并解码
-    return {k.decode().lower(): v.decode() for k, v in raw_headers}
+    return {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in raw_headers}
+
+
+class _LazyHeaders:
+    """ASGI 原始 headers 的惰性视图: 只解码实际读取到的头"""
+
+    __slots__ = ("_raw", "_cache")
+
+    def __init__(self, raw_headers):
+        self._raw = raw_headers
+        self._cache: dict[str, Optional[str]] = {}
+
+    def get(self, name: str, default=None):
+        if name not in self._cache:
+            key = name.encode("latin-1")
+            value = None
+            for k, v in self._raw:
+                if k == key or k.lower() == key:
+                    value = v.decode("latin-1")
+                    break
+            self._cache[name] = value
+        value = self._cache[name]
+        return default if value is None else value
+
+    def to_dict(self) -> dict:
+        return _decode_headers(self._raw)
+
+
+class PathPrefixTrie:
+    """
+    路径前缀树
+        1.`/docs` 精确匹配, `/static*` 前缀匹配
+        2.match 返回精确匹配的值, 否则返回最长前缀匹配的值, 复杂度只与路径长度有关
+    """
+
+    __slots__ = ("_root",)
+
+    _EXACT = "exact"  # 节点的键是单个字符, 多字符标记不会冲突
+    _PREFIX = "prefix"
+
+    def __init__(self, patterns: Union[Mapping[str, Any], Iterable[str], None] = None):
+        self._root: dict = {}
+        if isinstance(patterns, Mapping):
+            for pattern, value in patterns.items():
+                self.insert(pattern, value)
+        else:
+            for pattern in patterns or []:
+                self.insert(pattern)
+
+    def __bool__(self):
+        return bool(self._root)
+
+    def insert(self, pattern: str, value: Any = True):
+        is_prefix = pattern.endswith("*")
+        node = self._root
+        for char in pattern[:-1] if is_prefix else pattern:
+            node = node.setdefault(char, {})
+        node[self._PREFIX if is_prefix else self._EXACT] = value
+
+    def match(self, path: str, default: Any = None) -> Any:
+        node = self._root
+        matched = node.get(self._PREFIX, default)
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                return matched
+            if self._PREFIX in node:
+                matched = node[self._PREFIX]
+        return node.get(self._EXACT, matched)
 
 
 def _mask_headers(headers: dict, sensitive_headers: set, mask: bool) -> dict:
@@ -31,7 +104,21 @@ def _parse_header_list(value: Union[str, Iterable[str], None]) -> set:
     return {str(h).strip().lower() for h in value if str(h).strip()}
 
 
-def _get_client_ip(headers: dict, client) -> str:
+def _parse_sample_rates(value: Union[str, Mapping[str, float], None]) -> dict:
+    # "/api/health*:0.01,/api/metrics:0" -> {"/api/health*": 0.01, "/api/metrics": 0.0}
+    if not value:
+        return {}
+    if isinstance(value, Mapping):
+        return {str(k): float(v) for k, v in value.items()}
+    rates = {}
+    for item in value.split(","):
+        pattern, _, rate = item.strip().rpartition(":")
+        if pattern:
+            rates[pattern] = float(rate)
+    return rates
+
+
+def _get_client_ip(headers, client) -> str:
     # 优先使用 X-Forwarded-For（反向代理场景），否则回退到 socket client
     xff = headers.get("x-forwarded-for")
     if xff:
@@ -52,25 +139,30 @@ class RequestLoggingMiddleware:
         exclude_paths: Optional[Iterable[str]] = None,
         sensitive_headers: Union[str, Iterable[str], None] = None,
         mask_sensitive_headers: bool = True,
+        sample_rates: Union[str, Mapping[str, float], None] = None,
+        slow_ms: float = 1000,
     ):
         self.app = app
         self.log_headers = log_headers
         self.log_body = log_body
         self.max_body_size = max_body_size
-        self.exclude_paths = set(exclude_paths or [])
+        self.exclude_paths = PathPrefixTrie(exclude_paths)
         self.sensitive_headers = _parse_header_list(sensitive_headers)
         self.mask_sensitive_headers = mask_sensitive_headers
+        # 高频路径按比例采样; 5xx、异常与慢请求始终记录
+        self.sample_rates = PathPrefixTrie(_parse_sample_rates(sample_rates))
+        self.slow_ms = slow_ms
 
     def _is_excluded(self, path: str) -> bool:
         # 支持精确匹配与简单前缀匹配（以 * 结尾）
-        for p in self.exclude_paths:
-            if p.endswith("*") and path.startswith(p[:-1]):
-                return True
-            if path == p:
-                return True
-        return False
-
-    def _should_read_body(self, method: str, headers: dict) -> bool:
+        return self.exclude_paths.match(path, False)
+
+    def _sample_rate(self, path: str) -> float:
+        if not self.sample_rates:
+            return 1.0
+        return self.sample_rates.match(path, 1.0)
+
+    def _should_read_body(self, method: str, headers) -> bool:
         # 只在需要时读取 body，避免对 GET/OPTIONS 等造成额外消耗
         if not self.log_body:
             return False
@@ -90,16 +182,16 @@ class RequestLoggingMiddleware:
         return True
 
     async def _receive_body(self, receive: Receive) -> bytes:
-        # 读取完整请求体（需要重建 receive 供下游再次读取）
-        body = b""
+        # 读取完整请求体（需要重建 receive 供下游再次读取）, 分块收集后一次拼接
+        chunks = []
         more_body = True
         while more_body:
             message = await receive()
             if message["type"] != "http.request":
                 continue
-            body += message.get("body", b"")
+            chunks.append(message.get("body", b""))
             more_body = message.get("more_body", False)
-        return body
+        return b"".join(chunks)
 
     def _build_receive(self, body: bytes) -> Receive:
         # 构造新的 receive，让下游还能拿到 body
@@ -125,9 +217,8 @@ class RequestLoggingMiddleware:
             return
 
         start = time.perf_counter()
-        headers = _decode_headers(scope.get("headers", []))
+        headers = _LazyHeaders(scope.get("headers", []))
         method = scope.get("method", "")
-        query_string = scope.get("query_string", b"").decode()
         client = scope.get("client")
         # 优先复用上游请求 ID，没有则生成
         request_id = headers.get("x-request-id") or headers.get("x-log-uuid") or shortuuid.uuid()
@@ -139,10 +230,10 @@ class RequestLoggingMiddleware:
             receive = self._build_receive(body)
 
         status_code = None
-        response_headers = []
+        failed = False
 
         async def send_wrapper(message):
-            nonlocal status_code, response_headers
+            nonlocal status_code
             if message["type"] == "http.response.start":
                 status_code = message.get("status")
                 response_headers = list(message.get("headers", []))
@@ -157,34 +248,48 @@ class RequestLoggingMiddleware:
         try:
             await self.app(scope, receive, send_wrapper)
         except Exception:
+            failed = True
             logger.exception("请求处理异常")
             raise
         finally:
             elapsed_ms = (time.perf_counter() - start) * 1000
-            full_path = f"{path}?{query_string}" if query_string else path
-            ip = _get_client_ip(headers, client)
-            # 统一结构化访问日志
-            logger.info(
-                f"{method} {full_path} {status_code} {elapsed_ms:.2f}ms "
-                f"ip={ip} rid={request_id}"
+            self._log_access(scope, headers, client, method, path, request_id, status_code, elapsed_ms, failed, body)
+
+    def _log_access(self, scope, headers, client, method, path, request_id, status_code, elapsed_ms, failed, body):
+        sample_rate = self._sample_rate(path)
+        always = failed or status_code is None or status_code >= 500 or elapsed_ms >= self.slow_ms
+        if not always and (sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate)):
+            return
+
+        # 只收集字段, JSON 序列化与写出由 enqueue sink 的后台线程完成
+        access_logger.info(
+            "{method} {path} {status} {elapsed_ms}ms ip={ip} rid={request_id}",
+            method=method,
+            path=path,
+            query=scope.get("query_string", b"").decode("latin-1"),
+            status=status_code,
+            elapsed_ms=round(elapsed_ms, 2),
+            ip=_get_client_ip(headers, client),
+            request_id=request_id,
+            sample_rate=sample_rate if not always else 1.0,
+        )
+        if self.log_headers:
+            # 调试模式下可输出头信息（已脱敏）
+            logger.debug(
+                f"headers: {_mask_headers(headers.to_dict(), self.sensitive_headers, self.mask_sensitive_headers)}"
             )
-            if self.log_headers:
-                # 调试模式下可输出头信息（已脱敏）
-                logger.debug(
-                    f"headers: {_mask_headers(headers, self.sensitive_headers, self.mask_sensitive_headers)}"
-                )
-            if self.log_body and body:
-                content_type = headers.get("content-type", "").lower()
-                body_text = body.decode("utf-8", errors="replace")
-                if "application/json" in content_type:
-                    # JSON 尝试解析为对象便于阅读
-                    try:
-                        body_data = json.loads(body_text)
-                    except Exception:
-                        body_data = body_text
-                else:
+        if self.log_body and body:
+            content_type = headers.get("content-type", "").lower()
+            body_text = body.decode("utf-8", errors="replace")
+            if "application/json" in content_type:
+                # JSON 尝试解析为对象便于阅读
+                try:
+                    body_data = json.loads(body_text)
+                except Exception:
                     body_data = body_text
-                logger.debug(f"body: {body_data}")
+            else:
+                body_data = body_text
+            logger.debug(f"body: {body_data}")
 
 
 MyMiddleware = RequestLoggingMiddleware
@@ -5,14 +5,25 @@
 # @File    : password_context.py
 # @Software: PyCharm
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
 
+from app.core.config import get_config
+from app.core.exceptions import CustomException
+
+project_config = get_config()
+
+_password_executor: ThreadPoolExecutor | None = None
+_pending = 0
+
 
 def hash_password(password: str) -> str:
     """加密密码"""
 
     # 生成盐
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=project_config.PASSWORD_BCRYPT_ROUNDS)
     # 使用盐加密密码
     hashed = bcrypt.hashpw(password.encode(), salt)
     return hashed.decode()
@@ -23,6 +34,57 @@ def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
 
+def password_needs_rehash(hashed: str) -> bool:
+    """哈希成本因子低于当前配置时需要重新加密"""
+
+    try:
+        rounds = int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return False
+    return rounds < project_config.PASSWORD_BCRYPT_ROUNDS
+
+
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        # bcrypt 计算时会释放 GIL, 线程池即可并行且不阻塞事件循环
+        _password_executor = ThreadPoolExecutor(
+            max_workers=project_config.PASSWORD_HASH_MAX_WORKERS,
+            thread_name_prefix="bcrypt",
+        )
+    return _password_executor
+
+
+async def _run_in_password_executor(func, *args):
+    global _pending
+    if _pending >= project_config.PASSWORD_HASH_MAX_PENDING:
+        raise CustomException(detail="系统繁忙，请稍后重试", custom_code=10008)
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_password_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """加密密码(线程池执行)"""
+    return await _run_in_password_executor(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """验证密码(线程池执行)"""
+    return await _run_in_password_executor(verify_password, password, hashed)
+
+
+def shutdown_password_executor():
+    """关闭 bcrypt 线程池"""
+
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
+
 if __name__ == '__main__':
     # 示例用法
     raw_password = "password123"
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : profiler.py
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from app.core.config import get_config
+from app.core.exceptions import CustomException
+
+project_config = get_config()
+
+"""
+在线采样分析
+    1.独立线程按固定间隔读取 sys._current_frames(), 统计各线程调用栈出现次数(统计式采样, 不修改被分析代码)
+    2.只在调用 profile() 期间运行, 空闲时没有线程也没有钩子
+    3.输出 collapsed(flamegraph.pl / speedscope 均可导入) 或 speedscope JSON
+    4.同一进程同时只允许一个采样任务
+"""
+
+PROFILE_FORMATS = ("collapsed", "speedscope")
+_profile_lock = threading.Lock()
+_root_dirs = tuple(sorted({os.path.dirname(os.path.dirname(os.path.abspath(__file__)))} | set(sys.path), key=len, reverse=True))
+
+Frame = tuple[str, str, int]  # (函数名, 文件, 首行号)
+
+
+def _short_path(filename: str) -> str:
+    for root in _root_dirs:
+        if root and filename.startswith(root):
+            return filename[len(root):].lstrip(os.sep) or filename
+    return filename
+
+
+class StackSampler:
+
+    def __init__(self, interval: float, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter[tuple[Frame, ...]] = Counter()
+        self.samples = 0
+
+    def sample_once(self, skip_thread_ids: set[int]):
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in skip_thread_ids:
+                continue
+            stack: list[Frame] = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append((code.co_name, _short_path(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            stack.append((f"thread:{thread_names.get(thread_id, thread_id)}", "", 0))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float):
+        """在当前线程阻塞采样 seconds 秒"""
+
+        skip = {threading.get_ident()}
+        deadline = time.perf_counter() + seconds
+        while True:
+            started_at = time.perf_counter()
+            if started_at >= deadline:
+                break
+            self.sample_once(skip)
+            time.sleep(max(self.interval - (time.perf_counter() - started_at), 0))
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, lineno = frame
+    return f"{name} ({filename}:{lineno})" if filename else name
+
+
+def to_collapsed(stacks: Counter) -> str:
+    return "\n".join(
+        f"{';'.join(_frame_label(frame) for frame in stack)} {count}" for stack, count in stacks.most_common()
+    )
+
+
+def to_speedscope(stacks: Counter, interval_ms: float, name: str) -> dict[str, Any]:
+    frame_index: dict[Frame, int] = {}
+    frames: list[dict[str, Any]] = []
+    samples: list[list[int]] = []
+    weights: list[float] = []
+    for stack, count in stacks.most_common():
+        indexes = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                item = {"name": frame[0]}
+                if frame[1]:
+                    item.update(file=frame[1], line=frame[2])
+                frames.append(item)
+            indexes.append(frame_index[frame])
+        samples.append(indexes)
+        weights.append(round(count * interval_ms, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+        "name": name,
+        "exporter": "exile-ai-test-platform",
+    }
+
+
+def profile(seconds: float, fmt: str = "collapsed", interval_ms: float | None = None) -> dict[str, Any]:
+    """
+    对当前进程所有线程采样 seconds 秒(阻塞调用, 异步代码中请放到线程中执行)
+    :return: {"pid", "seconds", "samples", "format", "profile"}
+    """
+
+    if fmt not in PROFILE_FORMATS:
+        raise CustomException(detail=f"不支持的格式: {fmt}", custom_code=10005)
+    if not 0 < seconds <= project_config.PROFILER_MAX_SECONDS:
+        raise CustomException(detail=f"采样时长需在 0~{project_config.PROFILER_MAX_SECONDS} 秒之间", custom_code=10005)
+    if not _profile_lock.acquire(blocking=False):
+        raise CustomException(detail="当前进程已有采样任务在执行", custom_code=10005)
+
+    interval_ms = interval_ms or project_config.PROFILER_INTERVAL_MS
+    try:
+        sampler = StackSampler(interval=interval_ms / 1000)
+        sampler.run(seconds)
+    finally:
+        _profile_lock.release()
+
+    name = f"pid {os.getpid()} ({seconds}s)"
+    data = to_collapsed(sampler.stacks) if fmt == "collapsed" else to_speedscope(sampler.stacks, interval_ms, name)
+    return {"pid": os.getpid(), "seconds": seconds, "samples": sampler.samples, "format": fmt, "profile": data}
@@ -27,6 +27,7 @@ def custom_http_dict(custom_code):
         10005: "业务校验错误",
         10006: "请求参数错误",
         10007: "未公开使用，非创建人，无法修改。",
+        10008: "系统繁忙",
     }
 
     message = code_dict.get(custom_code)
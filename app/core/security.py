@@ -7,6 +7,7 @@
 
 import json
 import secrets
+import time
 
 from fastapi import Depends, Header
 from loguru import logger
@@ -14,15 +15,71 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import app.db.redis_client as rp
+from app.core.auth_cache import admin_cache, invalidate_tokens, token_cache
+from app.core.config import get_config
 from app.core.exceptions import CustomException
-from app.db.redis_client import get_value, set_key_value
+from app.db.redis_client import get_cached_value, get_value
 from app.db.session import get_db_session
 from app.models.admin import Admin
 
+project_config = get_config()
+
+
+TOKEN_INDEX_PREFIX = "token_index:"
+TOKEN_INDEX_MIGRATED_KEY = "token_index:migrated"
+
+# 一次往返吊销用户全部 token: KEYS[1]=用户 token 索引; ARGV[1]=token key 前缀
+REVOKE_USER_TOKENS_SCRIPT = """
+local tokens = redis.call('zrange', KEYS[1], 0, -1)
+for _, token in ipairs(tokens) do
+    redis.call('del', token, ARGV[1] .. token)
+end
+redis.call('del', KEYS[1])
+return tokens
+"""
+
+# 旧 token 补建索引: KEYS[1]=用户 token 索引; ARGV[1]=token, ARGV[2]=过期时间戳, ARGV[3]=剩余秒数
+# 索引的过期时间只延长不缩短(不依赖 Redis 7 的 EXPIRE GT/NX 选项)
+MIGRATE_TOKEN_INDEX_SCRIPT = """
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[1])
+local ttl = tonumber(ARGV[3])
+if redis.call('ttl', KEYS[1]) < ttl then
+    redis.call('expire', KEYS[1], ttl)
+end
+return 1
+"""
+
+# 登录失败计数: KEYS[1]=计数 key; ARGV[1]=窗口秒数
+# 第一次失败时设置过期时间, 窗口从第一次失败开始(不依赖 Redis 7 的 EXPIRE NX 选项)
+RECORD_LOGIN_FAILURE_SCRIPT = """
+local failures = redis.call('incr', KEYS[1])
+if failures == 1 then
+    redis.call('expire', KEYS[1], ARGV[1])
+end
+return failures
+"""
+
+
+def build_token_key_prefix(admin_id, username) -> str:
+    """用户 token key 前缀: `tk_{id}_{username}_`"""
+    return f"tk_{admin_id}_{username}_"
+
+
+def build_token_index_key(key: str) -> str:
+    """用户有效 token 索引(ZSET: member=token, score=过期时间戳)"""
+    return f"{TOKEN_INDEX_PREFIX}{key}"
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
 
 class Token:
     """
     Token
+        tk_{id}_{username}_{token} -> token
+        {token} -> user_info
+        token_index:tk_{id}_{username}_ -> ZSET(token, 过期时间戳), 登录时写入并清理已过期成员, 退出时移除
     """
 
     def __init__(self):
@@ -54,39 +111,155 @@ class Token:
             user_info = json.loads(query_user_info)
             return user_info
 
+    async def _save_token(self, key: str, user_info_json_str: str):
+        """生成并保存 token(单次 pipeline 往返)"""
+
+        await self.gen_token()
+        now = int(time.time())
+        index_key = build_token_index_key(key)
+        async with rp.redis_pool.pipeline(transaction=True) as pipe:
+            pipe.set(f"{key}{self.token}", self.token, ex=self.timeout)  # 设置新token
+            pipe.set(self.token, user_info_json_str, ex=self.timeout)  # 设置用户信息
+            pipe.zremrangebyscore(index_key, "-inf", now)  # 清理已过期 token
+            pipe.zadd(index_key, {self.token: now + self.timeout})
+            pipe.expire(index_key, self.timeout)
+            await pipe.execute()
+
+    @staticmethod
+    async def revoke_user_tokens(key: str) -> list[str]:
+        """吊销用户全部 token, 返回被吊销的 token 列表"""
+
+        tokens = await rp.redis_pool.eval(REVOKE_USER_TOKENS_SCRIPT, 1, build_token_index_key(key), key)
+        tokens = [_decode(token) for token in tokens or []]
+        if tokens:
+            await invalidate_tokens(tokens)
+        return tokens
+
+    @staticmethod
+    async def revoke(token: str):
+        """吊销单个 token(退出/重置密码)"""
+
+        user_info = await Token.get_user_info(token)
+        async with rp.redis_pool.pipeline(transaction=True) as pipe:
+            pipe.delete(token)
+            if user_info:
+                key = build_token_key_prefix(user_info.get("id"), user_info.get("username"))
+                pipe.delete(f"{key}{token}")
+                pipe.zrem(build_token_index_key(key), token)
+            await pipe.execute()
+        await invalidate_tokens([token])
+
     async def single_login(self, key: str, user_info_json_str: str):
         """单点登录"""
 
-        # 获取该用户所有有效的key和token并且删除
-        old_key_list = await rp.redis_pool.keys(pattern=f"{key}*")
-        old_token_list = [await get_value(old_key) for old_key in old_key_list]
-        if old_key_list or old_token_list:
-            logger.debug(f"single_login revoke tokens: keys={len(old_key_list)} tokens={len(old_token_list)}")
-        if old_key_list:
-            await rp.redis_pool.delete(*old_key_list)
+        # 通过用户 token 索引吊销该用户所有有效 token
+        old_token_list = await self.revoke_user_tokens(key)
         if old_token_list:
-            await rp.redis_pool.delete(*old_token_list)
+            logger.debug(f"single_login revoke tokens: {len(old_token_list)}")
 
-        await self.gen_token()
-        await set_key_value(f"{key}{self.token}", self.token, self.timeout)  # 设置新token
-        await set_key_value(self.token, user_info_json_str, self.timeout)  # 设置用户信息
+        await self._save_token(key, user_info_json_str)
 
     async def many_login(self, key: str, user_info_json_str: str):
         """多点登录"""
 
-        await self.gen_token()
-        await set_key_value(f"{key}{self.token}", self.token, self.timeout)  # 设置新token
-        await set_key_value(self.token, user_info_json_str, self.timeout)  # 设置用户信息
+        await self._save_token(key, user_info_json_str)
+
+
+async def migrate_legacy_token_index(scan_count: int = 1000) -> int:
+    """
+    迁移旧 token 到用户索引(全局只执行一次)
+        旧版本只写入 `tk_{id}_{username}_{token}`, 这里通过 SCAN 增量遍历补建索引, 不会像 KEYS 一样阻塞 Redis
+        先以 NX 写入迁移标记避免多个实例重复执行, 迁移失败时删除标记, 下次启动重新迁移
+    :return: 迁移的 token 数量, 已迁移过返回 0
+    """
+
+    if not await rp.redis_pool.set(TOKEN_INDEX_MIGRATED_KEY, int(time.time()), nx=True):
+        return 0
+    try:
+        migrated = await _migrate_legacy_tokens(scan_count)
+    except BaseException:
+        await rp.redis_pool.delete(TOKEN_INDEX_MIGRATED_KEY)
+        raise
+    logger.info(f">>> 旧 token 索引迁移完成: {migrated}")
+    return migrated
+
+
+async def _migrate_legacy_tokens(scan_count: int) -> int:
+    migrated = 0
+    now = int(time.time())
+    batch: list[str] = []
+
+    async def flush_batch():
+        nonlocal migrated
+        async with rp.redis_pool.pipeline(transaction=False) as pipe:
+            for legacy_key in batch:
+                pipe.get(legacy_key)
+                pipe.ttl(legacy_key)
+            values = await pipe.execute()
+
+        async with rp.redis_pool.pipeline(transaction=False) as pipe:
+            for legacy_key, token, ttl in zip(batch, values[0::2], values[1::2]):
+                token = _decode(token)
+                if not token or ttl is None or ttl < 0 or not legacy_key.endswith(token):
+                    continue
+                index_key = build_token_index_key(legacy_key[:-len(token)])
+                pipe.eval(MIGRATE_TOKEN_INDEX_SCRIPT, 1, index_key, token, now + ttl, ttl)
+                migrated += 1
+            await pipe.execute()
+        batch.clear()
+
+    async for legacy_key in rp.redis_pool.scan_iter(match="tk_*", count=scan_count):
+        batch.append(_decode(legacy_key))
+        if len(batch) >= scan_count:
+            await flush_batch()
+    if batch:
+        await flush_batch()
+    return migrated
+
+
+def _login_failure_key(username: str) -> str:
+    return f"login_fail:{username}"
+
+
+async def check_login_throttle(username: str):
+    """同一用户名窗口内失败次数过多时拒绝登录(在 bcrypt 校验前拦截, 保护 CPU)"""
+
+    failures = await rp.redis_pool.get(_login_failure_key(username))
+    if failures and int(failures) >= project_config.LOGIN_THROTTLE_MAX_FAILURES:
+        ttl = await rp.redis_pool.ttl(_login_failure_key(username))
+        raise CustomException(detail=f"登录失败次数过多，请 {max(ttl, 1)} 秒后重试", custom_code=10005)
+
+
+async def record_login_failure(username: str) -> int:
+    """记录登录失败, 计数窗口从第一次失败开始"""
+
+    failures = await rp.redis_pool.eval(
+        RECORD_LOGIN_FAILURE_SCRIPT, 1, _login_failure_key(username), project_config.LOGIN_THROTTLE_WINDOW
+    )
+    return int(failures)
+
+
+async def reset_login_failures(username: str):
+    """登录成功后清除失败计数"""
+    await rp.redis_pool.delete(_login_failure_key(username))
 
 
 async def get_token_header(token: str = Header()):
     """校验token"""
 
-    query_user_info = await get_value(token)
+    if project_config.AUTH_CACHE_ENABLED:
+        cached_user_info = token_cache.get(token)
+        if cached_user_info is not None:
+            return dict(cached_user_info)  # 浅拷贝, 避免调用方修改缓存
+        cache_version = token_cache.version
+
+    query_user_info = await get_cached_value(token)
     if not query_user_info:
         raise CustomException(detail="未授权", custom_code=401)
     else:
         user_info = json.loads(query_user_info)
+        if project_config.AUTH_CACHE_ENABLED:
+            token_cache.set(token, dict(user_info), version=cache_version)
         return user_info
 
 
@@ -100,8 +273,18 @@ async def check_admin_existence(
         admin_id = int(user_info.get("id"))
     except (TypeError, ValueError):
         raise CustomException(detail="无效的用户身份", custom_code=401)
+
+    if project_config.AUTH_CACHE_ENABLED:
+        cached_admin = admin_cache.get(admin_id)
+        if cached_admin is not None:
+            # 每次返回新的游离对象, 不与任何会话关联
+            return Admin(**cached_admin)
+        cache_version = admin_cache.version
+
     stmt = select(Admin).where(Admin.id == admin_id)
     admin = (await db.execute(stmt)).scalars().first()
     if not admin:
         raise CustomException(detail=f"后台用户 {admin_id} 不存在", custom_code=10002)
+    if project_config.AUTH_CACHE_ENABLED:
+        admin_cache.set(admin_id, admin.to_dict(exclude={"password"}), version=cache_version)
     return admin
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : query_stats.py
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_config
+
+project_config = get_config()
+
+"""
+SQL 查询统计
+    1.通过 SQLAlchemy before/after_cursor_execute 事件统计语句数与耗时, 统计对象放在 ContextVar 中,
+      每个 HTTP 请求/场景运行各自独立(异步引擎的 greenlet 会继承当前协程的上下文)
+    2.同一语句(参数化后的 SQL 文本, 即语句形状)在一次统计内重复超过 DB_N_PLUS_ONE_THRESHOLD 次时告警, 每种语句只告警一次
+    3.嵌套统计(例如接口内执行场景)结束时会把数据累加到外层
+"""
+
+_current_stats: ContextVar["QueryStats | None"] = ContextVar("db_query_stats", default=None)
+
+
+def _statement_shape(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+class QueryStats:
+    """一次请求/场景运行内的 SQL 统计"""
+
+    __slots__ = ("label", "threshold", "queries", "elapsed", "statements", "warned", "_parent")
+
+    def __init__(self, label: str, threshold: int | None = None):
+        self.label = label
+        self.threshold = project_config.DB_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.queries = 0
+        self.elapsed = 0.0
+        self.statements: dict[str, int] = {}
+        self.warned: set[str] = set()
+        self._parent: QueryStats | None = None
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round(self.elapsed * 1000, 1)
+
+    def record(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.elapsed += elapsed
+        shape = _statement_shape(statement)
+        count = self.statements.get(shape, 0) + 1
+        self.statements[shape] = count
+        if self.threshold > 0 and count > self.threshold and shape not in self.warned:
+            self.warned.add(shape)
+            logger.warning(f"疑似 N+1 查询: [{self.label}] 同一语句已执行 {count} 次: {shape[:500]}")
+
+    def merge_into(self, other: "QueryStats"):
+        other.queries += self.queries
+        other.elapsed += self.elapsed
+        for shape, count in self.statements.items():
+            other.statements[shape] = other.statements.get(shape, 0) + count
+
+    def to_dict(self) -> dict:
+        return {"queries": self.queries, "time_ms": self.elapsed_ms}
+
+
+def get_query_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[QueryStats]:
+    """在当前上下文内统计 SQL, 退出时累加到外层统计"""
+
+    stats = QueryStats(label)
+    stats._parent = _current_stats.get()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        if stats._parent is not None:
+            stats.merge_into(stats._parent)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    start_list = conn.info.get("query_start_time")
+    elapsed = time.perf_counter() - start_list.pop() if start_list else 0.0
+    stats.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    start_list = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if start_list:
+        start_list.pop()
+
+
+def install_query_stats(engine: Engine):
+    """为同步引擎(异步引擎传 engine.sync_engine)注册统计事件, 重复调用无副作用"""
+
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """按 HTTP 请求统计 SQL, 非生产环境通过 x-db-queries / x-db-time(毫秒) 响应头返回"""
+
+    def __init__(self, app: ASGIApp, expose_headers: bool = False, exclude_paths=None):
+        self.app = app
+        self.expose_headers = expose_headers
+        self.exclude_paths = set(exclude_paths or [])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope.get('method', '')} {scope.get('path', '')}"
+        with track_queries(label) as stats:
+
+            async def send_wrapper(message):
+                if self.expose_headers and message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-db-queries", str(stats.queries).encode("latin-1")))
+                    headers.append((b"x-db-time", str(stats.elapsed_ms).encode("latin-1")))
+                    message["headers"] = headers
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -6,12 +6,16 @@
 # @Software: PyCharm
 
 
-from typing import Optional
+from collections.abc import AsyncIterator, Iterable, Mapping
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
 
 from loguru import logger
-from redis.asyncio import Redis
+from redis.asyncio import BlockingConnectionPool, Redis
 
 from app.core.config import get_config
+from app.db.redis_client_cache import RedisClientCache
 
 project_config = get_config()
 REDIS_URL = project_config.redis_url
@@ -34,6 +38,25 @@ REDIS_URL = project_config.redis_url
 
 """
 redis_pool: Optional[Redis] = None
+# Celery 任务自己的连接池(只在创建它的事件循环内使用), 由 worker_redis_pool() 设置
+_task_redis_pool: ContextVar[Optional[Redis]] = ContextVar("task_redis_pool", default=None)
+client_cache: Optional[RedisClientCache] = None  # 热点只读键的客户端缓存, REDIS_CLIENT_CACHE_ENABLED=True 时启用
+
+
+def build_connection_pool() -> BlockingConnectionPool:
+    """
+    有界连接池
+        连接数达到 REDIS_MAX_CONNECTIONS 后等待空闲连接(最多 REDIS_POOL_TIMEOUT 秒), 而不是无限新建连接
+    """
+    return BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=project_config.REDIS_MAX_CONNECTIONS,
+        timeout=project_config.REDIS_POOL_TIMEOUT,
+        socket_timeout=project_config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=project_config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        socket_keepalive=True,
+        health_check_interval=project_config.REDIS_HEALTH_CHECK_INTERVAL,
+    )
 
 
 async def create_redis_connection_pool(force: bool = False) -> Redis:
@@ -43,14 +66,31 @@ async def create_redis_connection_pool(force: bool = False) -> Redis:
         return redis_pool
     if redis_pool and force:
         await close_redis_connection_pool()
-    redis_pool = Redis.from_url(REDIS_URL)
-    logger.info("Redis 连接池已创建")
+    redis_pool = Redis.from_pool(build_connection_pool())
+    logger.info(f"Redis 连接池已创建: max_connections={project_config.REDIS_MAX_CONNECTIONS}")
+    if project_config.REDIS_CLIENT_CACHE_ENABLED:
+        start_client_cache(redis_pool)
     return redis_pool
 
 
+def start_client_cache(redis: Redis) -> RedisClientCache:
+    """启用客户端缓存"""
+    global client_cache
+    client_cache = RedisClientCache(
+        redis,
+        maxsize=project_config.REDIS_CLIENT_CACHE_MAXSIZE,
+        ttl=project_config.REDIS_CLIENT_CACHE_TTL,
+    )
+    client_cache.start()
+    return client_cache
+
+
 async def close_redis_connection_pool():
     """在应用关闭时关闭连接池"""
-    global redis_pool
+    global redis_pool, client_cache
+    if client_cache:
+        await client_cache.stop()
+        client_cache = None
     if redis_pool:
         # redis-py 5.x 推荐使用 aclose()
         close_method = getattr(redis_pool, "aclose", None)
@@ -62,6 +102,32 @@ async def close_redis_connection_pool():
         logger.info("Redis 连接池已关闭")
 
 
+@asynccontextmanager
+async def worker_redis_pool() -> AsyncIterator[Redis]:
+    """
+    Celery 任务内使用: 每个任务在自己的事件循环中执行(threads 池下多个任务并行, 各自 asyncio.run),
+    连接不能跨事件循环使用, 因此每个任务创建自己的连接池并保存在 ContextVar 中(不写入全局 redis_pool),
+    任务结束时只关闭自己创建的连接池; 嵌套调用时复用外层任务的连接池
+    """
+    current = _task_redis_pool.get()
+    if current is not None:
+        yield current
+        return
+    pool = Redis.from_pool(build_connection_pool())
+    token = _task_redis_pool.set(pool)
+    try:
+        yield pool
+    finally:
+        _task_redis_pool.reset(token)
+        await pool.aclose()
+
+
+def current_redis() -> Optional[Redis]:
+    """当前事件循环可用的连接池: Celery 任务内为任务自己的连接池, 否则为应用的全局连接池"""
+    task_pool = _task_redis_pool.get()
+    return task_pool if task_pool is not None else redis_pool
+
+
 async def get_redis_pool() -> Redis:
     """获取连接池，未初始化时抛出异常"""
     if not redis_pool:
@@ -88,18 +154,37 @@ async def delete_value(key):
     await pool.delete(key)
 
 
-async def redis_one_get(k):
-    """单点连接"""
+async def get_cached_value(key):
+    """获取热点只读键的值(优先客户端缓存, 未启用时等同 get_value)"""
+    if client_cache is not None:
+        return await client_cache.get(key)
+    return await get_value(key)
 
-    redis = Redis.from_url(REDIS_URL)
-    res = await redis.get(k)
-    await redis.close()
-    return res
+
+async def get_values(keys: Iterable[str]) -> list[Any]:
+    """批量获取(MGET, 单次往返)"""
+    keys = list(keys)
+    if not keys:
+        return []
+    pool = await get_redis_pool()
+    return await pool.mget(keys)
 
 
-async def redis_one_set(k, v):
-    """单点连接"""
+async def set_values(mapping: Mapping[str, Any], ex=None):
+    """批量设置(pipeline, 单次往返)"""
+    if not mapping:
+        return
+    pool = await get_redis_pool()
+    async with pool.pipeline(transaction=False) as pipe:
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=ex)
+        await pipe.execute()
 
-    redis = Redis.from_url(REDIS_URL)
-    await redis.set(k, v)
-    await redis.close()
+
+async def delete_values(keys: Iterable[str]) -> int:
+    """批量删除"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    pool = await get_redis_pool()
+    return await pool.delete(*keys)
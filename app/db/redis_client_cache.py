@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : redis_client_cache.py
+
+import asyncio
+import math
+from contextlib import suppress
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.utils.ttl_cache import TTLLRUCache
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+def _to_str(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisClientCache:
+    """
+    Redis 服务端辅助的客户端缓存(CLIENT TRACKING ... REDIRECT)
+        1.tracking 连接负责读取热点键, Redis 会记住该连接读过的键
+        2.键被任意客户端修改/删除/过期后, Redis 将失效消息推送到订阅 __redis__:invalidate 的 listen 连接
+        3.两条连接都独立于连接池; 任一连接异常时清空本地缓存并重建, 重建期间直接读连接池
+        4.本地缓存另设兜底 TTL, 极端情况下丢失失效消息时最多缓存 ttl 秒
+    """
+
+    def __init__(self, redis: Redis, maxsize: int, ttl: float, retry_interval: float = 3):
+        self.redis = redis
+        self.retry_interval = retry_interval
+        self._cache = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+        self._listen_conn = None
+        self._tracking_conn = None
+        self._tracking_lock = asyncio.Lock()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _make_connection(self, **overrides):
+        pool = self.redis.connection_pool
+        return pool.connection_class(**{**pool.connection_kwargs, **overrides})
+
+    async def _command(self, conn, *args):
+        await conn.send_command(*args)
+        return await conn.read_response()
+
+    async def _setup(self):
+        # 失效消息连接长时间空闲, 不使用连接池的 socket_timeout(否则空闲超时后断开重建, 期间的失效消息丢失)
+        self._listen_conn = self._make_connection(socket_timeout=None)
+        await self._listen_conn.connect()
+        client_id = await self._command(self._listen_conn, "CLIENT", "ID")
+        await self._command(self._listen_conn, "SUBSCRIBE", INVALIDATE_CHANNEL)
+
+        self._tracking_conn = self._make_connection()
+        await self._tracking_conn.connect()
+        await self._command(self._tracking_conn, "CLIENT", "TRACKING", "ON", "REDIRECT", client_id)
+
+    async def _teardown(self):
+        self._ready.clear()
+        self._cache.clear()
+        for conn in (self._listen_conn, self._tracking_conn):
+            if conn is not None:
+                with suppress(Exception):
+                    await conn.disconnect()
+        self._listen_conn = None
+        self._tracking_conn = None
+
+    def _apply_invalidation(self, keys):
+        if keys is None:  # FLUSHDB/FLUSHALL
+            self._cache.clear()
+            return
+        for key in keys:
+            self._cache.pop(_to_str(key))
+
+    async def _run(self):
+        while True:
+            try:
+                await self._setup()
+                self._ready.set()
+                logger.info(">>> Redis 客户端缓存已启用")
+                while True:
+                    message = await self._listen_conn.read_response(timeout=math.inf, disconnect_on_error=False)
+                    if isinstance(message, list) and len(message) == 3 and _to_str(message[0]) == "message":
+                        self._apply_invalidation(message[2])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Redis 客户端缓存连接异常，{self.retry_interval} 秒后重建")
+            finally:
+                await self._teardown()
+            await asyncio.sleep(self.retry_interval)
+
+    def start(self):
+        """启动失效监听(后台任务)"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止失效监听并清空缓存"""
+        if not self._task:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def get(self, key: str):
+        """读取键值, 命中本地缓存时不访问 Redis"""
+
+        if not self.ready:
+            return await self.redis.get(key)
+
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+
+        version = self._cache.version
+        try:
+            async with self._tracking_lock:
+                value = await self._command(self._tracking_conn, "GET", key)
+        except Exception:
+            # tracking 连接不可用时让后台任务重建, 本次请求回落到连接池
+            logger.exception("Redis 客户端缓存读取失败，回落到连接池")
+            if self._listen_conn is not None:
+                with suppress(Exception):
+                    await self._listen_conn.disconnect()
+            return await self.redis.get(key)
+
+        if value is not None:
+            # 读取期间收到失效消息时 version 已变化, 不会回填旧值
+            self._cache.set(key, value, version=version)
+        return value
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : redis_pubsub.py
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from typing import Any
+
+from loguru import logger
+
+from app.db.redis_client import get_redis_pool
+
+
+async def publish_message(channel: str, data: dict[str, Any]) -> int:
+    """发布广播消息，返回收到消息的订阅者数量"""
+    pool = await get_redis_pool()
+    return await pool.publish(channel, json.dumps(data, ensure_ascii=False))
+
+
+class RedisChannelSubscriber:
+    """
+    Redis pub/sub 订阅器
+        1.每个进程独立订阅，收到消息后调用 handler(data)
+        2.连接断开后按 retry_interval 秒自动重连
+        3.handler 异常只记录日志，不影响后续消息
+        4.以 get_message(timeout=poll_timeout) 轮询读取: 连接池配置的 socket_timeout 同样作用于 listen(),
+          空闲超过该时长会抛出 TimeoutError 导致重连, 重连间隙发布的消息会丢失; 显式传入 timeout 时空闲只返回 None
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        retry_interval: float = 3,
+        poll_timeout: float = 1.0,
+    ):
+        self.channel = channel
+        self.handler = handler
+        self.retry_interval = retry_interval
+        self.poll_timeout = poll_timeout
+        self._task: asyncio.Task | None = None
+
+    async def _dispatch(self, message: dict):
+        if message.get("type") != "message":
+            return
+        raw_data = message.get("data")
+        if isinstance(raw_data, bytes):
+            raw_data = raw_data.decode()
+        try:
+            data = json.loads(raw_data)
+        except Exception:
+            logger.warning(f"Redis 订阅消息格式错误: channel={self.channel}, data={raw_data!r}")
+            return
+        try:
+            await self.handler(data)
+        except Exception:
+            logger.exception(f"Redis 订阅消息处理失败: channel={self.channel}, data={data}")
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                pool = await get_redis_pool()
+                pubsub = pool.pubsub()
+                await pubsub.subscribe(self.channel)
+                logger.info(f">>> Redis 订阅已建立: {self.channel}")
+                while True:
+                    message = await pubsub.get_message(timeout=self.poll_timeout)
+                    if message is not None:
+                        await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Redis 订阅连接异常，{self.retry_interval} 秒后重连: {self.channel}")
+                await asyncio.sleep(self.retry_interval)
+            finally:
+                if pubsub is not None:
+                    with suppress(Exception):
+                        await pubsub.aclose()
+
+    def start(self):
+        """启动订阅(后台任务)"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """停止订阅"""
+        if not self._task:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
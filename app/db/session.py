@@ -10,6 +10,7 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import get_config
+from app.db.query_stats import install_query_stats
 
 project_config = get_config()
 
@@ -20,6 +21,9 @@ engine = create_async_engine(
     echo=project_config.DEBUG,
 )
 
+if project_config.DB_QUERY_STATS_ENABLED:
+    install_query_stats(engine.sync_engine)
+
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 
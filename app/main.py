@@ -15,7 +15,10 @@ from app.api.v1.router import api_router
 from app.core.config import get_config
 from app.core.exception_handlers import register_exception_handlers
 from app.core.lifespan import lifespan
+from app.core.log_config import setup_logging
+from app.core.metrics import PrometheusMiddleware, metrics_router
 from app.core.middleware import MyMiddleware
+from app.db.query_stats import QueryStatsMiddleware
 
 project_config = get_config()
 
@@ -23,6 +26,8 @@ project_config = get_config()
 def create_app():
     """app实例"""
 
+    setup_logging()
+
     debug = project_config.DEBUG
     kw = {
         "debug": debug
@@ -49,7 +54,8 @@ def create_app():
         allow_origins=["*"],
         allow_credentials=False,
         allow_methods=["*"],
-        allow_headers=["*"]
+        allow_headers=["*"],
+        expose_headers=["x-db-queries", "x-db-time"],
     )
 
     # 中间件注册(全局拦截器)(一个或多个)
@@ -71,15 +77,29 @@ def create_app():
         MyMiddleware,
         log_headers=debug,
         log_body=debug,
-        exclude_paths=["/docs", "/openapi.json", "/redoc", "/static*"],
+        exclude_paths=["/docs", "/openapi.json", "/redoc", "/static*", "/metrics"],
         sensitive_headers=project_config.SENSITIVE_HEADERS,
         mask_sensitive_headers=project_config.MASK_SENSITIVE_HEADERS,
+        sample_rates=project_config.ACCESS_LOG_SAMPLE_RATES,
+        slow_ms=project_config.ACCESS_LOG_SLOW_MS,
     )
 
+    if project_config.DB_QUERY_STATS_ENABLED:
+        app.add_middleware(
+            QueryStatsMiddleware,
+            expose_headers=project_config.DB_QUERY_STATS_HEADERS and not project_config.IS_PROD,
+            exclude_paths=["/metrics"],
+        )
+
+    if project_config.METRICS_ENABLED:
+        app.add_middleware(PrometheusMiddleware, exclude_paths=["/metrics"])
+
     register_exception_handlers(app, debug)
 
     # 路由注册
     app.include_router(api_router)
+    if project_config.METRICS_ENABLED:
+        app.include_router(metrics_router)
 
     # 静态资源(生产环境通过配置获取路径)
     static_dir = Path(__file__).resolve().parent / "static"
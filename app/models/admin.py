@@ -6,7 +6,7 @@
 from sqlalchemy import BigInteger, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
-from app.core.password import hash_password, verify_password
+from app.core.password import hash_password_async, password_needs_rehash, verify_password_async
 from app.models.base import CustomBaseModel
 
 
@@ -34,7 +34,10 @@ class Admin(CustomBaseModel):
     remark: Mapped[str | None] = mapped_column(String(255), nullable=True, comment="备注")
 
     async def set_password(self, raw_password: str):
-        self.password = hash_password(raw_password)
+        self.password = await hash_password_async(raw_password)
 
     async def verify_password(self, raw_password: str):
-        return verify_password(raw_password, self.password)
+        return await verify_password_async(raw_password, self.password)
+
+    def password_needs_rehash(self) -> bool:
+        return password_needs_rehash(self.password)
@@ -5,7 +5,7 @@
 
 from typing import Any
 
-from sqlalchemy import JSON, BigInteger, Boolean, Integer, String, Text
+from sqlalchemy import JSON, BigInteger, Boolean, Float, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import CustomBaseModel
@@ -19,6 +19,12 @@ class ApiEnvironment(CustomBaseModel):
     name: Mapped[str] = mapped_column(String(128), nullable=False, comment="环境名称")
     variables: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict, comment="环境变量字典")
     is_default: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, comment="是否默认环境")
+    max_concurrency: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, comment="每个目标主机最大并发请求数(执行器自适应并发上限的硬上限), 为空不限制"
+    )
+    rate_limit_rps: Mapped[float | None] = mapped_column(
+        Float, nullable=True, comment="每个目标主机每秒请求数上限(所有 worker 共享), 为空不限制"
+    )
 
 
 class ApiRequest(CustomBaseModel):
@@ -73,6 +79,12 @@ class ApiRequest(CustomBaseModel):
         comment="数据集执行模式:single/all",
     )
     default_dataset_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True, comment="默认数据集ID")
+    coalesce_enabled: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, comment="是否合并并发的相同请求(仅 GET/HEAD/OPTIONS)"
+    )
+    retry_policy: Mapped[dict | None] = mapped_column(
+        JSON, nullable=True, comment="重试策略:max_attempts/retry_status_codes/retry_exceptions/backoff_ms/deadline_ms/hedge 等"
+    )
 
 
 class ApiRequestDataset(CustomBaseModel):
@@ -140,6 +152,9 @@ class TestScenarioCase(CustomBaseModel):
     )
     is_enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, comment="是否启用")
     stop_on_fail: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True, comment="步骤失败是否中断")
+    retry_policy: Mapped[dict | None] = mapped_column(
+        JSON, nullable=True, comment="重试策略覆盖(按字段覆盖测试用例的重试策略)"
+    )
 
 
 class ApiRequestRun(CustomBaseModel):
@@ -159,9 +174,18 @@ class ApiRequestRun(CustomBaseModel):
     response_headers: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict, comment="响应头")
     response_body: Mapped[str | None] = mapped_column(Text, nullable=True, comment="响应体")
     response_time_ms: Mapped[int | None] = mapped_column(Integer, nullable=True, comment="响应耗时(毫秒)")
+    phase_timings: Mapped[dict | None] = mapped_column(
+        JSON, nullable=True, comment="请求阶段耗时(毫秒):setup/connect/tls/send/ttfb/download/total"
+    )
 
     is_success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, comment="执行是否成功")
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True, comment="执行错误信息")
+    coalesced: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, comment="是否复用了其它执行中相同请求的结果(未单独发送)"
+    )
+    attempts: Mapped[list | None] = mapped_column(
+        JSON, nullable=True, comment="重试/对冲的每次尝试:[{n, status, ms, error, hedged, winner, backoff_ms}]"
+    )
 
 
 class ApiExtractRule(CustomBaseModel):
@@ -227,6 +251,11 @@ class TestScenarioRun(CustomBaseModel):
     is_success: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, comment="场景执行是否成功")
     runtime_variables: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict, comment="执行结束时变量上下文快照")
     error_message: Mapped[str | None] = mapped_column(Text, nullable=True, comment="场景执行错误信息")
+    cassette_name: Mapped[str | None] = mapped_column(String(128), nullable=True, comment="录制文件名称")
+    cassette_mode: Mapped[str | None] = mapped_column(
+        String(16), nullable=True, comment="录制回放模式:record/replay, 为空正常发送"
+    )
+    timeline: Mapped[dict | None] = mapped_column(JSON, nullable=True, comment="执行瀑布图(各步骤/请求/断言/提取/落库的相对偏移与耗时)")
 
 
 class ApiRunVariable(CustomBaseModel):
@@ -5,6 +5,7 @@
 
 from typing import Any, Literal, Optional
 
+import httpx
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from app.schemas.pagination import CommonPage
@@ -24,6 +25,42 @@ ASSERT_TYPE_VALUES = {"status_code", "json_path", "text_contains"}
 ASSERT_COMPARATOR_VALUES = {"eq", "ne", "contains", "not_contains"}
 
 
+class ApiRetryPolicy(BaseModel):
+    """重试策略, 未传的字段使用默认值(场景步骤上配置时只覆盖传入的字段)"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    max_attempts: Optional[int] = Field(default=None, ge=1, le=10, description="最大尝试次数(含首次), 默认1")
+    retry_status_codes: Optional[list[int]] = Field(default=None, description="需要重试的状态码, 默认[502, 503, 504]")
+    retry_exceptions: Optional[list[str]] = Field(
+        default=None,
+        description="需要重试的异常(httpx 异常类名, 含子类), 默认[ConnectError, ConnectTimeout, ReadError, RemoteProtocolError]",
+    )
+    backoff_ms: Optional[int] = Field(default=None, ge=0, description="首次重试等待(毫秒), 默认200")
+    backoff_multiplier: Optional[float] = Field(default=None, ge=1, description="退避倍数, 默认2")
+    max_backoff_ms: Optional[int] = Field(default=None, ge=0, description="单次等待上限(毫秒), 默认5000")
+    jitter: Optional[bool] = Field(default=None, description="等待时间是否随机(0~退避时间), 默认true")
+    deadline_ms: Optional[int] = Field(default=None, ge=1, description="所有尝试的总时长上限(毫秒)")
+    hedge: Optional[bool] = Field(default=None, description="是否对 GET/HEAD/OPTIONS 发送对冲请求, 默认false")
+    hedge_delay_ms: Optional[int] = Field(
+        default=None, ge=1, description="发送对冲请求前的等待(毫秒), 为空取该目标最近请求的 p95 耗时"
+    )
+
+    @field_validator("retry_exceptions")
+    @classmethod
+    def validate_retry_exceptions(cls, value: Optional[list[str]]) -> Optional[list[str]]:
+        if value is None:
+            return value
+        invalid = [
+            name
+            for name in value
+            if not (isinstance(getattr(httpx, name, None), type) and issubclass(getattr(httpx, name), Exception))
+        ]
+        if invalid:
+            raise ValueError(f"retry_exceptions 必须是 httpx 异常类名: {invalid}")
+        return value
+
+
 class ApiRequestCreateReqData(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
@@ -55,6 +92,8 @@ class ApiRequestCreateReqData(BaseModel):
     data_driven_enabled: bool = Field(default=True, description="是否开启数据驱动")
     dataset_run_mode: Literal["single", "all"] = Field(default="all", description="数据集执行模式")
     default_dataset_id: Optional[int] = Field(default=None, description="默认数据集ID")
+    coalesce_enabled: bool = Field(default=False, description="是否合并并发的相同请求(仅 GET/HEAD/OPTIONS)")
+    retry_policy: Optional[ApiRetryPolicy] = Field(default=None, description="重试策略")
 
     @field_validator("method")
     @classmethod
@@ -104,6 +143,8 @@ class ApiRequestUpdateReqData(BaseModel):
     data_driven_enabled: Optional[bool] = Field(default=None, description="是否开启数据驱动")
     dataset_run_mode: Optional[Literal["single", "all"]] = Field(default=None, description="数据集执行模式")
     default_dataset_id: Optional[int] = Field(default=None, description="默认数据集ID")
+    coalesce_enabled: Optional[bool] = Field(default=None, description="是否合并并发的相同请求(仅 GET/HEAD/OPTIONS)")
+    retry_policy: Optional[ApiRetryPolicy] = Field(default=None, description="重试策略")
 
     @field_validator("method")
     @classmethod
@@ -224,6 +265,26 @@ class ApiRequestRunReqData(BaseModel):
     env_id: Optional[int] = Field(default=None, description="覆盖环境ID")
 
 
+class ApiRequestLoadStage(BaseModel):
+    duration: float = Field(gt=0, description="阶段时长(秒)")
+    target_rps: float = Field(ge=0, description="阶段结束时的目标RPS(阶段内从上一阶段线性变化)")
+
+
+class ApiRequestLoadRunReqData(BaseModel):
+    request_id: int = Field(description="测试用例ID")
+    env_id: Optional[int] = Field(default=None, description="覆盖环境ID")
+    dataset_ids: Optional[list[int]] = Field(default=None, description="轮换使用的数据集ID(为空时使用全部启用的数据集)")
+    start_rps: float = Field(default=0, ge=0, description="起始RPS")
+    stages: list[ApiRequestLoadStage] = Field(min_length=1, description="阶段配置, 例如爬升到100RPS后保持60秒")
+    max_in_flight: int = Field(default=100, ge=1, description="最大并发请求数")
+    abort_error_rate: Optional[float] = Field(default=None, ge=0, le=1, description="总体错误率超过该值时终止压测")
+
+
+class ApiRequestDistributedLoadRunReqData(ApiRequestLoadRunReqData):
+    max_in_flight: int = Field(default=100, ge=1, description="每个分片的最大并发请求数")
+    shards: int = Field(default=2, ge=1, description="分片数(每个分片由一个 Celery worker 执行)")
+
+
 class ApiExtractRuleCreateReqData(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : aps_task.py
+
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from app.schemas.pagination import CommonPage
+
+APS_TASK_TRIGGER_PARAM_KEYS = {
+    "trigger_time",
+    "interval_kw",
+    "cron_expression",
+    "jitter",
+    "coalesce",
+    "misfire_grace_time",
+    "max_instances",
+}
+
+
+def _validate_trigger_param(value: Optional[dict]) -> Optional[dict]:
+    if value is None:
+        return value
+    unknown_keys = set(value) - APS_TASK_TRIGGER_PARAM_KEYS
+    if unknown_keys:
+        raise ValueError(f"trigger_param 不支持的字段: {', '.join(sorted(unknown_keys))}")
+    return value
+
+
+def _validate_task_function_name(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    from app.tasks.tasks import SCHEDULABLE_TASKS
+
+    if value not in SCHEDULABLE_TASKS:
+        raise ValueError(f"task_function_name 必须是: {', '.join(sorted(SCHEDULABLE_TASKS))}")
+    return value
+
+
+class ApsTaskCreateReqData(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    task_id: str = Field(description="任务ID", min_length=1, max_length=64)
+    trigger_type: Literal["date", "interval", "cron"] = Field(description="触发器类型")
+    trigger_param: dict = Field(
+        description="触发器参数: date->trigger_time; interval->interval_kw; cron->cron_expression; "
+                    "可选 jitter/coalesce/misfire_grace_time/max_instances",
+    )
+    task_function_name: str = Field(description="任务函数名称", min_length=1, max_length=255)
+    task_function_args: list = Field(default_factory=list, description="任务参数:args")
+    task_function_kwargs: dict = Field(default_factory=dict, description="任务参数:kwargs")
+
+    @field_validator("trigger_param")
+    @classmethod
+    def validate_trigger_param(cls, value):
+        return _validate_trigger_param(value)
+
+    @field_validator("task_function_name")
+    @classmethod
+    def validate_task_function_name(cls, value):
+        return _validate_task_function_name(value)
+
+
+class ApsTaskUpdateReqData(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    id: int = Field(description="定时任务主键ID")
+    trigger_type: Optional[Literal["date", "interval", "cron"]] = Field(default=None, description="触发器类型")
+    trigger_param: Optional[dict] = Field(default=None, description="触发器参数")
+    task_function_name: Optional[str] = Field(default=None, description="任务函数名称", min_length=1, max_length=255)
+    task_function_args: Optional[list] = Field(default=None, description="任务参数:args")
+    task_function_kwargs: Optional[dict] = Field(default=None, description="任务参数:kwargs")
+
+    @field_validator("trigger_param")
+    @classmethod
+    def validate_trigger_param(cls, value):
+        return _validate_trigger_param(value)
+
+    @field_validator("task_function_name")
+    @classmethod
+    def validate_task_function_name(cls, value):
+        return _validate_task_function_name(value)
+
+
+class ApsTaskDeleteReqData(BaseModel):
+    id: int = Field(description="定时任务主键ID")
+
+
+class ApsTaskPageReqData(CommonPage):
+    is_deleted: int = 0
+    task_id: Optional[str] = None
+    trigger_type: Optional[Literal["date", "interval", "cron", "", None]] = None
+    task_function_name: Optional[str] = None
@@ -7,6 +7,7 @@ from typing import Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
+from app.schemas.api_request import ApiRetryPolicy
 from app.schemas.pagination import CommonPage
 
 SCENARIO_RUN_MODE_VALUES = {"sequence", "parallel"}
@@ -60,6 +61,7 @@ class TestScenarioCaseCreateReqData(BaseModel):
     )
     is_enabled: bool = Field(default=True, description="是否启用")
     stop_on_fail: bool = Field(default=True, description="步骤失败是否中断")
+    retry_policy: Optional[ApiRetryPolicy] = Field(default=None, description="重试策略覆盖(按字段覆盖测试用例的重试策略)")
 
     @model_validator(mode="after")
     def validate_dataset_mode(self):
@@ -80,6 +82,7 @@ class TestScenarioCaseUpdateReqData(BaseModel):
     )
     is_enabled: Optional[bool] = Field(default=None, description="是否启用")
     stop_on_fail: Optional[bool] = Field(default=None, description="步骤失败是否中断")
+    retry_policy: Optional[ApiRetryPolicy] = Field(default=None, description="重试策略覆盖(按字段覆盖测试用例的重试策略)")
 
     @model_validator(mode="after")
     def validate_dataset_mode(self):
@@ -125,6 +128,18 @@ class TestScenarioRunReqData(BaseModel):
     env_id: Optional[int] = Field(default=None, description="覆盖环境ID")
     trigger_type: Literal["manual", "schedule"] = Field(default="manual", description="触发类型")
     initial_variables: dict = Field(default_factory=dict, description="初始变量上下文")
+    cassette_name: Optional[str] = Field(
+        default=None, pattern=r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,127}$", description="录制文件名称"
+    )
+    cassette_mode: Optional[Literal["record", "replay"]] = Field(
+        default=None, description="录制回放模式:record(发送并录制)/replay(只从录制文件回放, 不访问网络)"
+    )
+
+    @model_validator(mode="after")
+    def validate_cassette(self):
+        if (self.cassette_name is None) != (self.cassette_mode is None):
+            raise ValueError("cassette_name 与 cassette_mode 需同时传入")
+        return self
 
 
 class TestScenarioCancelRunReqData(BaseModel):
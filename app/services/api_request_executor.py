@@ -7,11 +7,20 @@ import copy
 import json
 import re
 import time
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
 import httpx
 
+from app.core.metrics import observe_executor_request
 from app.models.api_request import ApiEnvironment, ApiRequest, ApiRequestDataset
+from app.services.cassette import Cassette
+from app.services.circuit_breaker import CircuitCall, CircuitOpenError, circuit_breaker
+from app.services.host_limiter import HostSlot, host_limiter
+from app.services.http_phase_timer import HttpPhaseTimer
+from app.services.rate_limiter import RateLimitTimeout, rate_limiter
+from app.services.request_coalescer import request_coalescer
+from app.services.retry_policy import execute_with_retry, resolve_retry_policy
 
 VARIABLE_PATTERN = re.compile(r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\}\}")
 MAX_RESPONSE_BODY_LENGTH = 200000
@@ -153,8 +162,60 @@ def _build_http_request_kwargs(request_snapshot: dict[str, Any]) -> dict[str, An
     return {k: v for k, v in kwargs.items() if v is not None}
 
 
-async def _execute_http_request(request_snapshot: dict[str, Any]) -> dict[str, Any]:
+def _build_unsent_result(error_message: str) -> dict[str, Any]:
+    """请求未发送(熔断/限流等待超时) 时的执行结果"""
+    return {
+        "is_success": False,
+        "response_status_code": None,
+        "response_headers": {},
+        "response_body": None,
+        "response_time_ms": 0,
+        "phase_timings": None,
+        "error_message": error_message,
+    }
+
+
+@asynccontextmanager
+async def request_guard(
+    request_snapshot: dict[str, Any],
+    host_cap: int | None = None,
+    rate_limit_rps: float | None = None,
+) -> AsyncIterator[tuple[HostSlot | None, CircuitCall | None]]:
+    """
+    发送前依次经过: 熔断检查 -> 分布式限流令牌 -> 按目标 host 的自适应并发上限, 返回 (host 槽位, 熔断调用) 供写入请求结果
+    熔断打开时抛出 CircuitOpenError, 限流等待超时抛出 RateLimitTimeout
+    """
+    url = request_snapshot.get("url")
+    env_id = request_snapshot.get("env_id")
+    circuit = await circuit_breaker.before_request(url)
+    try:
+        await rate_limiter.acquire(url, env_id=env_id, env_rps=rate_limit_rps)
+        async with host_limiter.slot(url, host_cap, env_id=env_id) as slot:
+            yield slot, circuit
+    finally:
+        await circuit_breaker.after_request(circuit)
+
+
+async def _execute_http_request(
+    request_snapshot: dict[str, Any],
+    host_cap: int | None = None,
+    rate_limit_rps: float | None = None,
+) -> dict[str, Any]:
+    """经过 request_guard 后发送请求, 等待时间不计入响应耗时"""
+    try:
+        async with request_guard(request_snapshot, host_cap, rate_limit_rps) as (slot, circuit):
+            return await _send_http_request(request_snapshot, slot, circuit)
+    except (CircuitOpenError, RateLimitTimeout) as exc:
+        return _build_unsent_result(str(exc))
+
+
+async def _send_http_request(
+    request_snapshot: dict[str, Any],
+    slot: HostSlot | None = None,
+    circuit: CircuitCall | None = None,
+) -> dict[str, Any]:
     start = time.monotonic()
+    phase_timer = HttpPhaseTimer()
     timeout_sec = max(float(request_snapshot.get("timeout_ms", 30000)) / 1000.0, 0.001)
     client_kwargs: dict[str, Any] = {
         "timeout": timeout_sec,
@@ -171,9 +232,15 @@ async def _execute_http_request(request_snapshot: dict[str, Any]) -> dict[str, A
             response = await client.request(
                 method=request_snapshot.get("method", "GET"),
                 url=request_snapshot.get("url"),
+                extensions={"trace": phase_timer.trace},
                 **request_kwargs,
             )
-        elapsed_ms = int((time.monotonic() - start) * 1000)
+        elapsed = time.monotonic() - start
+        elapsed_ms = int(elapsed * 1000)
+        observe_executor_request(request_snapshot.get("url"), response.status_code, elapsed)
+        for outcome in (slot, circuit):
+            if outcome is not None:
+                outcome.record_response(response.status_code)
         response_body = response.text
         if response_body and len(response_body) > MAX_RESPONSE_BODY_LENGTH:
             response_body = response_body[:MAX_RESPONSE_BODY_LENGTH]
@@ -183,17 +250,25 @@ async def _execute_http_request(request_snapshot: dict[str, Any]) -> dict[str, A
             "response_headers": dict(response.headers),
             "response_body": response_body,
             "response_time_ms": elapsed_ms,
+            "phase_timings": phase_timer.finish(),
             "error_message": None,
         }
     except Exception as exc:
-        elapsed_ms = int((time.monotonic() - start) * 1000)
+        elapsed = time.monotonic() - start
+        elapsed_ms = int(elapsed * 1000)
+        observe_executor_request(request_snapshot.get("url"), None, elapsed)
+        for outcome in (slot, circuit):
+            if outcome is not None:
+                outcome.record_error(exc)
         return {
             "is_success": False,
             "response_status_code": None,
             "response_headers": {},
             "response_body": None,
             "response_time_ms": elapsed_ms,
+            "phase_timings": phase_timer.finish(),
             "error_message": str(exc),
+            "error_type": type(exc).__name__,
         }
 
 
@@ -202,14 +277,55 @@ async def execute_api_request(
     dataset_obj: ApiRequestDataset | None = None,
     environment_obj: ApiEnvironment | None = None,
     runtime_variables: dict[str, Any] | None = None,
+    retry_policy_override: dict[str, Any] | None = None,
+    cassette: Cassette | None = None,
 ) -> dict[str, Any]:
+    """
+    retry_policy_override: 场景步骤上的重试策略, 按字段覆盖 request_obj.retry_policy
+    cassette: 场景执行的录制文件, 回放模式下不发送请求
+    """
     request_snapshot = build_request_snapshot(
         request_obj=request_obj,
         dataset_obj=dataset_obj,
         environment_obj=environment_obj,
         runtime_variables=runtime_variables,
     )
-    exec_result = await _execute_http_request(request_snapshot)
+    if cassette is not None and cassette.is_replay:
+        replayed = cassette.replay(request_snapshot)
+        if replayed is None:
+            replayed = _build_unsent_result(
+                f"回放未命中: {request_snapshot['method']} {request_snapshot['url']} (录制文件 {cassette.name})"
+            )
+        return {
+            "request_snapshot": request_snapshot,
+            "dataset_snapshot": _build_dataset_snapshot(dataset_obj),
+            **replayed,
+            "coalesced": False,
+        }
+
+    host_cap = environment_obj.max_concurrency if environment_obj else None
+    rate_limit_rps = environment_obj.rate_limit_rps if environment_obj else None
+
+    async def _send(snapshot: dict[str, Any]) -> dict[str, Any]:
+        return await _execute_http_request(snapshot, host_cap=host_cap, rate_limit_rps=rate_limit_rps)
+
+    retry_policy = resolve_retry_policy(request_obj.retry_policy, retry_policy_override)
+
+    async def _send_with_retry() -> dict[str, Any]:
+        if retry_policy is None:
+            return await _send(request_snapshot)
+        return await execute_with_retry(request_snapshot, retry_policy, _send)
+
+    if request_obj.coalesce_enabled:
+        # 重试策略不同的调用方不合并
+        exec_result = await request_coalescer.run(
+            request_snapshot, _send_with_retry, extra=retry_policy.__dict__ if retry_policy else None
+        )
+    else:
+        exec_result = {**await _send_with_retry(), "coalesced": False}
+    exec_result.pop("error_type", None)
+    if cassette is not None:
+        cassette.record(request_snapshot, exec_result)
     return {
         "request_snapshot": request_snapshot,
         "dataset_snapshot": _build_dataset_snapshot(dataset_obj),
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : cassette.py
+
+import copy
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+from app.core.config import BASE_DIR, get_config
+
+project_config = get_config()
+
+"""
+请求录制与回放(场景执行 TestScenarioRun.cassette_name/cassette_mode)
+    1.record: 正常发送请求, 同时把 渲染后的请求 -> 响应 按请求指纹写入录制文件(CASSETTE_DIR/{name}.json.gz)
+    2.replay: 不访问网络, 按请求指纹从录制文件取响应; 未命中时该请求失败
+    3.请求指纹: method + url(不含 query) + query + 请求头 + 请求体 归一化后的 sha256
+        CASSETTE_IGNORE_HEADERS 中的请求头与 cookies 的值不参与匹配
+        CASSETTE_VOLATILE_FIELDS 中的 query/body 字段只匹配字段名
+        其余字符串中的 时间戳/日期时间/UUID/JWT/长十六进制串 以及 CASSETTE_VOLATILE_PATTERNS 替换为占位符后匹配
+    4.同一指纹被多次请求时按录制顺序依次回放, 用完后重复最后一条
+    5.录制文件由执行场景的 Celery worker 读写, API 进程只在入队前检查文件是否存在;
+      CASSETTE_DIR 需是所有 API 进程与 worker 共享的目录, worker 打开失败时该次场景执行失败
+"""
+
+CASSETTE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+CASSETTE_MODES = {"record", "replay"}
+CASSETTE_FORMAT_VERSION = 1
+
+DEFAULT_VOLATILE_PATTERNS = {
+    "jwt": r"eyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]*",
+    "uuid": r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}",
+    "datetime": r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?",
+    "timestamp": r"(?<!\d)1\d{9}(?:\d{3})?(?!\d)",
+    "hex": r"(?<![0-9a-fA-F])[0-9a-fA-F]{32,}(?![0-9a-fA-F])",
+}
+
+
+class CassetteError(Exception):
+    """录制文件不存在或格式错误"""
+
+
+class RequestNormalizer:
+    """把请求快照归一化为匹配用的结构"""
+
+    def __init__(
+        self,
+        ignore_headers: list[str] | None = None,
+        volatile_fields: list[str] | None = None,
+        volatile_patterns: dict[str, str] | None = None,
+    ):
+        self.ignore_headers = {name.lower() for name in ignore_headers or ()}
+        self.volatile_fields = {name.lower() for name in volatile_fields or ()}
+        patterns = {**DEFAULT_VOLATILE_PATTERNS, **(volatile_patterns or {})}
+        self.patterns = [(re.compile(pattern), f"{{{{{name}}}}}") for name, pattern in patterns.items()]
+
+    def normalize_text(self, value: str) -> str:
+        for pattern, placeholder in self.patterns:
+            value = pattern.sub(placeholder, value)
+        return value
+
+    def normalize_value(self, value: Any, key: str | None = None) -> Any:
+        if key is not None and key.lower() in self.volatile_fields:
+            return "{{volatile}}"
+        if isinstance(value, dict):
+            return {str(k): self.normalize_value(v, str(k)) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.normalize_value(item) for item in value]
+        if isinstance(value, str):
+            return self.normalize_text(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # 数值形式的时间戳(如 {"ts": 1760860800000})
+            text = str(value)
+            normalized = self.normalize_text(text)
+            return value if normalized == text else normalized
+        return value
+
+    def normalize_body(self, snapshot: dict[str, Any]) -> Any:
+        body_type = snapshot.get("body_type") or "none"
+        if body_type in {"json", "form-urlencoded", "form-data"}:
+            return self.normalize_value(snapshot.get("body_data") or {})
+        if body_type in {"raw", "binary"}:
+            body_raw = snapshot.get("body_raw")
+            if body_raw is None:
+                return self.normalize_value(snapshot.get("body_data") or {})
+            if isinstance(body_raw, bytes):
+                return hashlib.sha256(body_raw).hexdigest()
+            try:
+                return self.normalize_value(json.loads(body_raw))
+            except (TypeError, ValueError):
+                return self.normalize_text(str(body_raw))
+        return None
+
+    def normalize(self, snapshot: dict[str, Any]) -> dict[str, Any]:
+        parts = urlsplit(snapshot.get("url") or "")
+        query = {key: value for key, value in parse_qsl(parts.query, keep_blank_values=True)}
+        query.update({str(k): v for k, v in (snapshot.get("query_params") or {}).items()})
+        headers = {
+            str(name).lower(): value
+            for name, value in (snapshot.get("headers") or {}).items()
+            if str(name).lower() not in self.ignore_headers
+        }
+        return {
+            "method": (snapshot.get("method") or "GET").upper(),
+            "url": self.normalize_text(urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))),
+            "query": self.normalize_value(query),
+            "headers": self.normalize_value(headers),
+            "cookies": sorted(str(name) for name in (snapshot.get("cookies") or {})),
+            "body_type": snapshot.get("body_type") or "none",
+            "body": self.normalize_body(snapshot),
+        }
+
+    def fingerprint(self, snapshot: dict[str, Any]) -> str:
+        raw = json.dumps(self.normalize(snapshot), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+default_normalizer = RequestNormalizer(
+    ignore_headers=project_config.CASSETTE_IGNORE_HEADERS,
+    volatile_fields=project_config.CASSETTE_VOLATILE_FIELDS,
+    volatile_patterns=project_config.CASSETTE_VOLATILE_PATTERNS,
+)
+
+RECORDED_RESULT_FIELDS = (
+    "is_success",
+    "response_status_code",
+    "response_headers",
+    "response_body",
+    "response_time_ms",
+    "phase_timings",
+    "error_message",
+)
+
+
+def cassette_dir() -> Path:
+    path = Path(project_config.CASSETTE_DIR)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def cassette_path(name: str, directory: Path | None = None) -> Path:
+    if not CASSETTE_NAME_PATTERN.fullmatch(name or "") or name.startswith("."):
+        raise CassetteError(f"录制文件名不合法: {name}")
+    return (directory or cassette_dir()) / f"{name}.json.gz"
+
+
+def cassette_exists(name: str, directory: Path | None = None) -> bool:
+    return cassette_path(name, directory).is_file()
+
+
+class Cassette:
+    """一个场景执行使用的录制文件"""
+
+    def __init__(
+        self,
+        name: str,
+        mode: str,
+        directory: Path | None = None,
+        normalizer: RequestNormalizer | None = None,
+    ):
+        if mode not in CASSETTE_MODES:
+            raise CassetteError(f"cassette_mode 必须是: {sorted(CASSETTE_MODES)}")
+        self.name = name
+        self.mode = mode
+        self.path = cassette_path(name, directory)
+        self.normalizer = normalizer or default_normalizer
+        self.entries: dict[str, list[dict[str, Any]]] = {}
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if mode == "replay":
+            self.entries = self._load()
+
+    def _load(self) -> dict[str, list[dict[str, Any]]]:
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            raise CassetteError(f"录制文件 {self.name} 不存在: {self.path}(CASSETTE_DIR 需为 API 与 worker 共享的目录)")
+        except (OSError, ValueError) as exc:
+            raise CassetteError(f"录制文件 {self.name} 读取失败: {exc}")
+        return data.get("entries") or {}
+
+    @property
+    def is_replay(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, request_snapshot: dict[str, Any], result: dict[str, Any]):
+        if self.mode != "record":
+            return
+        fingerprint = self.normalizer.fingerprint(request_snapshot)
+        entry = {
+            "request": {
+                "method": request_snapshot.get("method"),
+                "url": request_snapshot.get("url"),
+                "normalized": self.normalizer.normalize(request_snapshot),
+            },
+            "response": {field: copy.deepcopy(result.get(field)) for field in RECORDED_RESULT_FIELDS},
+        }
+        with self._lock:
+            self.entries.setdefault(fingerprint, []).append(entry)
+            self.recorded += 1
+
+    def replay(self, request_snapshot: dict[str, Any]) -> dict[str, Any] | None:
+        """返回录制的响应, 未命中返回 None"""
+
+        fingerprint = self.normalizer.fingerprint(request_snapshot)
+        with self._lock:
+            entries = self.entries.get(fingerprint)
+            if not entries:
+                self.misses += 1
+                return None
+            index = self._cursor.get(fingerprint, 0)
+            self._cursor[fingerprint] = index + 1
+            self.hits += 1
+            entry = entries[min(index, len(entries) - 1)]
+        return copy.deepcopy(entry["response"])
+
+    def save(self):
+        """写入录制文件(先写临时文件再替换, 避免中途失败留下损坏的文件)"""
+
+        if self.mode != "record":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {
+                "version": CASSETTE_FORMAT_VERSION,
+                "name": self.name,
+                "recorded_at": int(time.time()),
+                "entries": self.entries,
+            }
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as fp:
+                json.dump(data, fp, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
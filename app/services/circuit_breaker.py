@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : circuit_breaker.py
+
+import json
+import threading
+import time
+from typing import Any
+
+import httpx
+from loguru import logger
+from redis.exceptions import RedisError
+
+import app.db.redis_client as rp
+from app.core.config import get_config
+from app.services.host_limiter import host_key
+
+project_config = get_config()
+
+"""
+按目标主机的熔断器
+    1.closed: 正常放行; 连续 CIRCUIT_BREAKER_FAILURE_THRESHOLD 次失败(超时/连接失败/502/503/504) -> open
+    2.open: 直接返回失败(不发请求), 持续 CIRCUIT_BREAKER_OPEN_SECONDS 秒后 -> half_open
+    3.half_open: 最多放行 CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS 个探测请求, 成功 -> closed, 失败 -> open
+       探测请求在 OPEN_SECONDS 内没有结果(worker 中途退出) 时重新允许探测
+    4.状态保存在 Redis hash(circuit_breaker:{host}), 由 Lua 脚本原子迁移, 所有 worker 共享;
+      本进程缓存最近一次状态 CIRCUIT_BREAKER_SYNC_INTERVAL 秒, closed 状态下的成功请求不访问 Redis
+    5.Redis 不可用(或未初始化) 时退化为进程内熔断
+    状态迁移在 apply_circuit_action(进程内) 与 CIRCUIT_ACTION_LUA(Redis) 中各实现一份, 修改时需保持一致
+"""
+
+CIRCUIT_KEY_PREFIX = "circuit_breaker"
+CIRCUIT_KEY_TTL_MS = 86400 * 1000
+
+CIRCUIT_ACTION_LUA = """
+local action = ARGV[1]
+local now = tonumber(ARGV[2])
+local threshold = tonumber(ARGV[3])
+local open_ms = tonumber(ARGV[4])
+local max_probes = tonumber(ARGV[5])
+local reason = ARGV[6]
+local data = redis.call('HMGET', KEYS[1], 'state', 'failures', 'open_until', 'probes', 'reason')
+local state = data[1] or 'closed'
+local failures = tonumber(data[2]) or 0
+local open_until = tonumber(data[3]) or 0
+local probes = tonumber(data[4]) or 0
+local last_reason = data[5] or ''
+local allowed = 0
+if action == 'allow' then
+    if state == 'closed' then
+        allowed = 1
+    elseif state == 'open' then
+        if now >= open_until then
+            state = 'half_open'
+            probes = 1
+            open_until = now + open_ms
+            allowed = 1
+        end
+    else
+        if probes < max_probes or now >= open_until then
+            if now >= open_until then
+                probes = 0
+                open_until = now + open_ms
+            end
+            probes = probes + 1
+            allowed = 1
+        end
+    end
+elseif action == 'success' then
+    if state == 'half_open' then
+        state = 'closed'
+        probes = 0
+    end
+    if state == 'closed' then
+        failures = 0
+    end
+elseif action == 'failure' then
+    if state == 'closed' then
+        failures = failures + 1
+        if failures >= threshold then
+            state = 'open'
+            open_until = now + open_ms
+            last_reason = reason
+        end
+    elseif state == 'half_open' then
+        state = 'open'
+        probes = 0
+        open_until = now + open_ms
+        last_reason = reason
+    end
+elseif action == 'release' then
+    if state == 'half_open' and probes > 0 then
+        probes = probes - 1
+    end
+end
+redis.call('HSET', KEYS[1], 'state', state, 'failures', failures, 'open_until', open_until, 'probes', probes, 'reason', last_reason)
+redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[7]))
+return cjson.encode({state = state, failures = failures, open_until = open_until, probes = probes, reason = last_reason, allowed = allowed})
+"""
+
+
+def apply_circuit_action(
+    data: dict[str, Any] | None,
+    action: str,
+    now_ms: int,
+    threshold: int,
+    open_ms: int,
+    max_probes: int,
+    reason: str = "",
+) -> dict[str, Any]:
+    """进程内的状态迁移, 与 CIRCUIT_ACTION_LUA 一致"""
+
+    data = data or {}
+    state = data.get("state", "closed")
+    failures = int(data.get("failures", 0))
+    open_until = int(data.get("open_until", 0))
+    probes = int(data.get("probes", 0))
+    last_reason = data.get("reason", "")
+    allowed = 0
+    if action == "allow":
+        if state == "closed":
+            allowed = 1
+        elif state == "open":
+            if now_ms >= open_until:
+                state, probes, open_until, allowed = "half_open", 1, now_ms + open_ms, 1
+        elif probes < max_probes or now_ms >= open_until:
+            if now_ms >= open_until:
+                probes, open_until = 0, now_ms + open_ms
+            probes += 1
+            allowed = 1
+    elif action == "success":
+        if state == "half_open":
+            state, probes = "closed", 0
+        if state == "closed":
+            failures = 0
+    elif action == "failure":
+        if state == "closed":
+            failures += 1
+            if failures >= threshold:
+                state, open_until, last_reason = "open", now_ms + open_ms, reason
+        elif state == "half_open":
+            state, probes, open_until, last_reason = "open", 0, now_ms + open_ms, reason
+    elif action == "release":
+        if state == "half_open" and probes > 0:
+            probes -= 1
+    return {
+        "state": state,
+        "failures": failures,
+        "open_until": open_until,
+        "probes": probes,
+        "reason": last_reason,
+        "allowed": allowed,
+    }
+
+
+class CircuitOpenError(Exception):
+    """熔断中, 请求未发送"""
+
+
+class CircuitCall:
+    """一次放行的请求, 由执行器写入结果"""
+
+    def __init__(self, host: str, probe: bool, failure_status_codes: set[int]):
+        self.host = host
+        self.probe = probe
+        self.failure_status_codes = failure_status_codes
+        self.failed: bool | None = None  # None 表示未发送或不参与判定
+        self.reason = ""
+
+    def record_response(self, status_code: int):
+        self.failed = status_code in self.failure_status_codes
+        self.reason = f"HTTP {status_code}"
+
+    def record_error(self, exc: BaseException):
+        if isinstance(exc, httpx.TransportError):
+            self.failed = True
+            self.reason = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+
+
+class CircuitBreaker:
+    """按 host 的熔断器, 状态通过 Redis 在所有 worker 间共享"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 1,
+        sync_interval: float = 1.0,
+        failure_status_codes: list[int] | None = None,
+        enabled: bool = True,
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_ms = int(open_seconds * 1000)
+        self.half_open_max_calls = half_open_max_calls
+        self.sync_interval = sync_interval
+        self.failure_status_codes = set(failure_status_codes or (502, 503, 504))
+        self.enabled = enabled
+        self._cache: dict[str, tuple[dict[str, Any], float]] = {}  # host -> (状态, 缓存时间)
+        self._local_states: dict[str, dict[str, Any]] = {}  # Redis 不可用时的进程内状态
+        self._lock = threading.Lock()
+        self._action_script = None
+        self._last_error_log = 0.0
+
+    @staticmethod
+    def redis_key(host: str) -> str:
+        return f"{CIRCUIT_KEY_PREFIX}:{host}"
+
+    def _cached(self, host: str) -> dict[str, Any] | None:
+        with self._lock:
+            item = self._cache.get(host)
+        if item is None or time.monotonic() - item[1] > self.sync_interval:
+            return None
+        return item[0]
+
+    async def _apply(self, host: str, action: str, reason: str = "") -> dict[str, Any]:
+        now_ms = int(time.time() * 1000)
+        redis = rp.current_redis()
+        data = None
+        if redis is not None:
+            try:
+                if self._action_script is None:
+                    self._action_script = redis.register_script(CIRCUIT_ACTION_LUA)
+                raw = await self._action_script(
+                    keys=[self.redis_key(host)],
+                    args=[
+                        action,
+                        now_ms,
+                        self.failure_threshold,
+                        self.open_ms,
+                        self.half_open_max_calls,
+                        reason,
+                        CIRCUIT_KEY_TTL_MS,
+                    ],
+                    client=redis,
+                )
+                data = json.loads(raw.decode() if isinstance(raw, bytes) else raw)
+            except (RedisError, OSError) as exc:
+                now = time.monotonic()
+                if now - self._last_error_log > 60:
+                    self._last_error_log = now
+                    logger.warning(f"熔断器访问 Redis 失败, 使用进程内状态: {exc!r}")
+        if data is None:
+            with self._lock:
+                data = apply_circuit_action(
+                    self._local_states.get(host),
+                    action,
+                    now_ms,
+                    self.failure_threshold,
+                    self.open_ms,
+                    self.half_open_max_calls,
+                    reason,
+                )
+                self._local_states[host] = data
+        with self._lock:
+            self._cache[host] = (data, time.monotonic())
+        return data
+
+    def _open_message(self, host: str, data: dict[str, Any]) -> str:
+        remaining = max(int(data.get("open_until", 0)) - int(time.time() * 1000), 0) / 1000
+        reason = f", 最近错误: {data['reason']}" if data.get("reason") else ""
+        return f"目标 {host} 熔断中(连续失败达到 {self.failure_threshold} 次{reason}), 请求未发送, {remaining:.1f}s 后重试"
+
+    async def before_request(self, url: str | None) -> CircuitCall | None:
+        """发送前检查, 熔断中抛出 CircuitOpenError"""
+
+        host = host_key(url)
+        if not self.enabled or host is None:
+            return None
+        cached = self._cached(host)
+        if cached is not None:
+            if cached["state"] == "closed":
+                return CircuitCall(host, False, self.failure_status_codes)
+            if cached["state"] == "open" and int(cached["open_until"]) > int(time.time() * 1000):
+                raise CircuitOpenError(self._open_message(host, cached))
+
+        data = await self._apply(host, "allow")
+        if not data["allowed"]:
+            raise CircuitOpenError(self._open_message(host, data))
+        if data["state"] == "half_open":
+            logger.info(f"熔断器半开, 发送探测请求: host={host}")
+        return CircuitCall(host, data["state"] == "half_open", self.failure_status_codes)
+
+    async def after_request(self, call: CircuitCall | None):
+        if call is None:
+            return
+        if call.failed is None:
+            if call.probe:
+                await self._apply(call.host, "release")
+            return
+        if call.failed:
+            data = await self._apply(call.host, "failure", call.reason)
+            if data["state"] == "open" and (call.probe or data["failures"] == self.failure_threshold):
+                logger.warning(f"目标主机熔断: host={call.host}, reason={call.reason}")
+            return
+        cached = self._cached(call.host)
+        if call.probe or cached is None or cached.get("failures") or cached.get("state") != "closed":
+            data = await self._apply(call.host, "success")
+            if call.probe and data["state"] == "closed":
+                logger.info(f"目标主机恢复, 熔断器关闭: host={call.host}")
+
+    def reset(self):
+        with self._lock:
+            self._cache.clear()
+            self._local_states.clear()
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=project_config.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    open_seconds=project_config.CIRCUIT_BREAKER_OPEN_SECONDS,
+    half_open_max_calls=project_config.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    sync_interval=project_config.CIRCUIT_BREAKER_SYNC_INTERVAL,
+    failure_status_codes=project_config.CIRCUIT_BREAKER_FAILURE_STATUS_CODES,
+    enabled=project_config.CIRCUIT_BREAKER_ENABLED,
+)
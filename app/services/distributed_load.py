@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : distributed_load.py
+
+import asyncio
+import json
+import time
+import uuid
+from contextlib import suppress
+from typing import Any, Callable
+
+from loguru import logger
+from redis.asyncio import Redis
+
+from app.core.config import get_config
+from app.services.load_runner import LoadTestRecorder, build_load_report, run_snapshot_load
+from app.utils.hdr_histogram import HdrHistogram
+
+project_config = get_config()
+
+"""
+分布式压测(按 Celery worker 分片)
+    1.协调端把请求快照与阶段配置写入 Redis(meta), 每个分片只通过 Celery 收到 (load_id, shard_index)
+    2.每个分片承担 1/N 的 RPS, 到达序列使用 i/N 相位错开, 所有分片在统一的 start_at(墙钟) 开始
+    3.分片按秒把 HDR 直方图序列化后增量写入 Redis hash(覆盖写, 可重复上报), 同时检查 abort 标记
+    4.协调端定时合并所有分片的直方图, 总体错误率超过阈值时写入 abort 标记终止所有分片, 结束后保存最终报告
+    5.协调端同样作为 Celery 任务执行, 路由到独立队列 CELERY_LOAD_COORDINATOR_QUEUE, 与分片同时运行;
+      协调端异常时状态记为 failed 并终止所有分片
+Redis 键:
+    load_run:{load_id}:meta           JSON, 压测配置、请求快照与环境的 host_cap/rate_limit_rps
+    load_run:{load_id}:shard:{i}      hash, 秒 -> {"histogram", "errors"}
+    load_run:{load_id}:status         hash, 分片序号/coordinator -> 状态
+    load_run:{load_id}:abort          终止原因
+    load_run:{load_id}:report         最终报告
+"""
+
+LOAD_KEY_PREFIX = "load_run"
+
+SHARD_FINISHED_STATUSES = ("done", "aborted", "late", "failed")
+
+
+def load_key(load_id: str, suffix: str) -> str:
+    return f"{LOAD_KEY_PREFIX}:{load_id}:{suffix}"
+
+
+def _decode(value: Any) -> Any:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def split_load_profile(
+    stages: list[dict[str, float]], start_rps: float, shards: int
+) -> tuple[list[dict[str, float]], float]:
+    """每个分片承担 1/N 的 RPS"""
+
+    shard_stages = [
+        {"duration": float(stage["duration"]), "target_rps": float(stage["target_rps"]) / shards} for stage in stages
+    ]
+    return shard_stages, float(start_rps) / shards
+
+
+async def start_distributed_load(
+    redis: Redis,
+    *,
+    snapshots: list[dict[str, Any]],
+    stages: list[dict[str, float]],
+    start_rps: float,
+    shards: int,
+    max_in_flight: int,
+    abort_error_rate: float,
+    dispatch: Callable[[str, int], Any],
+    extra: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """写入压测配置并派发分片, dispatch(load_id, shard_index) 负责投递 Celery 任务"""
+
+    load_id = uuid.uuid4().hex
+    shard_stages, shard_start_rps = split_load_profile(stages, start_rps, shards)
+    meta = {
+        "load_id": load_id,
+        "shards": shards,
+        "start_at": time.time() + project_config.LOAD_TEST_SHARD_START_DELAY,
+        "duration": sum(float(stage["duration"]) for stage in stages),
+        "stages": stages,
+        "start_rps": start_rps,
+        "shard_stages": shard_stages,
+        "shard_start_rps": shard_start_rps,
+        "max_in_flight": max_in_flight,
+        "abort_error_rate": abort_error_rate,
+        "snapshots": snapshots,
+        **(extra or {}),
+    }
+    ttl = project_config.LOAD_TEST_RESULT_TTL
+    await redis.set(load_key(load_id, "meta"), json.dumps(meta, ensure_ascii=False, default=str), ex=ttl)
+    await redis.hset(load_key(load_id, "status"), mapping={"coordinator": "running"})
+    await redis.expire(load_key(load_id, "status"), ttl)
+    for shard_index in range(shards):
+        dispatch(load_id, shard_index)
+    logger.info(f"分布式压测已派发: load_id={load_id}, shards={shards}")
+    return meta
+
+
+async def get_load_meta(redis: Redis, load_id: str) -> dict[str, Any] | None:
+    raw = await redis.get(load_key(load_id, "meta"))
+    return json.loads(_decode(raw)) if raw else None
+
+
+async def request_abort(redis: Redis, load_id: str, reason: str):
+    await redis.set(load_key(load_id, "abort"), reason, ex=project_config.LOAD_TEST_RESULT_TTL)
+
+
+async def _flush_shard(redis: Redis, load_id: str, shard_index: int, recorder: LoadTestRecorder):
+    dirty = recorder.pop_dirty()
+    if not dirty:
+        return
+    key = load_key(load_id, f"shard:{shard_index}")
+    await redis.hset(key, mapping={str(second): json.dumps(bucket) for second, bucket in dirty.items()})
+    await redis.expire(key, project_config.LOAD_TEST_RESULT_TTL)
+
+
+async def run_load_shard(redis: Redis, load_id: str, shard_index: int) -> dict[str, Any]:
+    """在 worker 中执行一个分片, 返回分片状态"""
+
+    meta = await get_load_meta(redis, load_id)
+    if meta is None:
+        logger.warning(f"分布式压测配置不存在或已过期: load_id={load_id}")
+        return {"status": "failed", "reason": "meta not found"}
+    status_key = load_key(load_id, "status")
+
+    async def _set_status(status: str) -> dict[str, Any]:
+        await redis.hset(status_key, mapping={str(shard_index): status})
+        return {"status": status, "shard_index": shard_index}
+
+    delay = meta["start_at"] - time.time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    elif -delay > project_config.LOAD_TEST_SHARD_MAX_SKEW:
+        # worker 不足导致分片晚启动, 无法与其它分片对齐, 直接放弃
+        logger.warning(f"分布式压测分片启动过晚: load_id={load_id}, shard={shard_index}, skew={-delay:.2f}s")
+        return await _set_status("late")
+    if await redis.exists(load_key(load_id, "abort")):
+        return await _set_status("aborted")
+
+    await _set_status("running")
+    recorder = LoadTestRecorder()
+    stop_event = asyncio.Event()
+
+    async def _publisher():
+        while not stop_event.is_set():
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop_event.wait(), timeout=project_config.LOAD_TEST_FLUSH_INTERVAL)
+            try:
+                await _flush_shard(redis, load_id, shard_index, recorder)
+                if await redis.exists(load_key(load_id, "abort")):
+                    stop_event.set()
+            except Exception:
+                logger.exception(f"分布式压测分片上报失败: load_id={load_id}, shard={shard_index}")
+
+    publisher = asyncio.create_task(_publisher())
+    try:
+        await run_snapshot_load(
+            meta["snapshots"],
+            meta["shard_stages"],
+            start_rps=meta["shard_start_rps"],
+            max_in_flight=meta["max_in_flight"],
+            recorder=recorder,
+            phase=shard_index / meta["shards"],
+            stop_event=stop_event,
+            host_cap=meta.get("host_cap"),
+            rate_limit_rps=meta.get("rate_limit_rps"),
+        )
+    except Exception:
+        logger.exception(f"分布式压测分片执行失败: load_id={load_id}, shard={shard_index}")
+        await _flush_shard(redis, load_id, shard_index, recorder)
+        return await _set_status("failed")
+    finally:
+        aborted = stop_event.is_set()
+        stop_event.set()
+        await publisher
+
+    await _flush_shard(redis, load_id, shard_index, recorder)
+    return await _set_status("aborted" if aborted else "done")
+
+
+async def merge_shard_results(redis: Redis, load_id: str, shards: int) -> LoadTestRecorder:
+    """合并所有分片上报的秒级直方图"""
+
+    recorder = LoadTestRecorder()
+    for shard_index in range(shards):
+        buckets = await redis.hgetall(load_key(load_id, f"shard:{shard_index}"))
+        for second, raw in (buckets or {}).items():
+            data = json.loads(_decode(raw))
+            recorder.merge_bucket(
+                int(_decode(second)), HdrHistogram.from_dict(data["histogram"]), int(data.get("errors", 0))
+            )
+    return recorder
+
+
+async def collect_load_report(redis: Redis, load_id: str) -> dict[str, Any] | None:
+    """合并当前结果; 已结束的压测直接返回保存的最终报告"""
+
+    raw_report = await redis.get(load_key(load_id, "report"))
+    if raw_report:
+        return json.loads(_decode(raw_report))
+    meta = await get_load_meta(redis, load_id)
+    if meta is None:
+        return None
+
+    recorder = await merge_shard_results(redis, load_id, meta["shards"])
+    elapsed = min(max(time.time() - meta["start_at"], 0.0), meta["duration"])
+    report = build_load_report(recorder, elapsed)
+    statuses = {_decode(key): _decode(value) for key, value in (await redis.hgetall(load_key(load_id, "status"))).items()}
+    abort_reason = await redis.get(load_key(load_id, "abort"))
+    report.update(
+        {
+            "load_id": load_id,
+            "request_id": meta.get("request_id"),
+            "shards": meta["shards"],
+            "status": statuses.get("coordinator", "running"),
+            "shard_status": {str(index): statuses.get(str(index), "pending") for index in range(meta["shards"])},
+            "abort_reason": _decode(abort_reason) if abort_reason else None,
+        }
+    )
+    return report
+
+
+async def coordinate_load_run(redis: Redis, load_id: str, poll_interval: float | None = None) -> dict[str, Any] | None:
+    """
+    协调端: 定时合并分片结果, 总体错误率超过阈值时终止所有分片, 全部分片结束(或超时) 后保存最终报告
+    """
+
+    meta = await get_load_meta(redis, load_id)
+    if meta is None:
+        return None
+    poll_interval = poll_interval or project_config.LOAD_TEST_FLUSH_INTERVAL
+    deadline = meta["start_at"] + meta["duration"] + project_config.LOAD_TEST_SHARD_GRACE_SECONDS
+    status = "completed"
+    report: dict[str, Any] = {}
+    while True:
+        await asyncio.sleep(poll_interval)
+        report = await collect_load_report(redis, load_id)
+        summary = report["summary"]
+        if (
+            report["abort_reason"] is None
+            and summary["requests"] >= project_config.LOAD_TEST_ABORT_MIN_REQUESTS
+            and summary["error_rate"] > meta["abort_error_rate"]
+        ):
+            reason = f"总体错误率 {summary['error_rate']:.2%} 超过阈值 {meta['abort_error_rate']:.2%}"
+            logger.warning(f"分布式压测终止: load_id={load_id}, {reason}")
+            await request_abort(redis, load_id, reason)
+        if all(value in SHARD_FINISHED_STATUSES for value in report["shard_status"].values()):
+            break
+        if time.time() > deadline:
+            logger.warning(f"分布式压测等待分片超时: load_id={load_id}, shard_status={report['shard_status']}")
+            status = "timeout"
+            break
+
+    report = await collect_load_report(redis, load_id)
+    if report["abort_reason"] is not None:
+        status = "aborted"
+    report["status"] = status
+    ttl = project_config.LOAD_TEST_RESULT_TTL
+    await redis.hset(load_key(load_id, "status"), mapping={"coordinator": status})
+    await redis.set(load_key(load_id, "report"), json.dumps(report, ensure_ascii=False), ex=ttl)
+    logger.info(f"分布式压测结束: load_id={load_id}, status={status}, summary={report['summary']}")
+    return report
+
+
+async def run_load_coordinator(
+    redis: Redis, load_id: str, poll_interval: float | None = None
+) -> dict[str, Any] | None:
+    """执行协调端, 异常时把 coordinator 状态标记为 failed 并终止仍在运行的分片, 避免状态一直停留在 running"""
+
+    try:
+        return await coordinate_load_run(redis, load_id, poll_interval=poll_interval)
+    except Exception as exc:
+        logger.exception(f"分布式压测协调端执行失败: load_id={load_id}")
+        try:
+            await redis.hset(load_key(load_id, "status"), mapping={"coordinator": "failed"})
+            await request_abort(redis, load_id, f"协调端执行失败: {exc}")
+        except Exception:
+            logger.exception(f"分布式压测协调端状态写入失败: load_id={load_id}")
+        return None
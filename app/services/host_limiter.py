@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : host_limiter.py
+
+import asyncio
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.core.config import get_config
+from app.core.metrics import observe_host_limit
+
+project_config = get_config()
+
+"""
+按目标主机的自适应并发限制(AIMD)
+    1.每个 host(含端口) 一个并发上限, 超过上限的请求排队等待, 不会失败
+    2.按窗口统计(窗口大小 = max(当前上限, HOST_LIMIT_WINDOW_MIN_SAMPLES) 个完成的请求, 约等于一个往返):
+        错误率(5xx/超时/连接失败) 超过 HOST_LIMIT_ERROR_RATE, 或半数以上请求明显变慢 -> 上限乘以 HOST_LIMIT_BACKOFF
+        否则窗口内并发曾达到上限 -> 上限 +1
+    3.变慢判定: 延迟超过基准延迟 * HOST_LIMIT_LATENCY_TOLERANCE 且超出 HOST_LIMIT_LATENCY_SLACK_MS,
+      基准延迟取成功请求延迟的低位(新低立即采用, 否则缓慢上浮)
+    4.ApiEnvironment.max_concurrency 为该环境在该 host 上的硬上限, 按 (host, env_id) 单独计数,
+      请求需同时占到环境槽位和 host 自适应槽位; 不同环境的上限互不覆盖, 未配置上限的请求只受自适应上限约束
+    5.状态按进程共享; Celery worker 每个任务使用新的事件循环, 等待者用各自循环的 Future 唤醒, 因此可跨事件循环/线程使用
+"""
+
+
+def host_key(url: str | None) -> str | None:
+    try:
+        parts = urlsplit(url or "")
+        hostname = parts.hostname
+        port = parts.port
+    except ValueError:
+        return None
+    if not hostname:
+        return None
+    return f"{hostname}:{port}" if port else hostname
+
+
+def _set_result_if_pending(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class SlotQueue(ABC):
+    """跨事件循环/线程的计数信号量, 等待者按 FIFO 用各自循环的 Future 唤醒"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def capacity(self) -> int:
+        """当前允许同时占用的槽位数"""
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _on_acquired_locked(self, queued: bool):
+        """占用槽位后的回调(持锁调用)"""
+
+    async def acquire(self):
+        with self._lock:
+            if not self._waiters and self.in_flight < self.capacity:
+                self.in_flight += 1
+                self._on_acquired_locked(queued=False)
+                return
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+                else:
+                    # 已分配到槽位但在唤醒前被取消, 归还槽位
+                    self.in_flight -= 1
+                    self._wake_locked()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_locked()
+
+    def _wake_locked(self):
+        while self._waiters and self.in_flight < self.capacity:
+            fut = self._waiters.popleft()
+            if fut.done():
+                continue
+            self.in_flight += 1
+            self._on_acquired_locked(queued=True)
+            fut.get_loop().call_soon_threadsafe(_set_result_if_pending, fut)
+
+
+class EnvironmentCap(SlotQueue):
+    """某个环境在单个 host 上的硬上限(ApiEnvironment.max_concurrency), 与其他环境互不影响"""
+
+    def __init__(self, host: str, env_id: int | None, cap: int):
+        super().__init__()
+        self.host = host
+        self.env_id = env_id
+        self.cap = cap
+
+    @property
+    def capacity(self) -> int:
+        return max(self.cap, 1)
+
+    def set_cap(self, cap: int):
+        with self._lock:
+            if cap == self.cap:
+                return
+            self.cap = cap
+            self._wake_locked()
+
+    def snapshot(self) -> dict:
+        return {
+            "env_id": self.env_id,
+            "cap": self.cap,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+
+class HostLimit(SlotQueue):
+    """单个 host 的 AIMD 并发上限"""
+
+    def __init__(
+        self,
+        host: str,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        backoff: float,
+        error_rate: float,
+        latency_tolerance: float,
+        latency_slack_ms: float,
+        window_min_samples: int,
+    ):
+        super().__init__()
+        self.host = host
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.error_rate = error_rate
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack_ms = latency_slack_ms
+        self.window_min_samples = window_min_samples
+        self.baseline_ms: float | None = None
+        self.increases = 0
+        self.decreases = 0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_samples = 0
+        self._window_errors = 0
+        self._window_slow = 0
+        self._window_saturated = False
+
+    @property
+    def effective_limit(self) -> int:
+        return max(int(self.limit), self.min_limit)
+
+    @property
+    def capacity(self) -> int:
+        return self.effective_limit
+
+    def _on_acquired_locked(self, queued: bool):
+        self._window_saturated |= queued or self.in_flight >= self.effective_limit
+
+    def record(self, latency_ms: float, failed: bool):
+        """记录一次完成的请求(在 release 之前调用), 窗口满时调整上限"""
+
+        with self._lock:
+            slow = False
+            if not failed:
+                if self.baseline_ms is None or latency_ms < self.baseline_ms:
+                    self.baseline_ms = latency_ms
+                else:
+                    slow = latency_ms > max(
+                        self.baseline_ms * self.latency_tolerance, self.baseline_ms + self.latency_slack_ms
+                    )
+                    self.baseline_ms += (latency_ms - self.baseline_ms) * 0.01
+            self._window_samples += 1
+            self._window_errors += int(failed)
+            self._window_slow += int(slow)
+            if self._window_samples >= max(self.effective_limit, self.window_min_samples):
+                self._adjust_locked()
+
+    def _adjust_locked(self):
+        samples = self._window_samples
+        if self._window_errors / samples > self.error_rate or self._window_slow / samples > 0.5:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+            self.decreases += 1
+        elif self._window_saturated:
+            if self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), math.floor(self.limit) + 1.0)
+                self.increases += 1
+        self._reset_window()
+        self._wake_locked()
+
+    def snapshot(self) -> dict:
+        return {
+            "host": self.host,
+            "limit": self.effective_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "baseline_ms": round(self.baseline_ms, 2) if self.baseline_ms is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+class HostSlot:
+    """占用中的槽位, 由执行器写入请求结果"""
+
+    def __init__(self, limit: HostLimit):
+        self.limit = limit
+        self.started_at = time.monotonic()
+        self.failed: bool | None = None  # None 表示不参与统计(例如 URL 非法)
+
+    def record_response(self, status_code: int):
+        self.failed = status_code >= 500
+
+    def record_error(self, exc: BaseException):
+        if isinstance(exc, httpx.TransportError):
+            self.failed = True
+
+
+class HostConcurrencyLimiter:
+    """进程内按 host 管理 HostLimit, 按 (host, env_id) 管理 EnvironmentCap"""
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.7,
+        error_rate: float = 0.1,
+        latency_tolerance: float = 2.0,
+        latency_slack_ms: float = 50,
+        window_min_samples: int = 10,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self._options = {
+            "initial": initial,
+            "min_limit": min_limit,
+            "max_limit": max_limit,
+            "backoff": backoff,
+            "error_rate": error_rate,
+            "latency_tolerance": latency_tolerance,
+            "latency_slack_ms": latency_slack_ms,
+            "window_min_samples": window_min_samples,
+        }
+        self._limits: dict[str, HostLimit] = {}
+        self._caps: dict[tuple[str, int | None], EnvironmentCap] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> HostLimit:
+        with self._lock:
+            limit = self._limits.get(host)
+            if limit is None:
+                limit = HostLimit(host, **self._options)
+                self._limits[host] = limit
+            return limit
+
+    def get_cap(self, host: str, env_id: int | None, cap: int) -> EnvironmentCap:
+        with self._lock:
+            env_cap = self._caps.get((host, env_id))
+            if env_cap is None:
+                env_cap = EnvironmentCap(host, env_id, cap)
+                self._caps[(host, env_id)] = env_cap
+        env_cap.set_cap(cap)
+        return env_cap
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            limits = list(self._limits.values())
+            caps = list(self._caps.values())
+        result = []
+        for limit in limits:
+            item = limit.snapshot()
+            item["caps"] = [env_cap.snapshot() for env_cap in caps if env_cap.host == limit.host]
+            result.append(item)
+        return result
+
+    @asynccontextmanager
+    async def slot(
+        self, url: str | None, cap: int | None = None, env_id: int | None = None
+    ) -> AsyncIterator[HostSlot | None]:
+        host = host_key(url)
+        if not self.enabled or host is None:
+            yield None
+            return
+
+        # 先占环境槽位再占 host 槽位, 避免等待环境上限的请求占住 host 的自适应额度
+        env_cap = self.get_cap(host, env_id, cap) if cap is not None else None
+        if env_cap is not None:
+            await env_cap.acquire()
+        limit = self.get(host)
+        try:
+            await limit.acquire()
+        except BaseException:
+            if env_cap is not None:
+                env_cap.release()
+            raise
+        slot = HostSlot(limit)
+        observe_host_limit(host, limit.effective_limit, limit.in_flight)
+        try:
+            yield slot
+        finally:
+            if slot.failed is not None:
+                limit.record((time.monotonic() - slot.started_at) * 1000, slot.failed)
+            limit.release()
+            if env_cap is not None:
+                env_cap.release()
+            observe_host_limit(host, limit.effective_limit, limit.in_flight)
+
+
+host_limiter = HostConcurrencyLimiter(
+    initial=project_config.HOST_LIMIT_INITIAL,
+    min_limit=project_config.HOST_LIMIT_MIN,
+    max_limit=project_config.HOST_LIMIT_MAX,
+    backoff=project_config.HOST_LIMIT_BACKOFF,
+    error_rate=project_config.HOST_LIMIT_ERROR_RATE,
+    latency_tolerance=project_config.HOST_LIMIT_LATENCY_TOLERANCE,
+    latency_slack_ms=project_config.HOST_LIMIT_LATENCY_SLACK_MS,
+    window_min_samples=project_config.HOST_LIMIT_WINDOW_MIN_SAMPLES,
+    enabled=project_config.HOST_LIMIT_ENABLED,
+)
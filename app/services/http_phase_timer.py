@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : http_phase_timer.py
+
+import time
+from typing import Any
+
+PHASE_KEYS = ("setup", "connect", "tls", "send", "ttfb", "download")
+
+# httpcore trace 事件(去掉 connection./http11./http2. 前缀) -> 阶段
+_PHASE_EVENTS = {
+    "connect_tcp": "connect",
+    "connect_unix_socket": "connect",
+    "start_tls": "tls",
+    "receive_response_body": "download",
+}
+
+
+class HttpPhaseTimer:
+    """
+    通过 httpx/httpcore 的 trace 扩展记录请求各阶段耗时(毫秒)
+        setup: 发起请求 -> 第一个网络事件(AsyncClient 构造、连接池等待等本地开销)
+        connect: TCP 建连(httpcore 在 connect_tcp 内解析 DNS, 因此包含 DNS 耗时)
+        tls: TLS 握手
+        send: 发送请求头与请求体
+        ttfb: 请求发送完成 -> 收到响应头(目标服务处理耗时)
+        download: 读取响应体
+        total: 整体耗时
+    跟随重定向时多次请求的同一阶段累加
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_event_at: float | None = None
+        self.finished_at: float | None = None
+        self.phases: dict[str, float] = {}
+        self._open: dict[str, float] = {}
+        self._send_started_at: float | None = None
+        self._send_completed_at: float | None = None
+
+    def _add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(seconds, 0.0)
+
+    async def trace(self, event_name: str, info: dict[str, Any]):
+        now = time.perf_counter()
+        if self.first_event_at is None:
+            self.first_event_at = now
+
+        _, _, event = event_name.partition(".")
+        name, _, stage = event.rpartition(".")
+
+        if name in _PHASE_EVENTS:
+            if stage == "started":
+                self._open[name] = now
+            elif stage in {"complete", "failed"} and name in self._open:
+                self._add(_PHASE_EVENTS[name], now - self._open.pop(name))
+        elif name == "send_request_headers" and stage == "started":
+            self._send_started_at = now
+        elif name == "send_request_body" and stage in {"complete", "failed"} and self._send_started_at is not None:
+            self._add("send", now - self._send_started_at)
+            self._send_started_at = None
+            self._send_completed_at = now
+        elif name == "receive_response_headers" and stage in {"complete", "failed"} and self._send_completed_at is not None:
+            self._add("ttfb", now - self._send_completed_at)
+            self._send_completed_at = None
+
+    def finish(self) -> dict[str, float]:
+        """结束计时并返回各阶段耗时(毫秒, 保留 1 位小数)"""
+
+        self.finished_at = time.perf_counter()
+        result: dict[str, float] = {}
+        if self.first_event_at is not None:
+            result["setup"] = round((self.first_event_at - self.started_at) * 1000, 1)
+        for phase in PHASE_KEYS[1:]:
+            if phase in self.phases:
+                result[phase] = round(self.phases[phase] * 1000, 1)
+        result["total"] = round((self.finished_at - self.started_at) * 1000, 1)
+        return result
+
+
+def average_phase_timings(timings_list: list[dict | None]) -> dict[str, float] | None:
+    """按阶段求平均值, 缺失某阶段的记录不参与该阶段平均"""
+
+    totals: dict[str, float] = {}
+    counts: dict[str, int] = {}
+    for timings in timings_list:
+        for phase, value in (timings or {}).items():
+            if isinstance(value, (int, float)):
+                totals[phase] = totals.get(phase, 0.0) + value
+                counts[phase] = counts.get(phase, 0) + 1
+    if not totals:
+        return None
+    return {phase: round(totals[phase] / counts[phase], 1) for phase in (*PHASE_KEYS, "total") if phase in totals}
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : load_runner.py
+
+import asyncio
+import math
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Iterator
+
+import httpx
+
+from app.models.api_request import ApiEnvironment, ApiRequest, ApiRequestDataset
+from app.services.api_request_executor import _build_http_request_kwargs, build_request_snapshot, request_guard
+from app.utils.hdr_histogram import HdrHistogram
+
+"""
+单个测试用例压测(开放模型)
+    1.按阶段配置生成到达时间: 每个阶段在 duration 秒内从上一阶段的 RPS 线性变化到 target_rps, 到达时间与响应快慢无关
+    2.延迟从"计划发送时间"开始计算, 目标变慢或并发达到上限导致的排队时间也计入延迟(修正 coordinated omission)
+    3.结果按计划发送时间所在秒写入 HDR 直方图(微秒), 不落 ApiRequestRun 明细
+    4.只以 HTTP 状态码判定成功(2xx/3xx), 不执行断言与变量提取
+    5.每个请求与普通执行一样经过 熔断 -> 分布式限流 -> host 自适应并发上限(request_guard), 不会绕过目标的限制;
+      熔断打开/限流超时计为错误, 限流与排队的等待时间计入延迟
+    6.压测由 Celery worker 执行(app.services.distributed_load), 单机压测即 1 个分片
+"""
+
+SendFunc = Callable[[int], Awaitable[bool]]
+
+
+def iter_arrival_offsets(
+    stages: list[dict[str, float]], start_rps: float = 0.0, phase: float = 0.0
+) -> Iterator[float]:
+    """
+    生成相对压测开始时间的计划发送时间(秒)
+    阶段内速率 r(t) = r0 + (r1 - r0) * t / d, 累计请求数 N(t) = r0 * t + (r1 - r0) * t² / (2d),
+    第 k 个请求发生在 N(t) = k - phase 处; 分片压测时各分片使用 i/N 的相位, 合并后与单进程的到达序列一致
+    """
+
+    stage_start = 0.0
+    carried = 0.0  # 之前阶段累计的(非整数) 请求数
+    next_count = 1.0 - phase
+    rate_from = float(start_rps)
+    for stage in stages:
+        duration = float(stage["duration"])
+        rate_to = float(stage["target_rps"])
+        a = (rate_to - rate_from) / (2 * duration)
+        b = rate_from
+        stage_total = a * duration**2 + b * duration
+        while next_count - carried <= stage_total + 1e-9:
+            need = next_count - carried
+            if abs(a) < 1e-12:
+                offset = need / b
+            else:
+                offset = (-b + math.sqrt(max(b * b + 4 * a * need, 0.0))) / (2 * a)
+            yield stage_start + min(max(offset, 0.0), duration)
+            next_count += 1
+        carried += stage_total
+        stage_start += duration
+        rate_from = rate_to
+
+
+class LoadTestRecorder:
+    """按秒汇总的 HDR 直方图"""
+
+    def __init__(self):
+        self.seconds: dict[int, dict[str, Any]] = {}
+        self.total = HdrHistogram()
+        self.sent = 0
+        self.errors = 0
+        self.dirty: set[int] = set()  # 上次 pop_dirty 之后有新样本的秒
+
+    def _bucket(self, second: int) -> dict[str, Any]:
+        if second not in self.seconds:
+            self.seconds[second] = {"histogram": HdrHistogram(), "errors": 0}
+        return self.seconds[second]
+
+    def record(self, intended_offset: float, latency_us: int, ok: bool):
+        second = int(intended_offset)
+        bucket = self._bucket(second)
+        self.dirty.add(second)
+        bucket["histogram"].record(latency_us)
+        self.total.record(latency_us)
+        self.sent += 1
+        if not ok:
+            bucket["errors"] += 1
+            self.errors += 1
+
+    def merge_bucket(self, second: int, histogram: HdrHistogram, errors: int = 0):
+        """合并其它进程上报的秒级直方图"""
+
+        bucket = self._bucket(second)
+        bucket["histogram"].merge(histogram)
+        bucket["errors"] += errors
+        self.total.merge(histogram)
+        self.sent += histogram.total
+        self.errors += errors
+
+    def pop_dirty(self) -> dict[int, dict[str, Any]]:
+        """取出有变化的秒级桶(序列化后), 用于分片增量上报"""
+
+        dirty, self.dirty = self.dirty, set()
+        return {
+            second: {"histogram": self.seconds[second]["histogram"].to_dict(), "errors": self.seconds[second]["errors"]}
+            for second in sorted(dirty)
+        }
+
+
+def summarize_histogram(histogram: HdrHistogram, errors: int, elapsed: float) -> dict[str, Any]:
+    """直方图(微秒) -> 吞吐/错误率/延迟分位(毫秒)"""
+
+    count = histogram.total
+
+    def ms(value):
+        return None if value is None else round(value / 1000, 2)
+
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": ms(histogram.value_at_percentile(50)),
+        "p90_ms": ms(histogram.value_at_percentile(90)),
+        "p99_ms": ms(histogram.value_at_percentile(99)),
+        "max_ms": ms(histogram.max),
+        "mean_ms": ms(histogram.mean),
+    }
+
+
+def build_load_report(recorder: LoadTestRecorder, elapsed: float) -> dict[str, Any]:
+    timeline = [
+        {"second": second, **summarize_histogram(bucket["histogram"], bucket["errors"], 1.0)}
+        for second, bucket in sorted(recorder.seconds.items())
+    ]
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "summary": summarize_histogram(recorder.total, recorder.errors, elapsed),
+        "timeline": timeline,
+    }
+
+
+async def run_open_loop(
+    send: SendFunc,
+    stages: list[dict[str, float]],
+    start_rps: float = 0.0,
+    max_in_flight: int = 100,
+    recorder: LoadTestRecorder | None = None,
+    phase: float = 0.0,
+    stop_event: asyncio.Event | None = None,
+) -> LoadTestRecorder:
+    """
+    开放模型调度: 到达时间固定, 与响应快慢无关
+    并发达到 max_in_flight 时调度协程等待空闲槽位, 等待时间计入延迟, 不会丢弃请求
+    stop_event 被设置后不再发送新请求, 等待已发出的请求结束后返回
+    """
+
+    recorder = recorder or LoadTestRecorder()
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    tasks: set[asyncio.Task] = set()
+    started_at = loop.time()
+
+    async def fire(seq: int, intended_offset: float):
+        try:
+            try:
+                ok = await send(seq)
+            except Exception:
+                ok = False
+            latency_us = int((loop.time() - started_at - intended_offset) * 1_000_000)
+            recorder.record(intended_offset, latency_us, ok)
+        finally:
+            slots.release()
+
+    for seq, intended_offset in enumerate(iter_arrival_offsets(stages, start_rps, phase)):
+        delay = started_at + intended_offset - loop.time()
+        if delay > 0:
+            if stop_event is None:
+                await asyncio.sleep(delay)
+            else:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop_event.wait(), timeout=delay)
+        if stop_event is not None and stop_event.is_set():
+            break
+        await slots.acquire()
+        task = asyncio.create_task(fire(seq, intended_offset))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return recorder
+
+
+def build_load_snapshots(
+    request_obj: ApiRequest,
+    dataset_list: list[ApiRequestDataset],
+    environment_obj: ApiEnvironment | None,
+) -> list[dict[str, Any]]:
+    """每个数据集生成一份请求快照, 没有数据集时使用用例本身"""
+
+    return [
+        build_request_snapshot(request_obj=request_obj, dataset_obj=dataset_obj, environment_obj=environment_obj)
+        for dataset_obj in (dataset_list or [None])
+    ]
+
+
+def build_load_limits(environment_obj: ApiEnvironment | None) -> dict[str, Any]:
+    """环境配置的 host 并发上限与限流 RPS, 与普通执行(execute_api_request)一致"""
+
+    return {
+        "host_cap": environment_obj.max_concurrency if environment_obj else None,
+        "rate_limit_rps": environment_obj.rate_limit_rps if environment_obj else None,
+    }
+
+
+async def run_snapshot_load(
+    snapshots: list[dict[str, Any]],
+    stages: list[dict[str, float]],
+    start_rps: float = 0.0,
+    max_in_flight: int = 100,
+    recorder: LoadTestRecorder | None = None,
+    phase: float = 0.0,
+    stop_event: asyncio.Event | None = None,
+    host_cap: int | None = None,
+    rate_limit_rps: float | None = None,
+) -> LoadTestRecorder:
+    """按请求快照执行开放模型压测, 多个快照按请求序号轮换"""
+
+    prepared = [(item, _build_http_request_kwargs(item)) for item in snapshots]
+    first = snapshots[0]
+    client_kwargs: dict[str, Any] = {
+        "timeout": max(float(first.get("timeout_ms") or 30000) / 1000.0, 0.001),
+        "follow_redirects": bool(first.get("follow_redirects", True)),
+        "verify": bool(first.get("verify_ssl", True)),
+        "limits": httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight),
+    }
+    if first.get("proxy_url"):
+        client_kwargs["proxy"] = first["proxy_url"]
+
+    # 压测复用同一个连接池, 避免每个请求新建 AsyncClient 的开销影响结果
+    async with httpx.AsyncClient(**client_kwargs) as client:
+
+        async def send(seq: int) -> bool:
+            snapshot, kwargs = prepared[seq % len(prepared)]
+            async with request_guard(snapshot, host_cap, rate_limit_rps) as (slot, circuit):
+                try:
+                    response = await client.request(method=snapshot["method"], url=snapshot["url"], **kwargs)
+                    await response.aread()
+                except Exception as exc:
+                    for outcome in (slot, circuit):
+                        if outcome is not None:
+                            outcome.record_error(exc)
+                    raise
+                for outcome in (slot, circuit):
+                    if outcome is not None:
+                        outcome.record_response(response.status_code)
+                return response.status_code < 400
+
+        return await run_open_loop(
+            send,
+            stages,
+            start_rps=start_rps,
+            max_in_flight=max_in_flight,
+            recorder=recorder,
+            phase=phase,
+            stop_event=stop_event,
+        )
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : rate_limiter.py
+
+import asyncio
+import fnmatch
+import threading
+import time
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+import app.db.redis_client as rp
+from app.core.config import get_config
+from app.services.host_limiter import host_key
+
+project_config = get_config()
+
+"""
+按目标的分布式限流(Redis 令牌桶)
+    1.限流规则来源:
+        ApiEnvironment.rate_limit_rps: 该环境下每个目标 host 一个令牌桶(rate_limit:env:{env_id}:{host})
+        RATE_LIMIT_HOST_RULES: {"*.staging.example.com": 200}, 匹配该模式的所有 host 共用一个令牌桶(对应同一个网关)
+      同时命中时需要依次拿到所有桶的令牌
+    2.令牌桶由 Lua 脚本原子计算(使用 Redis 服务器时间, 不依赖各 worker 的时钟), 所有 API/Celery 进程共享
+    3.本地批量取令牌: 一次从 Redis 取 rate * RATE_LIMIT_BATCH_FRACTION 个(不超过 RATE_LIMIT_BATCH_MAX),
+      在本进程内逐个消耗, 超过 RATE_LIMIT_LOCAL_TTL 未用完的令牌作废(宁可少发也不超发)
+    4.令牌不足时按脚本返回的等待时间休眠后重试, 超过 RATE_LIMIT_MAX_WAIT 抛出 RateLimitTimeout
+    5.Redis 不可用时默认放行(RATE_LIMIT_FAIL_OPEN), 避免限流组件故障导致所有用例失败
+"""
+
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = burst
+    ts = now
+end
+tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate / 1000)
+local granted = math.min(requested, math.floor(tokens))
+local wait_ms = 0
+if granted > 0 then
+    tokens = tokens - granted
+else
+    wait_ms = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return {granted, wait_ms}
+"""
+
+RATE_LIMIT_KEY_PREFIX = "rate_limit"
+
+
+class RateLimitTimeout(Exception):
+    """等待令牌超时"""
+
+
+class _LocalTokens:
+    __slots__ = ("tokens", "expires_at")
+
+    def __init__(self, tokens: int, expires_at: float):
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+
+class DistributedRateLimiter:
+    """Redis 令牌桶 + 本地批量令牌"""
+
+    def __init__(
+        self,
+        host_rules: dict[str, float] | None = None,
+        burst_seconds: float = 1.0,
+        batch_fraction: float = 0.05,
+        batch_max: int = 20,
+        local_ttl: float = 0.5,
+        max_wait: float = 60,
+        fail_open: bool = True,
+        enabled: bool = True,
+    ):
+        self.host_rules = dict(host_rules or {})
+        self.burst_seconds = burst_seconds
+        self.batch_fraction = batch_fraction
+        self.batch_max = batch_max
+        self.local_ttl = local_ttl
+        self.max_wait = max_wait
+        self.fail_open = fail_open
+        self.enabled = enabled
+        self._local: dict[str, _LocalTokens] = {}
+        self._lock = threading.Lock()
+        self._token_script = None
+        self._last_error_log = 0.0
+
+    def resolve_buckets(
+        self, url: str | None, env_id: int | None = None, env_rps: float | None = None
+    ) -> list[tuple[str, float]]:
+        """返回 [(令牌桶键, 每秒速率)]"""
+
+        host = host_key(url)
+        if host is None:
+            return []
+        buckets: list[tuple[str, float]] = []
+        if env_id is not None and env_rps:
+            buckets.append((f"{RATE_LIMIT_KEY_PREFIX}:env:{env_id}:{host}", float(env_rps)))
+        hostname = host.rsplit(":", 1)[0] if host.count(":") == 1 else host
+        for pattern, rps in self.host_rules.items():
+            if rps and (fnmatch.fnmatch(host, pattern) or fnmatch.fnmatch(hostname, pattern)):
+                buckets.append((f"{RATE_LIMIT_KEY_PREFIX}:host:{pattern}", float(rps)))
+        return buckets
+
+    def batch_size(self, rps: float) -> int:
+        return max(1, min(self.batch_max, int(rps * self.batch_fraction)))
+
+    def burst(self, rps: float) -> float:
+        return max(1.0, rps * self.burst_seconds)
+
+    def _take_local(self, key: str) -> bool:
+        with self._lock:
+            local = self._local.get(key)
+            if local is None:
+                return False
+            if local.tokens <= 0 or local.expires_at < time.monotonic():
+                del self._local[key]
+                return False
+            local.tokens -= 1
+            return True
+
+    def _store_local(self, key: str, tokens: int):
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._local[key] = _LocalTokens(tokens, time.monotonic() + self.local_ttl)
+
+    def _script(self, redis):
+        # 调用时显式传入 client, 脚本对象只需创建一次(EVALSHA 失败时 redis-py 自动回退为 SCRIPT LOAD)
+        if self._token_script is None:
+            self._token_script = redis.register_script(TOKEN_BUCKET_LUA)
+        return self._token_script
+
+    def _log_redis_error(self, exc: Exception):
+        now = time.monotonic()
+        if now - self._last_error_log > 60:
+            self._last_error_log = now
+            logger.warning(f"限流令牌桶访问 Redis 失败, 本次放行: {exc!r}")
+
+    async def _acquire_bucket(self, key: str, rps: float, deadline: float):
+        while not self._take_local(key):
+            redis = rp.current_redis()
+            if redis is None:
+                return
+            batch = self.batch_size(rps)
+            try:
+                granted, wait_ms = await self._script(redis)(
+                    keys=[key], args=[rps, self.burst(rps), batch], client=redis
+                )
+            except (RedisError, OSError) as exc:
+                if not self.fail_open:
+                    raise
+                self._log_redis_error(exc)
+                return
+            granted = int(granted)
+            if granted > 0:
+                # 自己使用 1 个, 其余留给本进程后续请求
+                self._store_local(key, granted - 1)
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RateLimitTimeout(f"等待限流令牌超时({self.max_wait}s): {key}")
+            await asyncio.sleep(min(max(int(wait_ms), 1) / 1000, remaining))
+
+    async def acquire(self, url: str | None, env_id: int | None = None, env_rps: float | None = None) -> float:
+        """发送前取令牌, 返回等待时长(秒)"""
+
+        if not self.enabled:
+            return 0.0
+        buckets = self.resolve_buckets(url, env_id, env_rps)
+        if not buckets:
+            return 0.0
+        started_at = time.monotonic()
+        deadline = started_at + self.max_wait
+        for key, rps in buckets:
+            await self._acquire_bucket(key, rps, deadline)
+        return time.monotonic() - started_at
+
+
+rate_limiter = DistributedRateLimiter(
+    host_rules=project_config.RATE_LIMIT_HOST_RULES,
+    burst_seconds=project_config.RATE_LIMIT_BURST_SECONDS,
+    batch_fraction=project_config.RATE_LIMIT_BATCH_FRACTION,
+    batch_max=project_config.RATE_LIMIT_BATCH_MAX,
+    local_ttl=project_config.RATE_LIMIT_LOCAL_TTL,
+    max_wait=project_config.RATE_LIMIT_MAX_WAIT,
+    fail_open=project_config.RATE_LIMIT_FAIL_OPEN,
+    enabled=project_config.RATE_LIMIT_ENABLED,
+)
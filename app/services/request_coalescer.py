@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : request_coalescer.py
+
+import asyncio
+import concurrent.futures
+import copy
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from app.core.config import get_config
+
+project_config = get_config()
+
+"""
+相同幂等请求合并(singleflight)
+    1.仅对开启 ApiRequest.coalesce_enabled 且方法为 GET/HEAD/OPTIONS 的请求生效
+    2.合并键: 渲染后请求快照中影响实际发送的字段(method/url/query/headers/cookies/body/env/超时/代理等) + 重试策略 的 sha256
+    3.同一进程内同一合并键正在发送时, 后到的调用方等待同一个结果; 完成后 COALESCE_WINDOW_MS 内到达的调用方直接复用结果
+    4.跨事件循环(每个 Celery 任务各自 asyncio.run) 使用 concurrent.futures.Future 共享结果
+    5.每个调用方拿到结果的独立副本, 复用者的结果带 coalesced=True, 各自写入 ApiRequestRun
+    6.发起方被取消或异常时, 等待者各自重新发送
+"""
+
+COALESCE_METHODS = {"GET", "HEAD", "OPTIONS"}
+COALESCE_KEY_FIELDS = (
+    "env_id",
+    "method",
+    "url",
+    "query_params",
+    "headers",
+    "cookies",
+    "body_type",
+    "body_data",
+    "body_raw",
+    "timeout_ms",
+    "follow_redirects",
+    "verify_ssl",
+    "proxy_url",
+)
+
+
+def coalesce_key(request_snapshot: dict[str, Any], extra: Any = None) -> str:
+    payload = {field: request_snapshot.get(field) for field in COALESCE_KEY_FIELDS}
+    payload["extra"] = extra
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("future", "finished_at")
+
+    def __init__(self):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.finished_at: float | None = None
+
+
+class RequestCoalescer:
+    """按合并键共享进行中的请求结果"""
+
+    def __init__(self, window_ms: int = 100, enabled: bool = True):
+        self.window = window_ms / 1000
+        self.enabled = enabled
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join_or_lead(self, key: str) -> tuple[_Flight, bool]:
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and (flight.finished_at is None or now - flight.finished_at <= self.window):
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _finish(self, key: str, flight: _Flight, result: dict[str, Any] | None, exc: BaseException | None = None):
+        with self._lock:
+            if exc is None and self.window > 0:
+                flight.finished_at = time.monotonic()
+            elif self._flights.get(key) is flight:
+                del self._flights[key]
+            self._prune(time.monotonic())
+        if exc is None:
+            flight.future.set_result(result)
+        else:
+            flight.future.set_exception(exc)
+
+    def _prune(self, now: float):
+        expired = [
+            key
+            for key, flight in self._flights.items()
+            if flight.finished_at is not None and now - flight.finished_at > self.window
+        ]
+        for key in expired:
+            del self._flights[key]
+
+    async def run(
+        self,
+        request_snapshot: dict[str, Any],
+        send: Callable[[], Awaitable[dict[str, Any]]],
+        extra: Any = None,
+    ) -> dict[str, Any]:
+        """返回 send() 的结果副本, 复用其它调用方结果时 coalesced=True"""
+
+        method = (request_snapshot.get("method") or "GET").upper()
+        if not self.enabled or method not in COALESCE_METHODS:
+            return {**await send(), "coalesced": False}
+
+        key = coalesce_key(request_snapshot, extra)
+        flight, is_leader = self._join_or_lead(key)
+        if not is_leader:
+            try:
+                result = await asyncio.wrap_future(flight.future)
+            except Exception:
+                # 发起方失败/被取消, 自行发送
+                return {**await send(), "coalesced": False}
+            return {**copy.deepcopy(result), "coalesced": True}
+
+        try:
+            result = await send()
+        except BaseException as exc:
+            self._finish(key, flight, None, exc if isinstance(exc, Exception) else RuntimeError("合并请求的发起方已取消"))
+            raise
+        self._finish(key, flight, copy.deepcopy(result))
+        return {**result, "coalesced": False}
+
+
+request_coalescer = RequestCoalescer(
+    window_ms=project_config.COALESCE_WINDOW_MS,
+    enabled=project_config.COALESCE_ENABLED,
+)
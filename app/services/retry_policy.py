@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : retry_policy.py
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from app.core.config import get_config
+from app.services.host_limiter import host_key
+
+project_config = get_config()
+
+"""
+重试与对冲请求
+    1.策略来源: ApiRequest.retry_policy, 场景步骤 TestScenarioCase.retry_policy 按字段覆盖
+    2.重试条件: 响应状态码在 retry_status_codes 中, 或异常类型(httpx 异常类名, 支持父类如 TransportError) 在 retry_exceptions 中
+    3.退避: min(max_backoff_ms, backoff_ms * multiplier^(n-1)), jitter=True 时在 [0, 退避] 内随机(full jitter)
+    4.deadline_ms: 所有尝试(含退避等待) 的总时长上限, 每次尝试的超时不超过剩余时间
+    5.对冲(hedge): 仅幂等方法(GET/HEAD/OPTIONS), 第一个请求超过 hedge_delay_ms(未配置时取该 host 最近成功请求的 p95) 仍未返回时
+      再发一个相同请求, 采用先返回的结果, 另一个取消
+    6.每次尝试记录为 {"n", "status", "ms", "error", "hedged", "winner", "backoff_ms"} 写入 ApiRequestRun.attempts
+"""
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+SendFunc = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 1
+    retry_status_codes: list[int] = field(default_factory=lambda: [502, 503, 504])
+    retry_exceptions: list[str] = field(
+        default_factory=lambda: ["ConnectError", "ConnectTimeout", "ReadError", "RemoteProtocolError"]
+    )
+    backoff_ms: int = 200
+    backoff_multiplier: float = 2.0
+    max_backoff_ms: int = 5000
+    jitter: bool = True
+    deadline_ms: int | None = None
+    hedge: bool = False
+    hedge_delay_ms: int | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RetryPolicy":
+        known = {key: value for key, value in data.items() if key in cls.__dataclass_fields__ and value is not None}
+        return cls(**known)
+
+    def backoff_for(self, attempt_no: int) -> float:
+        """第 attempt_no 次失败后的等待时间(毫秒)"""
+
+        delay = min(float(self.max_backoff_ms), self.backoff_ms * self.backoff_multiplier ** (attempt_no - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+
+def resolve_retry_policy(
+    request_policy: dict[str, Any] | None, case_policy: dict[str, Any] | None = None
+) -> RetryPolicy | None:
+    """场景步骤的策略按字段覆盖测试用例的策略, 都未配置时返回 None"""
+
+    if not request_policy and not case_policy:
+        return None
+    merged = {**(request_policy or {}), **{k: v for k, v in (case_policy or {}).items() if v is not None}}
+    return RetryPolicy.from_dict(merged)
+
+
+def _exception_matches(error_type: str | None, names: list[str]) -> bool:
+    if not error_type:
+        return False
+    if error_type in names:
+        return True
+    error_cls = getattr(httpx, error_type, None)
+    if not isinstance(error_cls, type):
+        return False
+    for name in names:
+        base = getattr(httpx, name, None)
+        if isinstance(base, type) and issubclass(error_cls, base):
+            return True
+    return False
+
+
+def is_retryable(result: dict[str, Any], policy: RetryPolicy) -> bool:
+    status_code = result.get("response_status_code")
+    if status_code is not None:
+        return status_code in policy.retry_status_codes
+    return _exception_matches(result.get("error_type"), policy.retry_exceptions)
+
+
+class LatencyTracker:
+    """按 host 保存最近成功请求的耗时, 用于计算对冲延迟(p95)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[str, deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str | None, elapsed_ms: int | None):
+        host = host_key(url)
+        if host is None or elapsed_ms is None:
+            return
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(int(elapsed_ms))
+
+    def p95(self, url: str | None) -> int | None:
+        host = host_key(url)
+        with self._lock:
+            samples = list(self._samples.get(host, ())) if host else []
+        if len(samples) < self.min_samples:
+            return None
+        samples.sort()
+        return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+
+latency_tracker = LatencyTracker(
+    window=project_config.RETRY_LATENCY_WINDOW, min_samples=project_config.RETRY_HEDGE_MIN_SAMPLES
+)
+
+
+def _attempt_record(n: int, result: dict[str, Any], **extra) -> dict[str, Any]:
+    record = {"n": n, "status": result.get("response_status_code"), "ms": result.get("response_time_ms")}
+    if result.get("error_type"):
+        record["error"] = result["error_type"]
+    record.update({key: value for key, value in extra.items() if value})
+    return record
+
+
+async def _send_hedged(send: SendFunc, snapshot: dict[str, Any], hedge_delay_ms: int) -> tuple[dict[str, Any], str]:
+    """超过 hedge_delay_ms 未返回时再发一个相同请求, 返回(先完成的结果, primary/hedge)"""
+
+    primary = asyncio.create_task(send(snapshot))
+    done, _ = await asyncio.wait({primary}, timeout=hedge_delay_ms / 1000)
+    if done:
+        return primary.result(), "primary"
+    hedge = asyncio.create_task(send(snapshot))
+    done, pending = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await task
+    winner = primary if primary in done else hedge
+    return winner.result(), "primary" if winner is primary else "hedge"
+
+
+async def execute_with_retry(snapshot: dict[str, Any], policy: RetryPolicy, send: SendFunc) -> dict[str, Any]:
+    """按策略执行, 返回最后一次尝试的结果并附带 attempts"""
+
+    started_at = time.monotonic()
+    deadline = started_at + policy.deadline_ms / 1000 if policy.deadline_ms else None
+    hedge_enabled = policy.hedge and (snapshot.get("method") or "GET").upper() in IDEMPOTENT_METHODS
+    attempts: list[dict[str, Any]] = []
+    result: dict[str, Any] = {}
+    for attempt_no in range(1, max(policy.max_attempts, 1) + 1):
+        attempt_snapshot = snapshot
+        if deadline is not None:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            timeout_ms = int(snapshot.get("timeout_ms") or 30000)
+            if remaining_ms < timeout_ms:
+                attempt_snapshot = {**snapshot, "timeout_ms": max(remaining_ms, 1)}
+
+        hedge_delay_ms = None
+        if hedge_enabled:
+            hedge_delay_ms = policy.hedge_delay_ms or latency_tracker.p95(snapshot.get("url"))
+        if hedge_delay_ms:
+            result, winner = await _send_hedged(send, attempt_snapshot, hedge_delay_ms)
+        else:
+            result, winner = await send(attempt_snapshot), None
+        if result.get("response_status_code") is not None and result.get("is_success"):
+            latency_tracker.record(snapshot.get("url"), result.get("response_time_ms"))
+
+        record = _attempt_record(attempt_no, result, hedged=winner is not None and hedge_delay_ms is not None, winner=winner)
+        attempts.append(record)
+        if attempt_no >= policy.max_attempts or not is_retryable(result, policy):
+            break
+        backoff_ms = policy.backoff_for(attempt_no)
+        if deadline is not None and time.monotonic() + backoff_ms / 1000 >= deadline:
+            record["stop"] = "deadline"
+            break
+        record["backoff_ms"] = int(backoff_ms)
+        await asyncio.sleep(backoff_ms / 1000)
+
+    if len(attempts) > 1 and result.get("error_message"):
+        result = {**result, "error_message": f"{result['error_message']} (共尝试 {len(attempts)} 次)"}
+    return {**result, "attempts": attempts}
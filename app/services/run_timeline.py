@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : run_timeline.py
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from app.services.http_phase_timer import PHASE_KEYS
+
+MAX_TIMELINE_SPANS = 5000
+
+
+class RunTimeline:
+    """
+    场景运行瀑布图
+        1.所有偏移量基于 time.perf_counter(单调时钟), 相对场景开始时间, 单位毫秒
+        2.span 结构: {"name", "cat", "start_ms", "dur_ms", "args"}
+        3.超过 max_spans 后只计数不记录, 避免超大场景撑爆 JSON 字段
+    """
+
+    def __init__(self, max_spans: int = MAX_TIMELINE_SPANS):
+        self.origin = time.perf_counter()
+        self.max_spans = max_spans
+        self.spans: list[dict[str, Any]] = []
+        self.dropped = 0
+
+    def offset_ms(self, at: float | None = None) -> float:
+        return round(((time.perf_counter() if at is None else at) - self.origin) * 1000, 3)
+
+    def add(self, name: str, cat: str, start_ms: float, dur_ms: float, **args) -> dict[str, Any] | None:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = {"name": name, "cat": cat, "start_ms": start_ms, "dur_ms": round(max(dur_ms, 0.0), 3)}
+        if args:
+            span["args"] = args
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, cat: str, **args) -> Iterator[dict[str, Any]]:
+        """记录一段耗时, 可在 with 块内向 yield 的 args 补充字段"""
+        started_at = time.perf_counter()
+        extra: dict[str, Any] = dict(args)
+        try:
+            yield extra
+        finally:
+            self.add(name, cat, self.offset_ms(started_at), (time.perf_counter() - started_at) * 1000, **extra)
+
+    def add_phase_spans(self, request_start_ms: float, phase_timings: dict[str, float] | None):
+        """把单次请求的阶段耗时按先后顺序展开成子 span"""
+        cursor = request_start_ms
+        for phase in PHASE_KEYS:
+            dur_ms = (phase_timings or {}).get(phase)
+            if not dur_ms:
+                continue
+            self.add(phase, "http.phase", round(cursor, 3), dur_ms)
+            cursor += dur_ms
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"spans": self.spans, "dropped": self.dropped}
+
+
+def build_chrome_trace(scenario_run_id: int, timeline: dict[str, Any] | None) -> dict[str, Any]:
+    """
+    转换为 Chrome Trace Event Format(可直接用 Perfetto / chrome://tracing 打开)
+        使用 ph="X"(完整事件), ts/dur 单位为微秒, 同一线程内按时间包含关系自动嵌套
+    """
+
+    events: list[dict[str, Any]] = [
+        {"name": "process_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": f"scenario_run {scenario_run_id}"}},
+        {"name": "thread_name", "ph": "M", "pid": 1, "tid": 1, "args": {"name": "runner"}},
+    ]
+    for span in (timeline or {}).get("spans", []):
+        events.append(
+            {
+                "name": span["name"],
+                "cat": span["cat"],
+                "ph": "X",
+                "ts": round(span["start_ms"] * 1000, 1),
+                "dur": round(span["dur_ms"] * 1000, 1),
+                "pid": 1,
+                "tid": 1,
+                "args": span.get("args", {}),
+            }
+        )
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"scenario_run_id": scenario_run_id, "dropped_spans": (timeline or {}).get("dropped", 0)},
+    }
@@ -10,6 +10,7 @@ from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.exceptions import CustomException
+from app.db.query_stats import track_queries
 from app.models.api_request import (
     ApiAssertRule,
     ApiEnvironment,
@@ -24,6 +25,8 @@ from app.models.api_request import (
 )
 from app.services.assertion_evaluator import evaluate_assert_rules
 from app.services.api_request_executor import execute_api_request
+from app.services.cassette import Cassette
+from app.services.run_timeline import RunTimeline
 from app.services.variable_extractor import ExtractRequiredError, apply_extract_rules
 
 
@@ -159,6 +162,8 @@ def build_scenario_run_result(scenario_run: TestScenarioRun) -> dict[str, Any]:
         "failed_request_runs": scenario_run.failed_request_runs,
         "error_message": scenario_run.error_message,
         "runtime_variables": copy.deepcopy(scenario_run.runtime_variables or {}),
+        "cassette_name": scenario_run.cassette_name,
+        "cassette_mode": scenario_run.cassette_mode,
     }
 
 
@@ -168,6 +173,20 @@ async def run_scenario_with_existing_run(
     scenario_obj: TestScenario,
     scenario_run: TestScenarioRun,
 ) -> dict[str, Any]:
+    with track_queries(f"scenario_run {scenario_run.id}") as query_stats:
+        result = await _run_scenario_steps(db=db, scenario_obj=scenario_obj, scenario_run=scenario_run)
+    # SQL 统计随瀑布图一起保存, 便于定位场景内的重复查询
+    scenario_run.timeline = {**(scenario_run.timeline or {}), "db": query_stats.to_dict()}
+    return result
+
+
+async def _run_scenario_steps(
+    *,
+    db: AsyncSession,
+    scenario_obj: TestScenario,
+    scenario_run: TestScenarioRun,
+) -> dict[str, Any]:
+    timeline = RunTimeline()
     runtime_variables: dict[str, Any] = copy.deepcopy(scenario_run.runtime_variables or {})
     total_request_runs = 0
     success_request_runs = 0
@@ -176,7 +195,8 @@ async def run_scenario_with_existing_run(
     resolved_env_id = scenario_run.env_id if scenario_run.env_id is not None else scenario_obj.env_id
     environment_obj = None
     if resolved_env_id is not None:
-        environment_obj = await _get_environment_or_404(db, resolved_env_id)
+        with timeline.span("load_environment", "db", env_id=resolved_env_id):
+            environment_obj = await _get_environment_or_404(db, resolved_env_id)
 
     scenario_run.run_status = "running"
     scenario_run.total_request_runs = total_request_runs
@@ -185,7 +205,8 @@ async def run_scenario_with_existing_run(
     scenario_run.is_success = False
     scenario_run.error_message = None
     scenario_run.touch()
-    await db.flush()
+    with timeline.span("flush_run_status", "db"):
+        await db.flush()
 
     stmt = (
         select(TestScenarioCase)
@@ -198,114 +219,140 @@ async def run_scenario_with_existing_run(
         )
         .order_by(TestScenarioCase.step_no, TestScenarioCase.id)
     )
-    step_list = (await db.execute(stmt)).scalars().all()
+    with timeline.span("load_steps", "db"):
+        step_list = (await db.execute(stmt)).scalars().all()
 
     stop_message = None
+    cassette = None
     try:
+        if scenario_run.cassette_name and scenario_run.cassette_mode:
+            with timeline.span("load_cassette", "cassette"):
+                cassette = Cassette(scenario_run.cassette_name, scenario_run.cassette_mode)
         for step in step_list:
-            await db.refresh(scenario_run, attribute_names=["cancel_requested"])
-            if scenario_run.cancel_requested:
-                stop_message = "场景执行已取消"
-                break
-
-            request_obj = await _get_request_or_404(db, step.request_id)
-            dataset_list = await _resolve_step_datasets(db, request_obj, step)
-
-            for dataset_obj in dataset_list:
-                await db.refresh(scenario_run, attribute_names=["cancel_requested"])
+            with timeline.span(f"step {step.step_no}", "step", scenario_case_id=step.id, request_id=step.request_id):
+                with timeline.span("check_cancel", "db"):
+                    await db.refresh(scenario_run, attribute_names=["cancel_requested"])
                 if scenario_run.cancel_requested:
                     stop_message = "场景执行已取消"
                     break
 
-                execute_result = await execute_api_request(
-                    request_obj=request_obj,
-                    dataset_obj=dataset_obj,
-                    environment_obj=environment_obj,
-                    runtime_variables=runtime_variables,
-                )
-
-                run_obj = ApiRequestRun(
-                    request_id=request_obj.id,
-                    scenario_run_id=scenario_run.id,
-                    scenario_id=scenario_obj.id,
-                    scenario_case_id=step.id,
-                    dataset_id=dataset_obj.id if dataset_obj else None,
-                    dataset_snapshot=execute_result["dataset_snapshot"],
-                    request_snapshot=execute_result["request_snapshot"],
-                    response_status_code=execute_result["response_status_code"],
-                    response_headers=execute_result["response_headers"],
-                    response_body=execute_result["response_body"],
-                    response_time_ms=execute_result["response_time_ms"],
-                    is_success=execute_result["is_success"],
-                    error_message=execute_result["error_message"],
-                )
-                db.add(run_obj)
-                await db.flush()
+                with timeline.span("load_request_and_datasets", "db"):
+                    request_obj = await _get_request_or_404(db, step.request_id)
+                    dataset_list = await _resolve_step_datasets(db, request_obj, step)
 
-                request_obj.execute_count = (request_obj.execute_count or 0) + 1
-                request_obj.touch()
+                for dataset_obj in dataset_list:
+                    with timeline.span("check_cancel", "db"):
+                        await db.refresh(scenario_run, attribute_names=["cancel_requested"])
+                    if scenario_run.cancel_requested:
+                        stop_message = "场景执行已取消"
+                        break
 
-                if run_obj.error_message is None:
-                    assert_rules = await _query_assert_rules(db, request_obj.id, dataset_obj.id if dataset_obj else None)
-                    _, assert_records = evaluate_assert_rules(assert_rules, execute_result)
-                    assert_fail_reasons = [item["detail"] for item in assert_records if not item["passed"] and item.get("detail")]
-                    if assert_fail_reasons:
+                    request_start_ms = timeline.offset_ms()
+                    with timeline.span(
+                        "request",
+                        "http",
+                        request_id=request_obj.id,
+                        dataset_id=dataset_obj.id if dataset_obj else None,
+                    ) as request_span:
+                        execute_result = await execute_api_request(
+                            request_obj=request_obj,
+                            dataset_obj=dataset_obj,
+                            environment_obj=environment_obj,
+                            runtime_variables=runtime_variables,
+                            retry_policy_override=step.retry_policy,
+                            cassette=cassette,
+                        )
+                        request_span["status_code"] = execute_result["response_status_code"]
+                    timeline.add_phase_spans(request_start_ms, execute_result.get("phase_timings"))
+
+                    run_obj = ApiRequestRun(
+                        request_id=request_obj.id,
+                        scenario_run_id=scenario_run.id,
+                        scenario_id=scenario_obj.id,
+                        scenario_case_id=step.id,
+                        dataset_id=dataset_obj.id if dataset_obj else None,
+                        dataset_snapshot=execute_result["dataset_snapshot"],
+                        request_snapshot=execute_result["request_snapshot"],
+                        response_status_code=execute_result["response_status_code"],
+                        response_headers=execute_result["response_headers"],
+                        response_body=execute_result["response_body"],
+                        response_time_ms=execute_result["response_time_ms"],
+                        phase_timings=execute_result.get("phase_timings"),
+                        is_success=execute_result["is_success"],
+                        error_message=execute_result["error_message"],
+                        coalesced=execute_result.get("coalesced", False),
+                        attempts=execute_result.get("attempts"),
+                    )
+                    db.add(run_obj)
+                    with timeline.span("persist_request_run", "db"):
+                        await db.flush()
+
+                    request_obj.execute_count = (request_obj.execute_count or 0) + 1
+                    request_obj.touch()
+
+                    if run_obj.error_message is None:
+                        with timeline.span("assert", "assert", request_run_id=run_obj.id):
+                            assert_rules = await _query_assert_rules(db, request_obj.id, dataset_obj.id if dataset_obj else None)
+                            _, assert_records = evaluate_assert_rules(assert_rules, execute_result)
+                        assert_fail_reasons = [item["detail"] for item in assert_records if not item["passed"] and item.get("detail")]
+                        if assert_fail_reasons:
+                            run_obj.is_success = False
+                            assert_error_message = "; ".join(assert_fail_reasons)
+                            if run_obj.error_message:
+                                run_obj.error_message = f"{run_obj.error_message}; {assert_error_message}"
+                            else:
+                                run_obj.error_message = assert_error_message
+
+                    extract_error = None
+                    rule_records: list[dict[str, Any]] = []
+                    try:
+                        with timeline.span("extract", "extract", request_run_id=run_obj.id):
+                            rules = await _query_extract_rules(db, request_obj.id, dataset_obj.id if dataset_obj else None)
+                            _, rule_records = apply_extract_rules(rules, execute_result, runtime_variables)
+                    except ExtractRequiredError as exc:
+                        extract_error = str(exc)
                         run_obj.is_success = False
-                        assert_error_message = "; ".join(assert_fail_reasons)
+
+                    if extract_error:
                         if run_obj.error_message:
-                            run_obj.error_message = f"{run_obj.error_message}; {assert_error_message}"
+                            run_obj.error_message = f"{run_obj.error_message}; {extract_error}"
                         else:
-                            run_obj.error_message = assert_error_message
-
-                extract_error = None
-                rule_records: list[dict[str, Any]] = []
-                try:
-                    rules = await _query_extract_rules(db, request_obj.id, dataset_obj.id if dataset_obj else None)
-                    _, rule_records = apply_extract_rules(rules, execute_result, runtime_variables)
-                except ExtractRequiredError as exc:
-                    extract_error = str(exc)
-                    run_obj.is_success = False
-
-                if extract_error:
-                    if run_obj.error_message:
-                        run_obj.error_message = f"{run_obj.error_message}; {extract_error}"
-                    else:
-                        run_obj.error_message = extract_error
-
-                for item in rule_records:
-                    db.add(
-                        ApiRunVariable(
-                            scenario_run_id=scenario_run.id,
-                            request_run_id=run_obj.id,
-                            scenario_case_id=step.id,
-                            request_id=request_obj.id,
-                            dataset_id=dataset_obj.id if dataset_obj else None,
-                            var_name=item["var_name"],
-                            var_value=item["var_value"],
-                            value_type=item["value_type"],
-                            source_type=item["source_type"],
-                            source_expr=item["source_expr"],
-                            scope=item["scope"],
-                            is_secret=item["is_secret"],
+                            run_obj.error_message = extract_error
+
+                    for item in rule_records:
+                        db.add(
+                            ApiRunVariable(
+                                scenario_run_id=scenario_run.id,
+                                request_run_id=run_obj.id,
+                                scenario_case_id=step.id,
+                                request_id=request_obj.id,
+                                dataset_id=dataset_obj.id if dataset_obj else None,
+                                var_name=item["var_name"],
+                                var_value=item["var_value"],
+                                value_type=item["value_type"],
+                                source_type=item["source_type"],
+                                source_expr=item["source_expr"],
+                                scope=item["scope"],
+                                is_secret=item["is_secret"],
+                            )
                         )
-                    )
 
-                for item in rule_records:
-                    if item["scope"] in {"scenario", "global"}:
-                        runtime_variables[item["var_name"]] = item["var_value"]
-
-                total_request_runs += 1
-                if run_obj.is_success:
-                    success_request_runs += 1
-                else:
-                    failed_request_runs += 1
-                    stop_on_fail = bool(step.stop_on_fail or scenario_obj.stop_on_fail)
-                    if stop_on_fail:
-                        stop_message = (
-                            f"步骤 {step.step_no} 执行失败: request_id={request_obj.id}, "
-                            f"dataset_id={dataset_obj.id if dataset_obj else 'none'}"
-                        )
-                        break
+                    for item in rule_records:
+                        if item["scope"] in {"scenario", "global"}:
+                            runtime_variables[item["var_name"]] = item["var_value"]
+
+                    total_request_runs += 1
+                    if run_obj.is_success:
+                        success_request_runs += 1
+                    else:
+                        failed_request_runs += 1
+                        stop_on_fail = bool(step.stop_on_fail or scenario_obj.stop_on_fail)
+                        if stop_on_fail:
+                            stop_message = (
+                                f"步骤 {step.step_no} 执行失败: request_id={request_obj.id}, "
+                                f"dataset_id={dataset_obj.id if dataset_obj else 'none'}"
+                            )
+                            break
 
             if stop_message:
                 break
@@ -313,6 +360,14 @@ async def run_scenario_with_existing_run(
         failed_request_runs += 1
         stop_message = str(exc)
 
+    if cassette is not None and cassette.mode == "record":
+        try:
+            with timeline.span("save_cassette", "cassette"):
+                cassette.save()
+        except OSError as exc:
+            failed_request_runs += 1
+            stop_message = f"{stop_message}; 录制文件保存失败: {exc}" if stop_message else f"录制文件保存失败: {exc}"
+
     if scenario_run.cancel_requested:
         scenario_run.run_status = "canceled"
         scenario_run.is_success = False
@@ -330,6 +385,9 @@ async def run_scenario_with_existing_run(
     scenario_run.failed_request_runs = failed_request_runs
     scenario_run.runtime_variables = runtime_variables
     scenario_run.error_message = stop_message
+    scenario_run.timeline = timeline.to_dict()
+    if cassette is not None:
+        scenario_run.timeline["cassette"] = cassette.summary()
     scenario_run.touch()
 
     return build_scenario_run_result(scenario_run)
@@ -13,11 +13,12 @@ celery_app = Celery(
     "exile-ai-test-platform",
     broker=project_config.celery_broker_url,
     backend=project_config.celery_result_backend,
-    include=["app.tasks.scenario_tasks"],
+    include=["app.tasks.scenario_tasks", "app.tasks.load_tasks", "app.tasks.worker_control"],
 )
 
 celery_app.conf.update(
     task_default_queue=project_config.CELERY_TASK_QUEUE,
+    task_routes={"load.coordinate": {"queue": project_config.CELERY_LOAD_COORDINATOR_QUEUE}},
     task_track_started=True,
     task_acks_late=True,
     worker_prefetch_multiplier=1,
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : load_tasks.py
+
+from typing import Any
+
+from loguru import logger
+
+from app.core.loop_monitor import run_with_loop_monitor
+from app.db.redis_client import worker_redis_pool
+from app.services.distributed_load import run_load_coordinator, run_load_shard
+from app.tasks.celery_app import celery_app
+
+
+async def _run_shard(load_id: str, shard_index: int) -> dict[str, Any]:
+    async with worker_redis_pool() as redis:
+        return await run_load_shard(redis, load_id, shard_index)
+
+
+@celery_app.task(name="load.shard", bind=True)
+def run_load_shard_task(self, load_id: str, shard_index: int) -> dict[str, Any]:
+    """Celery task: 执行分布式压测的一个分片"""
+    logger.info(f"Celery 开始执行压测分片: load_id={load_id}, shard={shard_index}")
+    return run_with_loop_monitor(_run_shard(str(load_id), int(shard_index)))
+
+
+def dispatch_load_shard_task(load_id: str, shard_index: int) -> str | None:
+    """派发压测分片到 Celery 队列"""
+    result = run_load_shard_task.delay(load_id, shard_index)
+    return result.id
+
+
+async def _run_coordinator(load_id: str) -> dict[str, Any] | None:
+    async with worker_redis_pool() as redis:
+        return await run_load_coordinator(redis, load_id)
+
+
+@celery_app.task(name="load.coordinate", bind=True)
+def run_load_coordinator_task(self, load_id: str) -> dict[str, Any] | None:
+    """Celery task: 分布式压测协调端(合并分片结果/按错误率终止/保存最终报告)"""
+    logger.info(f"Celery 开始执行压测协调端: load_id={load_id}")
+    report = run_with_loop_monitor(_run_coordinator(str(load_id)))
+    return {"load_id": load_id, "status": report["status"] if report else "failed"}
+
+
+def dispatch_load_coordinator_task(load_id: str) -> str | None:
+    """派发压测协调端到独立队列 CELERY_LOAD_COORDINATOR_QUEUE(见 celery_app.task_routes), 不与分片争抢执行槽位"""
+    result = run_load_coordinator_task.delay(load_id)
+    return result.id
@@ -3,14 +3,20 @@
 # @Author  : yangyuexiong
 # @File    : scenario_tasks.py
 
-import asyncio
-
 from loguru import logger
 
+from app.core.loop_monitor import run_with_loop_monitor
+from app.db.redis_client import worker_redis_pool
 from app.services.scenario_run_queue import process_scenario_run_message
 from app.tasks.celery_app import celery_app
 
 
+async def _process_scenario_run(run_id: int) -> bool:
+    # 执行器的分布式限流依赖 Redis
+    async with worker_redis_pool():
+        return await process_scenario_run_message({"scenario_run_id": run_id})
+
+
 @celery_app.task(name="scenario.run", bind=True)
 def run_scenario_task(self, scenario_run_id: int) -> bool:
     """Celery task: 执行测试场景运行记录"""
@@ -21,4 +27,4 @@ def run_scenario_task(self, scenario_run_id: int) -> bool:
         return False
 
     logger.info(f"Celery 开始执行场景: scenario_run_id={run_id}")
-    return asyncio.run(process_scenario_run_message({"scenario_run_id": run_id}))
+    return run_with_loop_monitor(_process_scenario_run(run_id))
@@ -6,21 +6,32 @@
 # @Software: PyCharm
 
 import pytz
+import zlib
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.schedulers.base import SchedulerNotRunningError
+from contextlib import suppress
+from loguru import logger
 from sqlalchemy import select
 
+from app.core.config import get_config
+from app.db.redis_pubsub import RedisChannelSubscriber, publish_message
 from app.db.session import AsyncSessionLocal
 from app.models.aps_task import ApsTask
-from app.tasks import tasks as TaskDict
+from app.schemas.aps_task import APS_TASK_TRIGGER_PARAM_KEYS
+from app.tasks.tasks import SCHEDULABLE_TASKS
+from app.tasks.scheduler_leader import IdempotentAsyncIOExecutor, SchedulerLeaderElector
 
-scheduler = AsyncIOScheduler()
+project_config = get_config()
+
+scheduler = AsyncIOScheduler(executors={"default": IdempotentAsyncIOExecutor()})
 
 
 class TriggerType(str, Enum):
@@ -29,13 +40,47 @@ class TriggerType(str, Enum):
     cron = "cron"
 
 
+def stable_jitter_seconds(task_id: str, jitter: int) -> int:
+    """按任务ID散列出 [0, jitter] 内的固定偏移(秒)"""
+
+    if not jitter or jitter <= 0:
+        return 0
+    return zlib.crc32(task_id.encode()) % (int(jitter) + 1)
+
+
+class StableJitterTrigger(BaseTrigger):
+    """
+    固定偏移触发器
+        APScheduler 自带的 jitter 为随机值, 各实例算出的触发时间不同, 会导致主节点切换时幂等令牌失效;
+        这里按任务ID散列出固定偏移, 既能打散同一时刻的 cron, 又保证各实例触发时间一致。
+    """
+
+    def __init__(self, trigger: BaseTrigger, offset_seconds: int):
+        self.trigger = trigger
+        self.offset = timedelta(seconds=offset_seconds)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        previous = previous_fire_time - self.offset if previous_fire_time else None
+        next_fire_time = self.trigger.get_next_fire_time(previous, now - self.offset)
+        if next_fire_time is None:
+            return None
+        return next_fire_time + self.offset
+
+    def __str__(self):
+        return f"{self.trigger} +{int(self.offset.total_seconds())}s"
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} ({self.trigger!r}, offset={int(self.offset.total_seconds())}s)>"
+
+
 class TriggerHandler:
     """TriggerHandler(返回:trigger)"""
 
     def __init__(self, task_id: str, trigger_type: TriggerType, trigger_time: str = None, interval_kw: dict = None,
                  cron_expression: str = None, timezone=pytz.timezone('Asia/Shanghai'), task_function_name: str = None,
                  skip_function_check: bool = False, task_function=None,
-                 task_function_args: list = None, task_function_kwargs: dict = None):
+                 task_function_args: list = None, task_function_kwargs: dict = None,
+                 jitter: int = None, coalesce: bool = True, misfire_grace_time: int = None, max_instances: int = 1):
 
         self.task_id = task_id  # 任务ID(自定义)
         self.trigger_type = trigger_type  # 触发器类型
@@ -50,6 +95,10 @@ class TriggerHandler:
         self.task_function = task_function  # 任务函数`get_task_function`返回设值
         self.task_function_args = task_function_args  # 定时任务函数args参数
         self.task_function_kwargs = task_function_kwargs  # 定时任务函数kwargs参数
+        self.jitter = jitter  # 触发抖动上限(秒),为`None`时使用配置`SCHEDULER_DEFAULT_JITTER`,`date`触发器不生效
+        self.coalesce = coalesce  # 多次错过的触发是否合并为一次
+        self.misfire_grace_time = misfire_grace_time  # 错过触发后允许补执行的宽限期(秒)
+        self.max_instances = max_instances  # 同一任务在本进程内的最大并发实例数
 
     def date_trigger(self):
         """DateTrigger"""
@@ -98,6 +147,15 @@ class TriggerHandler:
             "cron": self.cron_trigger
         }
         self.trigger = trigger_dict.get(self.trigger_type)()
+
+        if self.trigger_type != TriggerType.date:
+            jitter = project_config.SCHEDULER_DEFAULT_JITTER if self.jitter is None else self.jitter
+            offset_seconds = stable_jitter_seconds(self.task_id, jitter)
+            if offset_seconds:
+                self.trigger = StableJitterTrigger(self.trigger, offset_seconds)
+            if self.jitter is not None:
+                self.trigger_param["jitter"] = self.jitter
+
         return self.trigger
 
     def get_task_function(self):
@@ -106,11 +164,11 @@ class TriggerHandler:
         if self.skip_function_check:
             return self.task_function
 
-        if hasattr(TaskDict, self.task_function_name):
-            self.task_function = getattr(TaskDict, self.task_function_name)
-            return self.task_function
-        else:
-            raise AttributeError(f"任务函数 '{self.task_function_name}' 不存在")
+        task_function = SCHEDULABLE_TASKS.get(self.task_function_name)
+        if task_function is None:
+            raise AttributeError(f"任务函数 '{self.task_function_name}' 不存在或不允许定时调度")
+        self.task_function = task_function
+        return self.task_function
 
 
 class TaskHandler(TriggerHandler):
@@ -128,7 +186,10 @@ class TaskHandler(TriggerHandler):
                 trigger=self.trigger,
                 id=self.task_id,
                 args=self.task_function_args,
-                kwargs=self.task_function_kwargs
+                kwargs=self.task_function_kwargs,
+                coalesce=self.coalesce,
+                misfire_grace_time=self.misfire_grace_time or project_config.SCHEDULER_MISFIRE_GRACE_TIME,
+                max_instances=self.max_instances
             )
             return True, f"定时任务: {self.task_id} 新增成功"
         except ConflictingIdError as e:
@@ -184,6 +245,31 @@ class TaskHandler(TriggerHandler):
         return task_states
 
 
+def build_task_handler(task: ApsTask):
+    """根据`ApsTask`构造任务处理器,`trigger_param`为空时返回`None`"""
+
+    trigger_param: dict = task.trigger_param
+    if not trigger_param:
+        return None
+
+    task_handler = TaskHandler(
+        task_id=task.task_id,
+        trigger_type=task.trigger_type,
+        # trigger_time=request_data.trigger_time,
+        # interval_kw=request_data.interval_kw,
+        # cron_expression=request_data.cron_expression,
+        task_function_name=task.task_function_name,
+        task_function_args=task.task_function_args,
+        task_function_kwargs=task.task_function_kwargs
+    )
+
+    for k, v in trigger_param.items():
+        if k in APS_TASK_TRIGGER_PARAM_KEYS:
+            setattr(task_handler, k, v)
+
+    return task_handler
+
+
 async def scheduler_init():
     """初始化定时任务"""
 
@@ -192,62 +278,72 @@ async def scheduler_init():
         tasks = (await db.execute(stmt)).scalars().all()
 
     for task in tasks:
-        task_id = task.task_id
-        trigger_type = task.trigger_type
-        trigger_param: dict = task.trigger_param
-        task_function_name = task.task_function_name
-        task_function_args = task.task_function_args
-        task_function_kwargs = task.task_function_kwargs
-
-        if trigger_param:
-            task_handler = TaskHandler(
-                task_id=task_id,
-                trigger_type=trigger_type,
-                # trigger_time=request_data.trigger_time,
-                # interval_kw=request_data.interval_kw,
-                # cron_expression=request_data.cron_expression,
-                task_function_name=task_function_name,
-                task_function_args=task_function_args,
-                task_function_kwargs=task_function_kwargs
-            )
-
-            for k, v in trigger_param.items():
-                setattr(task_handler, k, v)
-
-            task_handler.add_task()
-
-    test1 = TaskHandler(
-        task_id=TaskDict.test_sync_task.__name__,
-        trigger_type=TriggerType.interval,
-        interval_kw={
-            "weeks": 0,
-            "days": 0,
-            "hours": 0,
-            "minutes": 0,
-            "seconds": 5,
-            "start_date": None,
-            "end_date": None
-        },
-        task_function_name=TaskDict.test_sync_task.__name__
-    )
-    result, message = test1.add_task()
-    print(result, message)
-
-    test2 = TaskHandler(
-        task_id=TaskDict.test_async_task.__name__,
-        trigger_type=TriggerType.interval,
-        interval_kw={
-            "weeks": 0,
-            "days": 0,
-            "hours": 0,
-            "minutes": 0,
-            "seconds": 5,
-            "start_date": None,
-            "end_date": None
-        },
-        task_function_name=TaskDict.test_async_task.__name__
-    )
-    result, message = test2.add_task()
-    print(result, message)
+        # 单个任务参数错误(函数已移除/cron 非法等)只跳过该任务, 否则 leader 每次当选都会失败并反复交出租约
+        try:
+            task_handler = build_task_handler(task)
+            if task_handler:
+                result, message = task_handler.add_task()
+                if not result:
+                    logger.warning(message)
+        except Exception:
+            logger.exception(f"定时任务: {task.task_id} 加载失败, 已跳过")
 
     scheduler.start()
+
+
+async def scheduler_stop():
+    """停止定时任务(清空任务, 重新当选时由`scheduler_init`重新加载)"""
+
+    scheduler.remove_all_jobs()
+    if getattr(scheduler, "running", False):
+        with suppress(SchedulerNotRunningError):
+            scheduler.shutdown(wait=False)
+
+
+async def publish_aps_task_event(action: str, aps_task_id: int, task_id: str):
+    """
+    广播定时任务变更事件
+    :param action: upsert-新增/更新; remove-删除
+    :param aps_task_id: `ApsTask.id`
+    :param task_id: 任务ID
+    """
+
+    data = {"action": action, "id": aps_task_id, "task_id": task_id}
+    try:
+        await publish_message(project_config.SCHEDULER_TASK_CHANNEL, data)
+    except Exception:
+        # 数据库为准, leader 重新当选时会全量加载
+        logger.exception(f"定时任务变更广播失败: {data}")
+
+
+async def apply_aps_task_event(data: dict):
+    """增量应用定时任务变更(仅对运行中的调度器生效)"""
+
+    if not getattr(scheduler, "running", False):
+        return
+
+    action = data.get("action")
+    task_id = data.get("task_id")
+    if action == "remove":
+        result, message = TaskHandler.remove_task(task_id=task_id)
+        logger.info(message)
+        return
+
+    async with AsyncSessionLocal() as db:
+        stmt = select(ApsTask).where(ApsTask.id == data.get("id"))
+        task = (await db.execute(stmt)).scalars().first()
+
+    if scheduler.get_job(task_id):
+        TaskHandler.remove_task(task_id=task_id)
+
+    task_handler = build_task_handler(task) if task and task.is_deleted == 0 else None
+    if not task_handler:
+        logger.info(f"定时任务: {task_id} 已删除或缺少触发器参数, 仅移除")
+        return
+
+    result, message = task_handler.add_task()
+    logger.info(message)
+
+
+scheduler_leader = SchedulerLeaderElector(on_elected=scheduler_init, on_revoked=scheduler_stop)
+aps_task_subscriber = RedisChannelSubscriber(project_config.SCHEDULER_TASK_CHANNEL, apply_aps_task_event)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : scheduler_leader.py
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import datetime
+
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from loguru import logger
+
+from app.core.config import get_config
+from app.db.redis_client import get_redis_pool
+
+project_config = get_config()
+
+SCHEDULER_JOB_TOKEN_PREFIX = "exile:scheduler:fired:"
+
+# 仅当租约持有者仍是自己时才续约/释放，避免误操作其他实例的租约
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def build_instance_id() -> str:
+    """实例标识: 主机名:进程号:随机串"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def build_job_fire_token(job_id: str, run_time: datetime) -> str:
+    """定时任务触发幂等令牌: 任务ID + 计划触发时间(毫秒)"""
+    return f"{SCHEDULER_JOB_TOKEN_PREFIX}{job_id}:{int(run_time.timestamp() * 1000)}"
+
+
+async def claim_job_fire_token(job_id: str, run_time: datetime, ttl: int | None = None) -> bool:
+    """抢占一次触发的幂等令牌，返回 False 表示该次触发已被其他实例执行"""
+    pool = await get_redis_pool()
+    token = build_job_fire_token(job_id, run_time)
+    claimed = await pool.set(token, os.getpid(), nx=True, ex=ttl or project_config.SCHEDULER_JOB_TOKEN_TTL)
+    return bool(claimed)
+
+
+class IdempotentAsyncIOExecutor(AsyncIOExecutor):
+    """提交任务前抢占幂等令牌，保证同一次触发在主节点切换期间只执行一次"""
+
+    def _do_submit_job(self, job, run_times):
+        parent = super(IdempotentAsyncIOExecutor, self)
+
+        async def claim_and_submit():
+            try:
+                claimed = await claim_job_fire_token(job.id, run_times[-1])
+            except Exception:
+                # Redis 不可用时无法保证幂等，宁可跳过也不重复执行
+                logger.exception(f"定时任务: {job.id} 抢占触发令牌失败，跳过本次执行")
+                claimed = False
+
+            if claimed:
+                parent._do_submit_job(job, run_times)
+            else:
+                logger.info(f"定时任务: {job.id} 本次触发已被执行，跳过: {run_times[-1]}")
+                self._run_job_success(job.id, [])
+
+        future = self._eventloop.create_task(claim_and_submit())
+        self._pending_futures.add(future)
+        future.add_done_callback(self._pending_futures.discard)
+
+
+class SchedulerLeaderElector:
+    """
+    基于 Redis 租约的定时任务选主
+        1.各实例每隔 renew_interval 秒尝试 `SET key instance_id NX PX ttl` 竞选
+        2.leader 每隔 renew_interval 秒续约, 续约失败(租约已被他人持有/已过期)立即让出
+        3.leader 异常退出后租约最多 lease_ttl 秒过期, follower 在下一次竞选时接管
+    """
+
+    def __init__(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_revoked: Callable[[], Awaitable[None]],
+        key: str | None = None,
+        lease_ttl: int | None = None,
+        renew_interval: int | None = None,
+        instance_id: str | None = None,
+    ):
+        self.on_elected = on_elected  # 当选后回调(启动调度器)
+        self.on_revoked = on_revoked  # 失去 leader 后回调(停止调度器)
+        self.key = key or project_config.SCHEDULER_LEADER_KEY
+        self.lease_ttl = lease_ttl or project_config.SCHEDULER_LEASE_TTL
+        self.renew_interval = renew_interval or project_config.SCHEDULER_LEASE_RENEW_INTERVAL
+        self.instance_id = instance_id or build_instance_id()
+        self.is_leader = False
+
+        self._lease_deadline = 0.0  # 本地视角下租约安全期截止时间(monotonic)
+        self._task: asyncio.Task | None = None
+
+    @property
+    def lease_ttl_ms(self) -> int:
+        return int(self.lease_ttl * 1000)
+
+    def _refresh_lease_deadline(self):
+        # 预留一个续约间隔的余量，保证本地先于 Redis 判定租约过期
+        self._lease_deadline = time.monotonic() + max(self.lease_ttl - self.renew_interval, 0)
+
+    async def try_acquire(self) -> bool:
+        """竞选 leader"""
+        pool = await get_redis_pool()
+        acquired = await pool.set(self.key, self.instance_id, nx=True, px=self.lease_ttl_ms)
+        if acquired:
+            self._refresh_lease_deadline()
+        return bool(acquired)
+
+    async def renew(self) -> bool:
+        """续约"""
+        pool = await get_redis_pool()
+        renewed = await pool.eval(RENEW_LEASE_SCRIPT, 1, self.key, self.instance_id, self.lease_ttl_ms)
+        if renewed:
+            self._refresh_lease_deadline()
+        return bool(renewed)
+
+    async def release(self) -> bool:
+        """主动释放租约，follower 无需等待过期即可接管"""
+        pool = await get_redis_pool()
+        released = await pool.eval(RELEASE_LEASE_SCRIPT, 1, self.key, self.instance_id)
+        return bool(released)
+
+    async def tick(self):
+        """执行一次竞选或续约"""
+
+        if self.is_leader:
+            try:
+                renewed = await self.renew()
+            except Exception:
+                logger.exception(f"定时任务 leader 续约异常: {self.instance_id}")
+                # 网络抖动时在安全期内保留 leader 身份
+                renewed = time.monotonic() < self._lease_deadline
+            if not renewed:
+                logger.warning(f"定时任务 leader 租约丢失，让出调度: {self.instance_id}")
+                await self._step_down()
+            return
+
+        try:
+            acquired = await self.try_acquire()
+        except Exception:
+            logger.exception(f"定时任务 leader 竞选异常: {self.instance_id}")
+            return
+        if acquired:
+            await self._become_leader()
+
+    async def _become_leader(self):
+        self.is_leader = True
+        logger.info(f">>> 当选定时任务 leader: {self.instance_id}")
+        try:
+            await self.on_elected()
+        except Exception:
+            logger.exception(f"定时任务 leader 启动调度器失败，释放租约: {self.instance_id}")
+            await self._step_down()
+            with suppress(Exception):
+                await self.release()
+
+    async def _step_down(self):
+        self.is_leader = False
+        try:
+            await self.on_revoked()
+        except Exception:
+            logger.exception(f"定时任务 leader 停止调度器失败: {self.instance_id}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            await self.tick()
+
+    async def start(self):
+        """启动选主循环(启动时立即竞选一次)"""
+        if self._task:
+            return
+        await self.tick()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f">>> 定时任务选主已启动: {self.instance_id}, leader={self.is_leader}")
+
+    async def stop(self):
+        """停止选主循环，leader 主动让出并释放租约"""
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        if self.is_leader:
+            await self._step_down()
+            try:
+                await self.release()
+            except Exception:
+                logger.exception(f"定时任务 leader 释放租约失败: {self.instance_id}")
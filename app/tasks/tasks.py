@@ -5,8 +5,15 @@
 # @File    : tasks.py
 # @Software: PyCharm
 
+import time
+
+from loguru import logger
+from sqlalchemy import and_, func, select
 
 from app.core.config import get_config
+from app.db.session import AsyncSessionLocal
+from app.models.api_request import TestScenario, TestScenarioRun
+from app.services.scenario_task_dispatcher import dispatch_scenario_run_task
 
 project_config = get_config()
 
@@ -20,3 +27,81 @@ async def test_async_task(*args, **kwargs):
 def test_sync_task(*args, **kwargs):
     import os
     print(f"test_sync_task: {os.getenv('yyx')}", args, kwargs)
+
+
+async def run_scenario(scenario_id: int, env_id: int = None, initial_variables: dict = None,
+                       max_concurrent_runs: int = None):
+    """
+    定时执行测试场景: 创建`trigger_type=schedule`的运行记录并派发到 Celery 队列
+    :param scenario_id: 场景ID
+    :param env_id: 覆盖环境ID
+    :param initial_variables: 初始变量上下文
+    :param max_concurrent_runs: 同一场景 queued/running 的最大运行数, 达到上限时跳过本次触发
+    :return: 场景运行ID, 跳过时返回`None`
+    计数前对场景行加锁(SELECT ... FOR UPDATE), 同一场景的多个定时触发串行执行 计数 -> 新增, 不会同时越过上限;
+    手动执行不受该上限限制, 但会计入运行数
+    """
+
+    max_concurrent_runs = max_concurrent_runs or project_config.SCHEDULER_SCENARIO_MAX_CONCURRENT_RUNS
+    stale_timestamp = int(time.time()) - project_config.SCHEDULER_SCENARIO_RUN_STALE_SECONDS
+
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            select(TestScenario)
+            .where(and_(TestScenario.id == scenario_id, TestScenario.is_deleted == 0))
+            .with_for_update()  # 行锁持有到本事务提交, 保证 计数 -> 新增 原子
+        )
+        scenario_obj = (await db.execute(stmt)).scalars().first()
+        if not scenario_obj:
+            logger.warning(f"定时执行场景跳过: 测试场景 {scenario_id} 不存在")
+            return None
+
+        active_stmt = select(func.count()).select_from(TestScenarioRun).where(
+            and_(
+                TestScenarioRun.scenario_id == scenario_obj.id,
+                TestScenarioRun.run_status.in_(["queued", "running"]),
+                TestScenarioRun.create_timestamp >= stale_timestamp,
+            )
+        )
+        active_runs = (await db.execute(active_stmt)).scalar_one()
+        if active_runs >= max_concurrent_runs:
+            logger.info(f"定时执行场景跳过: 场景 {scenario_obj.id} 运行中 {active_runs} 个, 上限 {max_concurrent_runs}")
+            return None
+
+        scenario_run = TestScenarioRun(
+            scenario_id=scenario_obj.id,
+            env_id=env_id,
+            trigger_type="schedule",
+            run_status="queued",
+            cancel_requested=False,
+            total_request_runs=0,
+            success_request_runs=0,
+            failed_request_runs=0,
+            is_success=False,
+            runtime_variables=initial_variables or {},
+            error_message=None,
+        )
+        db.add(scenario_run)
+        await db.commit()
+        await db.refresh(scenario_run)
+
+        try:
+            task_id = dispatch_scenario_run_task(scenario_run.id)
+        except Exception as exc:
+            logger.exception(f"定时执行场景入队失败: scenario_run_id={scenario_run.id}")
+            scenario_run.run_status = "failed"
+            scenario_run.error_message = f"入队失败: {str(exc)}"
+            scenario_run.touch()
+            await db.commit()
+            return None
+
+    logger.info(f"定时执行场景已入队: scenario_id={scenario_id}, scenario_run_id={scenario_run.id}, task_id={task_id}")
+    return scenario_run.id
+
+
+# 允许定时调度的任务函数(ApsTask.task_function_name -> 函数), 只有登记在此的函数可以被定时任务调用
+SCHEDULABLE_TASKS = {
+    "test_async_task": test_async_task,
+    "test_sync_task": test_sync_task,
+    "run_scenario": run_scenario,
+}
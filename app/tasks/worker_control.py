@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : worker_control.py
+
+from typing import Any
+
+from celery.worker.control import control_command
+
+from app.core.config import get_config
+from app.core.exceptions import CustomException
+from app.core.profiler import profile
+
+project_config = get_config()
+
+"""
+Celery 远程控制命令
+    采样分析指定 worker(--pool=threads 时可覆盖所有执行线程):
+        celery -A app.tasks.celery_app:celery_app control profile 10 speedscope -d celery@worker-1
+    采样期间该 worker 的控制线程阻塞, 不影响执行中的任务
+"""
+
+
+@control_command(
+    name="profile",
+    args=[("seconds", float), ("fmt", str)],
+    signature="[seconds=10] [fmt=collapsed]",
+)
+def profile_worker(state, seconds: float = 10, fmt: str = "collapsed") -> dict[str, Any]:
+    """采样分析当前 worker 进程"""
+
+    if not project_config.PROFILER_ENABLED:
+        return {"error": "采样分析未启用(PROFILER_ENABLED)"}
+    try:
+        return {"ok": profile(float(seconds), fmt)}
+    except CustomException as exc:
+        return {"error": exc.detail}
+
+
+def request_worker_profile(worker: str, seconds: float, fmt: str = "collapsed") -> dict[str, Any]:
+    """向指定 worker 发送采样命令并等待结果(阻塞调用)"""
+
+    from app.tasks.celery_app import celery_app
+
+    replies = celery_app.control.broadcast(
+        "profile",
+        arguments={"seconds": seconds, "fmt": fmt},
+        destination=[worker],
+        reply=True,
+        timeout=seconds + 10,
+    )
+    for reply in replies or []:
+        if worker in reply:
+            result = reply[worker]
+            if "error" in result:
+                raise CustomException(detail=result["error"], custom_code=10005)
+            return result["ok"]
+    raise CustomException(detail=f"worker {worker} 未响应", custom_code=10002)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : hdr_histogram.py
+
+import math
+from typing import Any
+
+
+class HdrHistogram:
+    """
+    HDR(高动态范围) 直方图, 按 HdrHistogram 的对数-线性分桶方式实现
+        1.在 [lowest, highest] 范围内保持 significant_figures 位有效数字精度, 内存只与桶数有关, 与样本数无关
+        2.计数使用稀疏字典保存, 可直接合并(merge) 与序列化(to_dict/from_dict), 便于跨进程/分片汇总
+        3.数值为整数(压测中使用微秒), 超出范围的值截断到边界
+    """
+
+    def __init__(self, lowest: int = 1, highest: int = 3_600_000_000, significant_figures: int = 2):
+        if lowest < 1 or highest < 2 * lowest or not 1 <= significant_figures <= 5:
+            raise ValueError("HdrHistogram 参数不合法")
+        self.lowest = lowest
+        self.highest = highest
+        self.significant_figures = significant_figures
+
+        largest_single_unit = 2 * 10**significant_figures
+        sub_bucket_count_magnitude = max(math.ceil(math.log2(largest_single_unit)), 1)
+        self._unit_magnitude = int(math.floor(math.log2(lowest)))
+        self._sub_bucket_half_count_magnitude = sub_bucket_count_magnitude - 1
+        self._sub_bucket_count = 1 << sub_bucket_count_magnitude
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self._sub_bucket_mask = (self._sub_bucket_count - 1) << self._unit_magnitude
+
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.min: int | None = None
+        self.max: int | None = None
+
+    def _counts_index(self, value: int) -> int:
+        bucket_index = (value | self._sub_bucket_mask).bit_length() - self._unit_magnitude - (
+            self._sub_bucket_half_count_magnitude + 1
+        )
+        sub_bucket_index = value >> (bucket_index + self._unit_magnitude)
+        return ((bucket_index + 1) << self._sub_bucket_half_count_magnitude) + (sub_bucket_index - self._sub_bucket_half_count)
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        if index < self._sub_bucket_count:
+            bucket_index, sub_bucket_index = 0, index
+        else:
+            bucket_index = (index >> self._sub_bucket_half_count_magnitude) - 1
+            sub_bucket_index = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        shift = bucket_index + self._unit_magnitude
+        return (sub_bucket_index << shift) + (1 << shift) - 1
+
+    def record(self, value: int, count: int = 1):
+        value = min(max(int(value), 0), self.highest)
+        index = self._counts_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "HdrHistogram"):
+        if (other.lowest, other.highest, other.significant_figures) != (self.lowest, self.highest, self.significant_figures):
+            raise ValueError("只能合并相同配置的 HdrHistogram")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.total if self.total else None
+
+    def value_at_percentile(self, percentile: float) -> int | None:
+        """返回该分位所在桶的最大等价值(与 HdrHistogram 一致), 不会超过实际最大值"""
+
+        if not self.total:
+            return None
+        target = max(math.ceil(min(max(percentile, 0.0), 100.0) / 100 * self.total), 1)
+        running = 0
+        for index in sorted(self.counts):
+            running += self.counts[index]
+            if running >= target:
+                return min(self._highest_equivalent_value(index), self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "lowest": self.lowest,
+            "highest": self.highest,
+            "significant_figures": self.significant_figures,
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "total": self.total,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HdrHistogram":
+        obj = cls(data["lowest"], data["highest"], data["significant_figures"])
+        obj.counts = {int(index): int(count) for index, count in data.get("counts", {}).items()}
+        obj.total = int(data.get("total", 0))
+        obj.sum = int(data.get("sum", 0))
+        obj.min = data.get("min")
+        obj.max = data.get("max")
+        return obj
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : ttl_cache.py
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """
+    进程内 TTL + LRU 缓存
+        1.超过 maxsize 时淘汰最久未使用的键
+        2.每次失效操作都会递增 version, 读取前记录 version, 写入时 version 不一致则放弃写入,
+          避免"读 Redis/DB -> 其他请求失效 -> 旧值回填"的竞态
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        expire_at, value = item
+        if expire_at <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, version: int | None = None) -> bool:
+        if version is not None and version != self.version:
+            return False
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return True
+
+    def pop(self, key):
+        self.version += 1
+        self._data.pop(key, None)
+
+    def clear(self):
+        self.version += 1
+        self._data.clear()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from app.models.api_request import ApiAssertRule
+from app.services.assertion_evaluator import evaluate_assert_rules
+
+
+def _build_rule(assert_type: str, source_expr: str | None, expected_value, comparator: str = "eq") -> ApiAssertRule:
+    return ApiAssertRule(
+        request_id=1,
+        assert_type=assert_type,
+        source_expr=source_expr,
+        comparator=comparator,
+        expected_value=expected_value,
+        is_enabled=True,
+        sort=0,
+    )
+
+
+RESPONSE_BODY = json.dumps({"code": 0, "data": {"items": [{"id": i, "ok": True} for i in range(20000)]}})
+EXECUTE_RESULT = {"response_status_code": 200, "response_headers": {}, "response_body": RESPONSE_BODY}
+RULES = [
+    _build_rule("status_code", None, 200),
+    _build_rule("json_path", "$.code", 0),
+    _build_rule("json_path", "$.data.items[0].ok", True),
+    _build_rule("json_path", "$.data.items[19999].id", 19999),
+]
+
+
+def bench_evaluate_assert_rules(benchmark):
+    passed, records = benchmark(evaluate_assert_rules, RULES, EXECUTE_RESULT)
+
+    assert len(records) == len(RULES)
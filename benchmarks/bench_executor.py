@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from app.models.api_request import ApiEnvironment, ApiRequest, ApiRequestDataset
+from app.services.api_request_executor import _deep_merge_dict, _render_with_variables, build_request_snapshot
+
+
+def _nested_body(depth: int, width: int) -> dict:
+    if depth == 0:
+        return {f"field_{i}": f"value {{{{var_{i % 20}}}}} tail" for i in range(width)}
+    return {f"node_{i}": _nested_body(depth - 1, width) for i in range(width)}
+
+
+VARIABLES = {f"var_{i}": f"v{i}" * 8 for i in range(20)}
+LARGE_BODY = _nested_body(depth=3, width=10)  # 约 1 万个叶子节点
+LARGE_LIST_BODY = {"items": [{"id": i, "name": "{{var_1}}", "token": "{{ var_2 }}"} for i in range(5000)]}
+
+
+def _build_request() -> tuple[ApiRequest, ApiRequestDataset, ApiEnvironment]:
+    request_obj = ApiRequest(
+        id=1,
+        env_id=1,
+        name="bench",
+        method="post",
+        url="https://{{var_0}}.example.com/api/{{var_1}}",
+        base_query_params={f"q{i}": "{{var_3}}" for i in range(20)},
+        base_headers={f"x-h{i}": "{{var_4}}" for i in range(20)},
+        base_cookies={},
+        body_type="json",
+        base_body_data=LARGE_BODY,
+        base_body_raw=None,
+        timeout_ms=30000,
+        follow_redirects=True,
+        verify_ssl=True,
+        proxy_url=None,
+    )
+    dataset_obj = ApiRequestDataset(
+        id=2,
+        request_id=1,
+        name="dataset",
+        variables={"var_5": "dataset"},
+        query_params={},
+        headers={"x-dataset": "1"},
+        cookies={},
+        body_type=None,
+        body_data={"node_0": {"node_0": {"override": True}}},
+        body_raw=None,
+        expected={},
+    )
+    environment_obj = ApiEnvironment(id=1, name="env", variables=VARIABLES)
+    return request_obj, dataset_obj, environment_obj
+
+
+def bench_build_request_snapshot_large_body(benchmark):
+    request_obj, dataset_obj, environment_obj = _build_request()
+
+    snapshot = benchmark(build_request_snapshot, request_obj, dataset_obj, environment_obj, {"var_6": "runtime"})
+
+    assert snapshot["url"] == f"https://{VARIABLES['var_0']}.example.com/api/{VARIABLES['var_1']}"
+
+
+def bench_render_with_variables_nested(benchmark):
+    result = benchmark(_render_with_variables, LARGE_BODY, VARIABLES)
+
+    assert result["node_0"]["node_0"]["node_0"]["field_1"] == f"value {VARIABLES['var_1']} tail"
+
+
+def bench_render_with_variables_list(benchmark):
+    result = benchmark(_render_with_variables, LARGE_LIST_BODY, VARIABLES)
+
+    assert result["items"][0]["token"] == VARIABLES["var_2"]
+
+
+def bench_deep_merge_dict(benchmark):
+    override = {"node_1": {"node_1": {"node_1": {"field_0": "override"}}}}
+
+    result = benchmark(_deep_merge_dict, LARGE_BODY, override)
+
+    assert result["node_1"]["node_1"]["node_1"]["field_0"] == "override"
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from app.models.api_request import ApiExtractRule
+from app.services.variable_extractor import apply_extract_rules
+
+
+def _build_rule(var_name: str, source_type: str, source_expr: str | None) -> ApiExtractRule:
+    return ApiExtractRule(
+        request_id=1,
+        var_name=var_name,
+        source_type=source_type,
+        source_expr=source_expr,
+        required=True,
+        default_value=None,
+        scope="scenario",
+        is_secret=False,
+    )
+
+
+# 约 1MB 的响应体
+RESPONSE_BODY = json.dumps(
+    {"code": 0, "data": {"items": [{"id": i, "name": f"item-{i}", "tags": ["a", "b", "c"]} for i in range(20000)]}}
+)
+EXECUTE_RESULT = {
+    "response_status_code": 200,
+    "response_headers": {"Content-Type": "application/json", "X-Trace-Id": "abc"},
+    "response_body": RESPONSE_BODY,
+}
+RULES = [
+    _build_rule("code", "response_json", "$.code"),
+    _build_rule("first_id", "response_json", "$.data.items[0].id"),
+    _build_rule("last_name", "response_json", "$.data.items[19999].name"),
+    _build_rule("trace_id", "response_header", "X-Trace-Id"),
+    _build_rule("status", "response_status", None),
+]
+
+
+def bench_apply_extract_rules_1mb_json(benchmark):
+    assert len(RESPONSE_BODY) > 1_000_000
+
+    extracted, records = benchmark(apply_extract_rules, RULES, EXECUTE_RESULT, {})
+
+    assert extracted["last_name"] == "item-19999"
+    assert len(records) == len(RULES)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime
+
+from app.core.pagination import CommonPaginateQuery
+from app.models.api_request import ApiRequest
+from app.schemas.api_request import ApiRequestPageReqData
+
+PAGE_SIZE = 200  # 分页上限
+
+
+class _FakeScalarResult:
+    def __init__(self, items):
+        self._items = items
+
+    def all(self):
+        return self._items
+
+
+class _FakeResult:
+    def __init__(self, items=None, scalar=None):
+        self._items = items or []
+        self._scalar = scalar
+
+    def scalar_one(self):
+        return self._scalar
+
+    def scalars(self):
+        return _FakeScalarResult(self._items)
+
+
+class _FakeDBSession:
+    """第一次 execute 返回总数, 第二次返回当前页数据, 只衡量序列化开销"""
+
+    def __init__(self, items):
+        self.items = items
+        self._calls = 0
+
+    async def execute(self, stmt):
+        self._calls += 1
+        if self._calls % 2:
+            return _FakeResult(scalar=len(self.items) * 10)
+        return _FakeResult(items=self.items)
+
+
+ITEMS = [
+    ApiRequest(
+        id=i,
+        env_id=1,
+        name=f"case-{i}",
+        method="POST",
+        url=f"https://example.com/api/{i}",
+        base_query_params={"page": 1},
+        base_headers={"content-type": "application/json"},
+        base_cookies={},
+        body_type="json",
+        base_body_data={"id": i, "items": list(range(10))},
+        timeout_ms=30000,
+        follow_redirects=True,
+        verify_ssl=True,
+        sort=0,
+        execute_count=i,
+        case_status="已完成",
+        is_deleted=0,
+        create_time=datetime(2026, 1, 1, 12, 0, 0),
+        update_time=datetime(2026, 1, 2, 12, 0, 0),
+    )
+    for i in range(PAGE_SIZE)
+]
+
+
+def _run_page_query():
+    pq = CommonPaginateQuery(
+        request_data=ApiRequestPageReqData(page=1, size=PAGE_SIZE, name="case"),
+        orm_model=ApiRequest,
+        db_session=_FakeDBSession(ITEMS),
+        like_list=["name", "url"],
+        where_list=["creator_id", "case_status", "is_deleted", "is_public_visible", "creator_only_execute"],
+        order_by_list=["-update_time"],
+        skip_list=["is_deleted", "is_public_visible", "creator_only_execute"],
+    )
+    return asyncio.run(pq.build_query())
+
+
+def bench_common_paginate_query_serialization(benchmark):
+    data = benchmark(_run_page_query)
+
+    assert len(data["records"]) == PAGE_SIZE
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from app.api.v1.routers.scenario import _build_scenario_run_report
+from app.models.api_request import ApiRequestRun, TestScenario, TestScenarioCase, TestScenarioRun
+
+STEP_COUNT = 50
+RUN_COUNT = 50000
+
+
+def _build_data():
+    scenario_obj = TestScenario(id=1, name="bench")
+    scenario_run = TestScenarioRun(
+        id=1,
+        scenario_id=1,
+        run_status="failed",
+        total_request_runs=RUN_COUNT,
+        success_request_runs=RUN_COUNT - RUN_COUNT // 10,
+        failed_request_runs=RUN_COUNT // 10,
+        is_success=False,
+        runtime_variables={},
+    )
+    step_list = [
+        TestScenarioCase(id=i, scenario_id=1, request_id=i, step_no=i, dataset_run_mode="all") for i in range(1, STEP_COUNT + 1)
+    ]
+    run_list = [
+        ApiRequestRun(
+            id=i,
+            request_id=i % STEP_COUNT + 1,
+            scenario_run_id=1,
+            scenario_case_id=i % STEP_COUNT + 1,
+            response_status_code=200 if i % 10 else 500,
+            response_time_ms=i % 300,
+            phase_timings={"connect": 1.0, "ttfb": float(i % 200), "total": float(i % 300)},
+            is_success=bool(i % 10),
+            error_message=None if i % 10 else "断言失败",
+        )
+        for i in range(1, RUN_COUNT + 1)
+    ]
+    return scenario_run, scenario_obj, step_list, run_list
+
+
+SCENARIO_RUN, SCENARIO_OBJ, STEP_LIST, RUN_LIST = _build_data()
+
+
+def bench_build_scenario_run_report_50k(benchmark):
+    report = benchmark(_build_scenario_run_report, SCENARIO_RUN, SCENARIO_OBJ, STEP_LIST, RUN_LIST, max_rounds=20)
+
+    assert len(report["step_reports"]) == STEP_COUNT
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : conftest.py
+
+"""
+微基准测试
+    运行: uv run pytest benchmarks
+    保存基线: uv run pytest benchmarks --bench-save benchmarks/baseline.json
+    对比基线: uv run pytest benchmarks --bench-compare benchmarks/baseline.json --bench-threshold 0.2
+    1.每个用例先预热, 再按目标时长自动确定轮数, 记录 min/median/mean/stddev(秒)
+    2.额外单独执行一次并用 tracemalloc 记录峰值内存(不计入耗时)
+    3.对比基线时 min 或峰值内存超过基线 (1 + threshold) 倍视为退化, 会话以失败退出
+"""
+
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+# 统一使用测试环境配置
+os.environ.setdefault("FAST_API_ENV", "test")
+
+_results: dict[str, dict[str, Any]] = {}
+_regressions: list[str] = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption("--bench-save", default=None, help="将本次结果写入指定 JSON 文件")
+    group.addoption("--bench-compare", default=None, help="与指定基线 JSON 对比")
+    group.addoption("--bench-threshold", type=float, default=0.2, help="退化阈值(相对基线的比例)")
+    group.addoption("--bench-min-time", type=float, default=0.5, help="每个用例计时的目标总时长(秒)")
+
+
+class Benchmark:
+
+    def __init__(self, name: str, min_time: float):
+        self.name = name
+        self.min_time = min_time
+        self.stats: dict[str, Any] | None = None
+
+    def __call__(self, func: Callable, *args, rounds: int | None = None, max_rounds: int = 1000, **kwargs) -> Any:
+        result = func(*args, **kwargs)  # 预热, 同时用于估算轮数
+        started_at = time.perf_counter()
+        func(*args, **kwargs)
+        once = max(time.perf_counter() - started_at, 1e-9)
+        rounds = rounds or min(max(int(self.min_time / once), 3), max_rounds)
+
+        timings = []
+        for _ in range(rounds):
+            started_at = time.perf_counter()
+            func(*args, **kwargs)
+            timings.append(time.perf_counter() - started_at)
+
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.stats = {
+            "rounds": rounds,
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "peak_alloc_bytes": peak,
+        }
+        _results[self.name] = self.stats
+        return result
+
+
+@pytest.fixture
+def benchmark(request) -> Benchmark:
+    return Benchmark(request.node.name, request.config.getoption("--bench-min-time"))
+
+
+def _compare(baseline: dict[str, Any], threshold: float) -> list[str]:
+    messages = []
+    for name, stats in _results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("min", "peak_alloc_bytes"):  # min 受调度噪声影响最小
+            if base.get(key) and stats[key] > base[key] * (1 + threshold):
+                messages.append(f"{name}: {key} {base[key]:.6g} -> {stats[key]:.6g} (+{stats[key] / base[key] - 1:.0%})")
+    return messages
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    if not _results:
+        return
+
+    compare_path = config.getoption("--bench-compare")
+    if compare_path:
+        baseline = json.loads(Path(compare_path).read_text(encoding="utf-8")).get("benchmarks", {})
+        _regressions.extend(_compare(baseline, config.getoption("--bench-threshold")))
+        if _regressions and session.exitstatus == 0:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+    save_path = config.getoption("--bench-save")
+    if save_path:
+        payload = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "benchmarks": _results,
+        }
+        Path(save_path).write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("benchmark")
+    terminalreporter.write_line(f"{'name':<48}{'rounds':>8}{'min(ms)':>12}{'median(ms)':>12}{'peak(KiB)':>12}")
+    for name, stats in sorted(_results.items()):
+        terminalreporter.write_line(
+            f"{name:<48}{stats['rounds']:>8}{stats['min'] * 1000:>12.3f}{stats['median'] * 1000:>12.3f}"
+            f"{stats['peak_alloc_bytes'] / 1024:>12.1f}"
+        )
+    if _regressions:
+        terminalreporter.section("benchmark regressions", red=True)
+        for message in _regressions:
+            terminalreporter.write_line(message, red=True)
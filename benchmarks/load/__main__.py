@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from benchmarks.load.harness import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : harness.py
+
+import argparse
+import asyncio
+import json
+import math
+import resource
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import httpx
+from loguru import logger
+from sqlalchemy import and_, delete, func, select
+
+import app.db.redis_client as redis_module
+from app.api.v1.routers import scenario as scenario_router
+from app.db.redis_client import close_redis_connection_pool, create_redis_connection_pool
+from app.db.session import AsyncSessionLocal, engine
+from app.models.admin import Admin
+from app.models.api_request import (
+    ApiRequest,
+    ApiRequestDataset,
+    ApiRequestRun,
+    ApiRunVariable,
+    TestScenario,
+    TestScenarioCase,
+    TestScenarioRun,
+)
+from app.services.scenario_run_queue import process_scenario_run_message
+from benchmarks.load.stub_target import StubServer, StubTarget
+
+"""
+端到端压测
+    uv run python -m benchmarks.load --scenarios 10 --steps 5 --datasets 3 --runs 200 --concurrency 20
+    1.启动本地 StubTarget, 在当前配置的数据库中写入 N 个场景 × M 个步骤 × K 个数据集(名称前缀 loadtest_<tag>_)
+    2.通过进程内 ASGI 调用完整应用的 POST /api/scenario/run(含全部中间件), 每个场景运行执行 M × K 次请求
+    3.worker 模式:
+        inline: 拦截入队, 由当前进程内的 W 个协程直接执行(排除 Celery/Redis 投递开销, 适合定位 runner/executor 瓶颈)
+        celery: 真实投递到 Celery, 需要提前启动 worker(与 API 使用同一配置), 通过 inspect stats 统计 worker CPU
+    4.输出吞吐、接口与端到端延迟分位数、数据库写入行数/秒、CPU 占用, 结束后清理数据(--keep-data 保留)
+"""
+
+LOAD_ADMIN_ID = 910100
+LOAD_ADMIN_NAME = "load_admin"
+LOAD_PREFIX = "loadtest_"
+FINAL_STATUSES = {"success", "failed", "canceled"}
+
+
+@dataclass
+class LoadConfig:
+    scenarios: int = 10
+    steps: int = 5
+    datasets: int = 3
+    runs: int = 100
+    concurrency: int = 10
+    workers: int = 4
+    worker_mode: str = "inline"
+    latency_ms: float = 20
+    jitter_ms: float = 5
+    payload_bytes: int = 1024
+    error_rate: float = 0.0
+    timeout: float = 600
+    poll_interval: float = 0.2
+    keep_data: bool = False
+    tag: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+
+    @property
+    def prefix(self) -> str:
+        return f"{LOAD_PREFIX}{self.tag}_"
+
+
+def percentiles(values: list[float], points=(50, 90, 99)) -> dict[str, float | None]:
+    """最近秩法分位数(毫秒)"""
+
+    if not values:
+        return {**{f"p{p}": None for p in points}, "max": None, "count": 0}
+    ordered = sorted(values)
+    result: dict[str, float | None] = {}
+    for p in points:
+        index = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+        result[f"p{p}"] = round(ordered[index] * 1000, 2)
+    result["max"] = round(ordered[-1] * 1000, 2)
+    result["count"] = len(ordered)
+    return result
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _celery_worker_cpu_seconds() -> float | None:
+    """汇总所有在线 Celery worker 的 CPU 时间(秒), 无 worker 响应时返回 None"""
+
+    from app.tasks.celery_app import celery_app
+
+    stats = celery_app.control.inspect(timeout=2).stats() or {}
+    if not stats:
+        return None
+    return sum(float(item.get("rusage", {}).get("utime", 0)) + float(item.get("rusage", {}).get("stime", 0)) for item in stats.values())
+
+
+async def seed(cfg: LoadConfig, target_url: str) -> list[int]:
+    """写入压测场景, 返回场景 ID 列表"""
+
+    scenario_ids: list[int] = []
+    async with AsyncSessionLocal() as db:
+        for scenario_no in range(cfg.scenarios):
+            scenario_obj = TestScenario(name=f"{cfg.prefix}scenario_{scenario_no}", run_mode="sequence", stop_on_fail=False)
+            db.add(scenario_obj)
+            await db.flush()
+            for step_no in range(1, cfg.steps + 1):
+                request_obj = ApiRequest(
+                    name=f"{cfg.prefix}case_{scenario_no}_{step_no}",
+                    method="POST",
+                    url=f"{target_url}/load/{scenario_no}/{step_no}",
+                    base_query_params={"ds": "{{ds}}"},
+                    base_headers={"x-load-tag": cfg.tag},
+                    body_type="json",
+                    base_body_data={"scenario": scenario_no, "step": step_no, "ds": "{{ds}}"},
+                    timeout_ms=30000,
+                    creator=LOAD_ADMIN_NAME,
+                    creator_id=LOAD_ADMIN_ID,
+                    dataset_run_mode="all",
+                )
+                db.add(request_obj)
+                await db.flush()
+                for ds_no in range(cfg.datasets):
+                    db.add(
+                        ApiRequestDataset(
+                            request_id=request_obj.id,
+                            name=f"{cfg.prefix}ds_{ds_no}",
+                            variables={"ds": ds_no},
+                            is_default=ds_no == 0,
+                            sort=ds_no,
+                        )
+                    )
+                db.add(
+                    TestScenarioCase(
+                        scenario_id=scenario_obj.id,
+                        request_id=request_obj.id,
+                        step_no=step_no,
+                        dataset_run_mode="all",
+                        stop_on_fail=False,
+                    )
+                )
+            scenario_ids.append(scenario_obj.id)
+        await db.commit()
+    return scenario_ids
+
+
+async def cleanup(cfg: LoadConfig):
+    async with AsyncSessionLocal() as db:
+        scenario_ids = (
+            await db.execute(select(TestScenario.id).where(TestScenario.name.like(f"{cfg.prefix}%")))
+        ).scalars().all()
+        if scenario_ids:
+            run_ids = select(TestScenarioRun.id).where(TestScenarioRun.scenario_id.in_(scenario_ids))
+            await db.execute(delete(ApiRunVariable).where(ApiRunVariable.scenario_run_id.in_(run_ids)))
+            await db.execute(delete(ApiRequestRun).where(ApiRequestRun.scenario_run_id.in_(run_ids)))
+            await db.execute(delete(TestScenarioRun).where(TestScenarioRun.scenario_id.in_(scenario_ids)))
+            await db.execute(delete(TestScenarioCase).where(TestScenarioCase.scenario_id.in_(scenario_ids)))
+            await db.execute(delete(TestScenario).where(TestScenario.id.in_(scenario_ids)))
+        request_ids = select(ApiRequest.id).where(
+            and_(ApiRequest.creator_id == LOAD_ADMIN_ID, ApiRequest.name.like(f"{cfg.prefix}%"))
+        )
+        await db.execute(delete(ApiRequestDataset).where(ApiRequestDataset.request_id.in_(request_ids)))
+        await db.execute(
+            delete(ApiRequest).where(and_(ApiRequest.creator_id == LOAD_ADMIN_ID, ApiRequest.name.like(f"{cfg.prefix}%")))
+        )
+        await db.commit()
+
+
+async def _prepare_admin_token(cfg: LoadConfig) -> str:
+    async with AsyncSessionLocal() as db:
+        admin = (await db.execute(select(Admin).where(Admin.id == LOAD_ADMIN_ID))).scalars().first()
+        if not admin:
+            db.add(
+                Admin(
+                    id=LOAD_ADMIN_ID,
+                    username=LOAD_ADMIN_NAME,
+                    password="not_used_for_load_test",
+                    nickname="load",
+                    status=1,
+                    creator="load",
+                    creator_id=LOAD_ADMIN_ID,
+                )
+            )
+            await db.commit()
+    token = f"{LOAD_PREFIX}token_{cfg.tag}"
+    await redis_module.redis_pool.set(token, json.dumps({"id": LOAD_ADMIN_ID, "username": LOAD_ADMIN_NAME}), ex=3600)
+    return token
+
+
+class InlineWorkerPool:
+    """拦截 dispatch_scenario_run_task, 在当前进程内执行场景"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.queue: asyncio.Queue[int] = asyncio.Queue()
+        self.finished_at: dict[int, float] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._original_dispatch = None
+
+    def dispatch(self, scenario_run_id: int):
+        self.queue.put_nowait(int(scenario_run_id))
+        return None
+
+    async def _work(self):
+        while True:
+            scenario_run_id = await self.queue.get()
+            try:
+                await process_scenario_run_message({"scenario_run_id": scenario_run_id})
+            except Exception:
+                logger.exception(f"压测场景执行失败: scenario_run_id={scenario_run_id}")
+            finally:
+                self.finished_at[scenario_run_id] = time.perf_counter()
+                self.queue.task_done()
+
+    def start(self):
+        self._original_dispatch = scenario_router.dispatch_scenario_run_task
+        scenario_router.dispatch_scenario_run_task = self.dispatch
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.size)]
+
+    async def stop(self):
+        scenario_router.dispatch_scenario_run_task = self._original_dispatch
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def _submit_runs(cfg: LoadConfig, client: httpx.AsyncClient, token: str, scenario_ids: list[int]):
+    """C 个并发提交者按轮询顺序提交 runs 次场景执行"""
+
+    submitted_at: dict[int, float] = {}
+    api_latencies: list[float] = []
+    failures: list[str] = []
+    counter = iter(range(cfg.runs))
+
+    async def submitter():
+        for seq in counter:
+            started_at = time.perf_counter()
+            resp = await client.post(
+                "/api/scenario/run",
+                json={"scenario_id": scenario_ids[seq % len(scenario_ids)], "trigger_type": "manual"},
+                headers={"token": token},
+            )
+            api_latencies.append(time.perf_counter() - started_at)
+            body = resp.json()
+            if body.get("code") != 202:
+                failures.append(str(body.get("message") or body))
+                continue
+            submitted_at[body["data"]["id"]] = started_at
+
+    await asyncio.gather(*(submitter() for _ in range(cfg.concurrency)))
+    return submitted_at, api_latencies, failures
+
+
+async def _wait_celery_runs(cfg: LoadConfig, run_ids: list[int], deadline: float) -> dict[int, float]:
+    finished_at: dict[int, float] = {}
+    while len(finished_at) < len(run_ids) and time.perf_counter() < deadline:
+        pending = [run_id for run_id in run_ids if run_id not in finished_at]
+        async with AsyncSessionLocal() as db:
+            done_ids = (
+                await db.execute(
+                    select(TestScenarioRun.id).where(
+                        and_(TestScenarioRun.id.in_(pending), TestScenarioRun.run_status.in_(FINAL_STATUSES))
+                    )
+                )
+            ).scalars().all()
+        now = time.perf_counter()
+        for run_id in done_ids:
+            finished_at[run_id] = now
+        await asyncio.sleep(cfg.poll_interval)
+    return finished_at
+
+
+async def _collect_db_stats(run_ids: list[int]) -> dict[str, Any]:
+    if not run_ids:
+        return {"request_runs": 0, "run_variables": 0, "status": {}}
+    async with AsyncSessionLocal() as db:
+        request_runs = await db.scalar(select(func.count()).where(ApiRequestRun.scenario_run_id.in_(run_ids)))
+        run_variables = await db.scalar(select(func.count()).where(ApiRunVariable.scenario_run_id.in_(run_ids)))
+        status_rows = (
+            await db.execute(
+                select(TestScenarioRun.run_status, func.count())
+                .where(TestScenarioRun.id.in_(run_ids))
+                .group_by(TestScenarioRun.run_status)
+            )
+        ).all()
+    return {"request_runs": request_runs or 0, "run_variables": run_variables or 0, "status": dict(status_rows)}
+
+
+async def run_load(cfg: LoadConfig) -> dict[str, Any]:
+    from app.main import app
+
+    target = StubTarget(
+        latency_ms=cfg.latency_ms, jitter_ms=cfg.jitter_ms, payload_bytes=cfg.payload_bytes, error_rate=cfg.error_rate
+    )
+    stub_server = StubServer(target)
+    target_url = stub_server.start()
+    await create_redis_connection_pool(force=True)
+    inline_pool = InlineWorkerPool(cfg.workers) if cfg.worker_mode == "inline" else None
+
+    try:
+        token = await _prepare_admin_token(cfg)
+        seed_started_at = time.perf_counter()
+        scenario_ids = await seed(cfg, target_url)
+        logger.info(
+            f"压测数据写入完成: {cfg.scenarios} 场景 × {cfg.steps} 步骤 × {cfg.datasets} 数据集, "
+            f"耗时 {time.perf_counter() - seed_started_at:.2f}s"
+        )
+
+        if inline_pool:
+            inline_pool.start()
+        worker_cpu_before = _celery_worker_cpu_seconds() if cfg.worker_mode == "celery" else None
+        cpu_before = _cpu_seconds()
+        started_at = time.perf_counter()
+        deadline = started_at + cfg.timeout
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load.local", timeout=cfg.timeout) as client:
+            submitted_at, api_latencies, failures = await _submit_runs(cfg, client, token, scenario_ids)
+        submit_elapsed = time.perf_counter() - started_at
+
+        run_ids = list(submitted_at)
+        if inline_pool:
+            try:
+                await asyncio.wait_for(inline_pool.queue.join(), timeout=max(deadline - time.perf_counter(), 0))
+            except asyncio.TimeoutError:
+                logger.warning("压测超时, 部分场景未执行完成")
+            finished_at = dict(inline_pool.finished_at)
+        else:
+            finished_at = await _wait_celery_runs(cfg, run_ids, deadline)
+
+        elapsed = max((max(finished_at.values()) if finished_at else time.perf_counter()) - started_at, 1e-9)
+        cpu_seconds = _cpu_seconds() - cpu_before
+        worker_cpu_after = _celery_worker_cpu_seconds() if cfg.worker_mode == "celery" else None
+        db_stats = await _collect_db_stats(run_ids)
+
+        completed = len(finished_at)
+        db_rows = db_stats["request_runs"] + db_stats["run_variables"] + len(run_ids)
+        report = {
+            "config": asdict(cfg),
+            "elapsed_seconds": round(elapsed, 3),
+            "submit_seconds": round(submit_elapsed, 3),
+            "scenario_runs": {"submitted": len(run_ids), "completed": completed, "status": db_stats["status"]},
+            "submit_failures": failures[:20],
+            "throughput": {
+                "scenario_runs_per_second": round(completed / elapsed, 2),
+                "request_runs_per_second": round(db_stats["request_runs"] / elapsed, 2),
+                "db_rows_per_second": round(db_rows / elapsed, 2),
+            },
+            "api_latency_ms": percentiles(api_latencies),
+            "e2e_latency_ms": percentiles(
+                [finished_at[run_id] - submitted_at[run_id] for run_id in run_ids if run_id in finished_at]
+            ),
+            "cpu": {
+                "harness_process_seconds": round(cpu_seconds, 3),
+                "harness_process_utilization": round(cpu_seconds / elapsed, 3),
+                "celery_worker_seconds": (
+                    round(worker_cpu_after - worker_cpu_before, 3)
+                    if worker_cpu_before is not None and worker_cpu_after is not None
+                    else None
+                ),
+            },
+            "stub_target": {"requests": target.requests, "errors": target.errors},
+        }
+        return report
+    finally:
+        if inline_pool:
+            await inline_pool.stop()
+        if not cfg.keep_data:
+            await cleanup(cfg)
+        if redis_module.redis_pool:
+            await redis_module.redis_pool.delete(f"{LOAD_PREFIX}token_{cfg.tag}")
+        await close_redis_connection_pool()
+        await engine.dispose()
+        stub_server.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="端到端压测")
+    defaults = LoadConfig()
+    parser.add_argument("--scenarios", type=int, default=defaults.scenarios, help="场景数 N")
+    parser.add_argument("--steps", type=int, default=defaults.steps, help="每个场景步骤数 M")
+    parser.add_argument("--datasets", type=int, default=defaults.datasets, help="每个步骤数据集数 K")
+    parser.add_argument("--runs", type=int, default=defaults.runs, help="场景执行总次数")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="并发提交数")
+    parser.add_argument("--workers", type=int, default=defaults.workers, help="inline 模式下的执行协程数")
+    parser.add_argument("--worker-mode", choices=["inline", "celery"], default=defaults.worker_mode)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="目标服务延迟")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms, help="目标服务延迟抖动")
+    parser.add_argument("--payload-bytes", type=int, default=defaults.payload_bytes, help="目标服务响应体大小")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="目标服务 5xx 比例")
+    parser.add_argument("--timeout", type=float, default=defaults.timeout, help="整体超时(秒)")
+    parser.add_argument("--keep-data", action="store_true", help="保留压测数据")
+    parser.add_argument("--output", default=None, help="报告输出 JSON 文件")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    args = vars(build_parser().parse_args(argv))
+    output = args.pop("output")
+    cfg = LoadConfig(**args)
+    report = asyncio.run(run_load(cfg))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    return report
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : soak.py
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from loguru import logger
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.api_request import TestScenarioRun
+from benchmarks.load.harness import LoadConfig, cleanup, seed
+from benchmarks.load.stub_target import StubServer, StubTarget
+
+"""
+浸泡测试(内存增长/泄漏检测)
+    uv run python -m benchmarks.load.soak --runs 5000 --sample-every 250 --max-slope-mb 2
+    1.与 Celery worker 相同的执行路径: 在同一进程内逐个调用 run_scenario_task(每个任务 asyncio.run 新建事件循环)
+    2.预热后建立 tracemalloc 基准快照, 每 sample_every 次采样 RSS 与 tracemalloc 当前占用, 并与基准快照做分配差异
+    3.对预热后的采样点做线性回归, RSS 斜率(MB/千次运行) 超过 max_slope_mb 时以非 0 退出
+    4.报告中按文件行与模块两种维度列出增长最多的分配点, 用于定位泄漏来源
+"""
+
+_TRACEMALLOC_IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class SoakConfig(LoadConfig):
+    runs: int = 2000
+    warmup: int = 50
+    sample_every: int = 100
+    max_slope_mb: float = 5.0  # 允许的 RSS 增长斜率(MB/千次运行)
+    top: int = 15
+    tracemalloc_frames: int = 1
+    latency_ms: float = 0
+    jitter_ms: float = 0
+
+
+def current_rss_bytes() -> int:
+    """当前常驻内存; 非 Linux 退化为峰值 RSS"""
+
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def linear_slope(points: list[tuple[float, float]]) -> float:
+    """最小二乘斜率"""
+
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+
+
+def allocation_diff(
+    snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot, top: int
+) -> dict[str, list[dict[str, Any]]]:
+    """按文件行/模块(文件) 两个维度列出相对基准快照增长最多的分配点"""
+
+    snapshot = snapshot.filter_traces(_TRACEMALLOC_IGNORE)
+    baseline = baseline.filter_traces(_TRACEMALLOC_IGNORE)
+    result: dict[str, list[dict[str, Any]]] = {}
+    for key_type, name in (("lineno", "by_line"), ("filename", "by_module")):
+        items = []
+        for stat in snapshot.compare_to(baseline, key_type)[:top]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[0]
+            items.append(
+                {
+                    "location": f"{frame.filename}:{frame.lineno}" if key_type == "lineno" else frame.filename,
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count_diff": stat.count_diff,
+                    "size_kb": round(stat.size / 1024, 1),
+                }
+            )
+        result[name] = items
+    return result
+
+
+async def _setup(cfg: SoakConfig, target_url: str) -> list[int]:
+    """写入场景并预先创建 queued 运行记录"""
+
+    scenario_ids = await seed(cfg, target_url)
+    run_ids: list[int] = []
+    async with AsyncSessionLocal() as db:
+        for batch_start in range(0, cfg.runs, 500):
+            batch = [
+                TestScenarioRun(
+                    scenario_id=scenario_ids[seq % len(scenario_ids)],
+                    trigger_type="manual",
+                    run_status="queued",
+                    cancel_requested=False,
+                    total_request_runs=0,
+                    success_request_runs=0,
+                    failed_request_runs=0,
+                    is_success=False,
+                    runtime_variables={},
+                )
+                for seq in range(batch_start, min(batch_start + 500, cfg.runs))
+            ]
+            db.add_all(batch)
+            await db.flush()
+            run_ids.extend(obj.id for obj in batch)
+        await db.commit()
+    await engine.dispose()  # 后续每个任务使用独立事件循环, 不复用本循环内建立的连接
+    return run_ids
+
+
+async def _teardown(cfg: SoakConfig):
+    try:
+        if not cfg.keep_data:
+            await cleanup(cfg)
+    finally:
+        await engine.dispose()
+
+
+def _sample(run_no: int, started_at: float) -> dict[str, Any]:
+    gc.collect()
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+    return {
+        "runs": run_no,
+        "elapsed_seconds": round(time.perf_counter() - started_at, 2),
+        "rss_mb": round(current_rss_bytes() / 1024 / 1024, 2),
+        "traced_mb": round(traced_current / 1024 / 1024, 2),
+        "traced_peak_mb": round(traced_peak / 1024 / 1024, 2),
+        "gc_objects": len(gc.get_objects()),
+    }
+
+
+def run_soak(cfg: SoakConfig) -> dict[str, Any]:
+    from app.tasks.scenario_tasks import run_scenario_task
+
+    target = StubTarget(latency_ms=cfg.latency_ms, jitter_ms=cfg.jitter_ms, payload_bytes=cfg.payload_bytes, error_rate=cfg.error_rate)
+    stub_server = StubServer(target)
+    target_url = stub_server.start()
+    try:
+        run_ids = asyncio.run(_setup(cfg, target_url))
+        logger.info(f"浸泡测试开始: {len(run_ids)} 次运行, 预热 {cfg.warmup} 次")
+
+        warmup = min(max(cfg.warmup, 1), len(run_ids))
+        tracemalloc.start(cfg.tracemalloc_frames)
+        started_at = time.perf_counter()
+        samples: list[dict[str, Any]] = []
+        baseline = None
+        failures = 0
+        for run_no, run_id in enumerate(run_ids, start=1):
+            try:
+                if not run_scenario_task(run_id):
+                    failures += 1
+            except Exception:
+                failures += 1
+                logger.exception(f"浸泡测试任务执行异常: scenario_run_id={run_id}")
+            if run_no == warmup:
+                samples.append(_sample(run_no, started_at))
+                baseline = tracemalloc.take_snapshot()
+            elif run_no > warmup and (run_no - warmup) % cfg.sample_every == 0:
+                samples.append(_sample(run_no, started_at))
+                logger.info(f"浸泡采样: {samples[-1]}")
+
+        if not samples or samples[-1]["runs"] != len(run_ids):
+            samples.append(_sample(len(run_ids), started_at))
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        rss_slope = linear_slope([(item["runs"] / 1000, item["rss_mb"]) for item in samples])
+        traced_slope = linear_slope([(item["runs"] / 1000, item["traced_mb"]) for item in samples])
+        report = {
+            "config": asdict(cfg),
+            "runs": len(run_ids),
+            "task_failures": failures,
+            "elapsed_seconds": round(time.perf_counter() - started_at, 2),
+            "rss_slope_mb_per_1k_runs": round(rss_slope, 3),
+            "traced_slope_mb_per_1k_runs": round(traced_slope, 3),
+            "passed": rss_slope <= cfg.max_slope_mb,
+            "samples": samples,
+            "allocation_diff": allocation_diff(snapshot, baseline, cfg.top) if baseline else None,
+            "stub_target": {"requests": target.requests, "errors": target.errors},
+        }
+        return report
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        asyncio.run(_teardown(cfg))
+        stub_server.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load.soak", description="浸泡测试(内存泄漏检测)")
+    defaults = SoakConfig()
+    parser.add_argument("--scenarios", type=int, default=defaults.scenarios, help="场景数 N")
+    parser.add_argument("--steps", type=int, default=defaults.steps, help="每个场景步骤数 M")
+    parser.add_argument("--datasets", type=int, default=defaults.datasets, help="每个步骤数据集数 K")
+    parser.add_argument("--runs", type=int, default=defaults.runs, help="连续执行的场景次数")
+    parser.add_argument("--warmup", type=int, default=defaults.warmup, help="预热次数(不参与斜率计算)")
+    parser.add_argument("--sample-every", type=int, default=defaults.sample_every, help="采样间隔(运行次数)")
+    parser.add_argument("--max-slope-mb", type=float, default=defaults.max_slope_mb, help="允许的 RSS 斜率(MB/千次运行)")
+    parser.add_argument("--top", type=int, default=defaults.top, help="输出增长最多的分配点数量")
+    parser.add_argument("--tracemalloc-frames", type=int, default=defaults.tracemalloc_frames, help="tracemalloc 记录的栈深度")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="目标服务延迟")
+    parser.add_argument("--payload-bytes", type=int, default=defaults.payload_bytes, help="目标服务响应体大小")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="目标服务 5xx 比例")
+    parser.add_argument("--keep-data", action="store_true", help="保留测试数据")
+    parser.add_argument("--output", default=None, help="报告输出 JSON 文件")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = vars(build_parser().parse_args(argv))
+    output = args.pop("output")
+    report = run_soak(SoakConfig(**args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    if not report["passed"]:
+        logger.error(
+            f"内存增长斜率 {report['rss_slope_mb_per_1k_runs']}MB/千次 超过阈值 {report['config']['max_slope_mb']}MB/千次"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : stub_target.py
+
+import asyncio
+import json
+import random
+import threading
+from urllib.parse import parse_qs
+
+import uvicorn
+
+"""
+本地压测目标服务(纯 ASGI)
+    1.全局配置: 延迟(latency_ms ± jitter_ms)、响应体大小(payload_bytes)、错误率(error_rate)
+    2.单次请求可通过 query 覆盖: ?latency_ms=100&payload_bytes=10&status=503
+    3.不依赖数据库/Redis, 只统计收到的请求数与错误数
+"""
+
+
+class StubTarget:
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        payload_bytes: int = 256,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.payload_bytes = payload_bytes
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._payload_cache: dict[int, str] = {}
+
+    def _padding(self, size: int) -> str:
+        if size not in self._payload_cache:
+            self._payload_cache[size] = "x" * max(size, 0)
+        return self._payload_cache[size]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+        params = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        latency_ms = float(params.get("latency_ms", self.latency_ms))
+        if self.jitter_ms:
+            latency_ms += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        payload_bytes = int(params.get("payload_bytes", self.payload_bytes))
+
+        if "status" in params:
+            status_code = int(params["status"])
+        else:
+            status_code = 500 if self.error_rate and self._random.random() < self.error_rate else 200
+
+        self.requests += 1
+        if status_code >= 500:
+            self.errors += 1
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+        body = json.dumps(
+            {"ok": status_code < 400, "path": scope.get("path"), "seq": self.requests, "padding": self._padding(payload_bytes)}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class StubServer:
+    """在后台线程(独立事件循环) 中运行 StubTarget, 不占用压测进程的事件循环"""
+
+    def __init__(self, app: StubTarget, host: str = "127.0.0.1", port: int = 0):
+        self.app = app
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False, lifespan="off")
+        )
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, timeout: float = 10) -> str:
+        self._thread = threading.Thread(target=self.server.run, name="stub-target", daemon=True)
+        self._thread.start()
+        waited = 0.0
+        while not self.server.started:
+            if waited >= timeout or not self._thread.is_alive():
+                raise RuntimeError("压测目标服务启动失败")
+            threading.Event().wait(0.01)
+            waited += 0.01
+        return self.url
+
+    def stop(self):
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=5)
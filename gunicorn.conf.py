@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# @Time    : 2026/10/19
+# @Author  : yangyuexiong
+# @File    : gunicorn.conf.py
+
+"""
+gunicorn 配置(仅包含多进程 Prometheus 指标所需的钩子, 其余参数仍通过命令行传入)
+    PROMETHEUS_MULTIPROC_DIR 需在启动 gunicorn 前设置, 所有 worker 共享该目录
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    # 清理上一次运行残留的指标文件, 避免重启后计数叠加
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # worker 退出后移除其 livesum Gauge 数据
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.routers import aps_task as aps_task_router
+from app.core.exception_handlers import register_exception_handlers
+from app.core.security import check_admin_existence
+from app.db.session import get_db_session
+from app.models.admin import Admin
+from app.models.aps_task import ApsTask
+from app.tasks import scheduler as scheduler_module
+
+
+class _FakeScalarResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def first(self):
+        return self._items[0] if self._items else None
+
+    def all(self):
+        return list(self._items)
+
+
+class _FakeExecuteResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def scalars(self):
+        return _FakeScalarResult(self._items)
+
+
+class FakeDBSession:
+    def __init__(self):
+        self.added: list[Any] = []
+        self.commits = 0
+        self.execute_queue: list[_FakeExecuteResult] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def add(self, obj: Any):
+        if getattr(obj, "id", None) is None:
+            obj.id = 100 + len(self.added)
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def refresh(self, obj: Any):
+        return None
+
+    async def execute(self, stmt):
+        if self.execute_queue:
+            return self.execute_queue.pop(0)
+        return _FakeExecuteResult([])
+
+    def queue_execute_result(self, items: list[Any]):
+        self.execute_queue.append(_FakeExecuteResult(items))
+
+
+def _build_admin() -> Admin:
+    admin = Admin(username="tester", password="hashed")
+    admin.id = 1
+    return admin
+
+
+def _build_aps_task(**kwargs) -> ApsTask:
+    obj = ApsTask(
+        task_id=kwargs.pop("task_id", "nightly_scenario_1"),
+        trigger_type=kwargs.pop("trigger_type", "cron"),
+        trigger_param=kwargs.pop("trigger_param", {"cron_expression": "0 2 * * *"}),
+        task_function_name=kwargs.pop("task_function_name", "run_scenario"),
+        task_function_args=kwargs.pop("task_function_args", []),
+        task_function_kwargs=kwargs.pop("task_function_kwargs", {"scenario_id": 1}),
+        is_deleted=kwargs.pop("is_deleted", 0),
+    )
+    obj.id = kwargs.pop("id", 30)
+    for k, v in kwargs.items():
+        setattr(obj, k, v)
+    return obj
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDBSession()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events: list[tuple] = []
+
+    async def fake_publish(action: str, aps_task_id: int, task_id: str):
+        events.append((action, aps_task_id, task_id))
+
+    monkeypatch.setattr(aps_task_router, "publish_aps_task_event", fake_publish)
+    return events
+
+
+@pytest.fixture
+def client(fake_db, published):
+    app = FastAPI()
+    register_exception_handlers(app, debug=True)
+    app.include_router(aps_task_router.router, prefix="/api/aps_task")
+
+    admin = _build_admin()
+
+    async def _override_admin():
+        return admin
+
+    async def _override_db() -> AsyncGenerator[FakeDBSession, None]:
+        yield fake_db
+
+    app.dependency_overrides[check_admin_existence] = _override_admin
+    app.dependency_overrides[get_db_session] = _override_db
+
+    with TestClient(app) as c:
+        yield c
+
+
+def test_create_aps_task_publishes_upsert(client, fake_db, published):
+    payload = {
+        "task_id": "nightly_scenario_1",
+        "trigger_type": "cron",
+        "trigger_param": {"cron_expression": "0 2 * * *", "jitter": 120},
+        "task_function_name": "run_scenario",
+        "task_function_kwargs": {"scenario_id": 1},
+    }
+    resp = client.post("/api/aps_task", json=payload)
+    body = resp.json()
+
+    assert resp.status_code == 201
+    assert body["code"] == 201
+    assert fake_db.commits == 1
+    assert published == [("upsert", body["data"]["id"], "nightly_scenario_1")]
+
+
+def test_create_aps_task_duplicate_task_id(client, fake_db, published):
+    fake_db.queue_execute_result([_build_aps_task()])
+    payload = {
+        "task_id": "nightly_scenario_1",
+        "trigger_type": "cron",
+        "trigger_param": {"cron_expression": "0 2 * * *"},
+        "task_function_name": "run_scenario",
+    }
+    resp = client.post("/api/aps_task", json=payload)
+
+    assert resp.json()["code"] == 10003
+    assert published == []
+
+
+def test_create_aps_task_invalid_cron(client, fake_db, published):
+    payload = {
+        "task_id": "bad_cron",
+        "trigger_type": "cron",
+        "trigger_param": {"cron_expression": "not a cron"},
+        "task_function_name": "run_scenario",
+    }
+    resp = client.post("/api/aps_task", json=payload)
+
+    assert resp.json()["code"] == 10006
+    assert fake_db.commits == 0
+    assert published == []
+
+
+def test_create_aps_task_rejects_unknown_trigger_param(client, fake_db, published):
+    payload = {
+        "task_id": "bad_param",
+        "trigger_type": "cron",
+        "trigger_param": {"cron_expression": "0 2 * * *", "task_function": "x"},
+        "task_function_name": "run_scenario",
+    }
+    resp = client.post("/api/aps_task", json=payload)
+
+    assert resp.status_code == 400
+    assert published == []
+
+
+@pytest.mark.parametrize("task_function_name", ["no_such_task", "AsyncSessionLocal", "select"])
+def test_create_aps_task_rejects_unregistered_function(client, fake_db, published, task_function_name):
+    payload = {
+        "task_id": "not_schedulable",
+        "trigger_type": "cron",
+        "trigger_param": {"cron_expression": "0 2 * * *"},
+        "task_function_name": task_function_name,
+    }
+    resp = client.post("/api/aps_task", json=payload)
+
+    assert resp.status_code == 400
+    assert fake_db.commits == 0
+    assert published == []
+
+
+def test_update_aps_task_publishes_upsert(client, fake_db, published):
+    obj = _build_aps_task()
+    fake_db.queue_execute_result([obj])
+    resp = client.put("/api/aps_task", json={"id": obj.id, "trigger_param": {"cron_expression": "30 3 * * *"}})
+
+    assert resp.status_code == 201
+    assert obj.trigger_param == {"cron_expression": "30 3 * * *"}
+    assert published == [("upsert", obj.id, obj.task_id)]
+
+
+def test_delete_aps_task_publishes_remove(client, fake_db, published):
+    obj = _build_aps_task()
+    fake_db.queue_execute_result([obj])
+    resp = client.request("DELETE", "/api/aps_task", json={"id": obj.id})
+
+    assert resp.json()["code"] == 204
+    assert obj.is_deleted == 1
+    assert published == [("remove", obj.id, obj.task_id)]
+
+
+def test_apply_aps_task_event_adds_updates_and_removes_single_job(monkeypatch):
+    db = FakeDBSession()
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", lambda: db)
+    obj = _build_aps_task(trigger_param={"cron_expression": "0 2 * * *", "jitter": 0})
+
+    async def run_events():
+        scheduler_module.scheduler.start(paused=True)
+        try:
+            db.queue_execute_result([obj])
+            await scheduler_module.apply_aps_task_event({"action": "upsert", "id": obj.id, "task_id": obj.task_id})
+            first_job = scheduler_module.scheduler.get_job(obj.task_id)
+
+            obj.trigger_param = {"cron_expression": "30 3 * * *", "jitter": 0}
+            db.queue_execute_result([obj])
+            await scheduler_module.apply_aps_task_event({"action": "upsert", "id": obj.id, "task_id": obj.task_id})
+            second_job = scheduler_module.scheduler.get_job(obj.task_id)
+
+            await scheduler_module.apply_aps_task_event({"action": "remove", "id": obj.id, "task_id": obj.task_id})
+            removed_job = scheduler_module.scheduler.get_job(obj.task_id)
+            return first_job, second_job, removed_job
+        finally:
+            await scheduler_module.scheduler_stop()
+
+    first_job, second_job, removed_job = asyncio.run(run_events())
+
+    assert first_job is not None and "hour='2'" in str(first_job.trigger)
+    assert second_job is not None and "hour='3'" in str(second_job.trigger)
+    assert removed_job is None
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+from typing import Any
+
+import pytest
+
+from app.core import auth_cache as auth_cache_module
+from app.core import security as security_module
+from app.core.auth_cache import TTLLRUCache, admin_cache, apply_invalidation_event, invalidate_tokens, token_cache
+from app.core.exceptions import CustomException
+from app.utils import ttl_cache as ttl_cache_module
+from app.models.admin import Admin
+
+
+class _FakeScalarResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def first(self):
+        return self._items[0] if self._items else None
+
+
+class _FakeExecuteResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def scalars(self):
+        return _FakeScalarResult(self._items)
+
+
+class FakeDBSession:
+    def __init__(self, items: list[Any]):
+        self.items = items
+        self.executes = 0
+
+    async def execute(self, stmt):
+        self.executes += 1
+        return _FakeExecuteResult(self.items)
+
+
+@pytest.fixture(autouse=True)
+def clean_cache(monkeypatch):
+    token_cache.clear()
+    admin_cache.clear()
+    published: list[dict] = []
+
+    async def fake_publish(channel: str, data: dict):
+        published.append(data)
+        return 1
+
+    monkeypatch.setattr(auth_cache_module, "publish_message", fake_publish)
+    yield published
+    token_cache.clear()
+    admin_cache.clear()
+
+
+def _build_admin() -> Admin:
+    admin = Admin(username="tester", password="hashed", nickname="nick", is_deleted=0)
+    admin.id = 1
+    return admin
+
+
+def test_ttl_lru_cache_evicts_oldest_and_expired(monkeypatch):
+    cache = TTLLRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now = ttl_cache_module.time.monotonic()
+    monkeypatch.setattr(ttl_cache_module.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_ttl_lru_cache_rejects_stale_write_after_invalidation():
+    cache = TTLLRUCache(maxsize=10, ttl=10)
+    version = cache.version
+    cache.pop("token")
+    assert cache.set("token", {"id": 1}, version=version) is False
+    assert cache.get("token") is None
+
+
+def test_token_header_hits_cache(monkeypatch):
+    calls: list[str] = []
+
+    async def fake_get_value(key):
+        calls.append(key)
+        return json.dumps({"id": 1, "password": "hashed"})
+
+    monkeypatch.setattr(security_module, "get_cached_value", fake_get_value)
+
+    first = asyncio.run(security_module.get_token_header("tk"))
+    first.pop("password")
+    second = asyncio.run(security_module.get_token_header("tk"))
+
+    assert calls == ["tk"]
+    assert second["password"] == "hashed"
+
+
+def test_token_header_miss_after_invalidation(monkeypatch, clean_cache):
+    values = {"tk": json.dumps({"id": 1})}
+
+    async def fake_get_value(key):
+        return values.get(key)
+
+    monkeypatch.setattr(security_module, "get_cached_value", fake_get_value)
+    asyncio.run(security_module.get_token_header("tk"))
+
+    values.pop("tk")
+    asyncio.run(invalidate_tokens(["tk"]))
+
+    with pytest.raises(CustomException):
+        asyncio.run(security_module.get_token_header("tk"))
+    assert clean_cache == [{"kind": "token", "keys": ["tk"]}]
+
+
+def test_check_admin_existence_uses_cache():
+    db = FakeDBSession([_build_admin()])
+
+    first = asyncio.run(security_module.check_admin_existence({"id": 1}, db))
+    second = asyncio.run(security_module.check_admin_existence({"id": 1}, db))
+
+    assert db.executes == 1
+    assert second is not first
+    assert second.id == 1
+    assert second.username == "tester"
+    assert second.password is None
+
+
+def test_remote_invalidation_event_evicts_admin():
+    db = FakeDBSession([_build_admin()])
+    asyncio.run(security_module.check_admin_existence({"id": 1}, db))
+
+    asyncio.run(apply_invalidation_event({"kind": "admin", "keys": ["1"]}))
+    asyncio.run(security_module.check_admin_existence({"id": 1}, db))
+
+    assert db.executes == 2
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app.db.redis_client as rp
+from app.services import api_request_executor
+from app.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    apply_circuit_action,
+    circuit_breaker,
+)
+
+
+class FakeCircuitScript:
+    """用进程内状态迁移模拟 CIRCUIT_ACTION_LUA"""
+
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+
+    async def __call__(self, keys, args, client=None):
+        self.server.calls.append(args[0])
+        action, now_ms, threshold, open_ms, max_probes, reason = args[:6]
+        data = apply_circuit_action(
+            self.server.hashes.get(keys[0]), action, now_ms, threshold, open_ms, max_probes, reason
+        )
+        self.server.hashes[keys[0]] = data
+        return json.dumps(data).encode()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict] = {}
+        self.calls: list[str] = []
+
+    def register_script(self, script: str):
+        return FakeCircuitScript(self)
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = {"failure_threshold": 3, "open_seconds": 0.1, "sync_interval": 0}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+async def _call(breaker: CircuitBreaker, url: str, status_code: int | None = None, exc: Exception | None = None):
+    call = await breaker.before_request(url)
+    if exc is not None:
+        call.record_error(exc)
+    elif status_code is not None:
+        call.record_response(status_code)
+    await breaker.after_request(call)
+    return call
+
+
+def test_state_transitions():
+    args = {"threshold": 2, "open_ms": 1000, "max_probes": 1}
+    data = apply_circuit_action(None, "failure", 0, reason="timeout", **args)
+    assert data["state"] == "closed"
+    data = apply_circuit_action(data, "failure", 10, reason="timeout", **args)
+    assert (data["state"], data["open_until"], data["reason"]) == ("open", 1010, "timeout")
+
+    assert apply_circuit_action(data, "allow", 500, **args)["allowed"] == 0
+    data = apply_circuit_action(data, "allow", 1010, **args)
+    assert (data["state"], data["allowed"], data["probes"]) == ("half_open", 1, 1)
+    # 探测中不再放行其它请求
+    assert apply_circuit_action(data, "allow", 1020, **args)["allowed"] == 0
+
+    reopened = apply_circuit_action(data, "failure", 1030, reason="HTTP 503", **args)
+    assert (reopened["state"], reopened["open_until"]) == ("open", 2030)
+
+    closed = apply_circuit_action(data, "success", 1030, **args)
+    assert (closed["state"], closed["failures"], closed["probes"]) == ("closed", 0, 0)
+
+
+def test_stuck_probe_is_retried_after_open_window():
+    args = {"threshold": 1, "open_ms": 1000, "max_probes": 1}
+    data = apply_circuit_action(None, "failure", 0, **args)
+    data = apply_circuit_action(data, "allow", 1000, **args)
+    assert apply_circuit_action(data, "allow", 1500, **args)["allowed"] == 0
+    assert apply_circuit_action(data, "allow", 2000, **args)["allowed"] == 1
+    released = apply_circuit_action(data, "release", 1500, **args)
+    assert apply_circuit_action(released, "allow", 1500, **args)["allowed"] == 1
+
+
+def test_breaker_opens_and_recovers_via_shared_redis(monkeypatch: pytest.MonkeyPatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+    # 两个实例模拟两个 worker
+    worker_a, worker_b = _breaker(), _breaker()
+
+    async def _run():
+        await _call(worker_a, "http://down:8080/x", exc=httpx.ConnectError("refused"))
+        await _call(worker_b, "http://down:8080/x", exc=httpx.ConnectTimeout("timeout"))
+        await _call(worker_a, "http://down:8080/x", status_code=503)
+
+        with pytest.raises(CircuitOpenError) as exc_info:
+            await worker_b.before_request("http://down:8080/y")
+        assert "down:8080 熔断中" in str(exc_info.value)
+        assert "HTTP 503" in str(exc_info.value)
+
+        await asyncio.sleep(0.12)
+        probe = await _call(worker_b, "http://down:8080/x", status_code=200)
+        assert probe.probe is True
+        return await worker_a.before_request("http://down:8080/x")
+
+    call = asyncio.run(_run())
+
+    assert call.probe is False
+    assert redis.hashes["circuit_breaker:down:8080"]["state"] == "closed"
+
+
+def test_closed_success_skips_redis_when_cached(monkeypatch: pytest.MonkeyPatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+    breaker = _breaker(sync_interval=60)
+
+    async def _run():
+        for _ in range(5):
+            await _call(breaker, "http://up/x", status_code=200)
+
+    asyncio.run(_run())
+
+    assert redis.calls == ["allow"]
+
+
+def test_client_errors_do_not_trip_breaker(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(rp, "redis_pool", None)
+    breaker = _breaker(failure_threshold=1)
+
+    async def _run():
+        await _call(breaker, "http://target/x", status_code=404)
+        await _call(breaker, "http://target/x", status_code=500)
+        await _call(breaker, "http://target/x", exc=ValueError("bad body"))
+        return await breaker.before_request("http://target/x")
+
+    assert asyncio.run(_run()) is not None
+
+
+def test_executor_short_circuits_when_open(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(rp, "redis_pool", None)
+    monkeypatch.setattr(circuit_breaker, "failure_threshold", 1)
+    monkeypatch.setattr(circuit_breaker, "sync_interval", 0)
+    circuit_breaker.reset()
+    snapshot = {"method": "GET", "url": "http://127.0.0.1:1/x", "timeout_ms": 200}
+
+    async def _run():
+        first = await api_request_executor._execute_http_request(snapshot)
+        second = await api_request_executor._execute_http_request(snapshot)
+        return first, second
+
+    try:
+        first, second = asyncio.run(_run())
+    finally:
+        circuit_breaker.reset()
+
+    assert first["is_success"] is False
+    assert "熔断" not in first["error_message"]
+    assert second["is_success"] is False
+    assert second["response_time_ms"] == 0
+    assert "127.0.0.1:1 熔断中" in second["error_message"]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services import distributed_load
+from app.services.distributed_load import (
+    coordinate_load_run,
+    get_load_meta,
+    load_key,
+    run_load_coordinator,
+    run_load_shard,
+    split_load_profile,
+    start_distributed_load,
+)
+from app.services.load_runner import iter_arrival_offsets, run_open_loop
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def exists(self, key):
+        return int(key in self.values)
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key, ttl):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def fast_config(monkeypatch: pytest.MonkeyPatch):
+    config = distributed_load.project_config
+    monkeypatch.setattr(config, "LOAD_TEST_SHARD_START_DELAY", 0.05)
+    monkeypatch.setattr(config, "LOAD_TEST_FLUSH_INTERVAL", 0.05)
+    monkeypatch.setattr(config, "LOAD_TEST_SHARD_GRACE_SECONDS", 5)
+    monkeypatch.setattr(config, "LOAD_TEST_ABORT_MIN_REQUESTS", 5)
+
+
+def _patch_send(monkeypatch: pytest.MonkeyPatch, ok: bool):
+    async def _fake_snapshot_load(snapshots, stages, host_cap=None, rate_limit_rps=None, **kwargs):
+        async def _send(seq: int) -> bool:
+            await asyncio.sleep(0.001)
+            return ok
+
+        return await run_open_loop(_send, stages, **kwargs)
+
+    monkeypatch.setattr(distributed_load, "run_snapshot_load", _fake_snapshot_load)
+
+
+async def _start(redis: FakeRedis, shards: int, stages: list[dict], start_rps: float) -> tuple[dict, list[int]]:
+    dispatched: list[int] = []
+    meta = await start_distributed_load(
+        redis,
+        snapshots=[{"method": "GET", "url": "http://stub/"}],
+        stages=stages,
+        start_rps=start_rps,
+        shards=shards,
+        max_in_flight=10,
+        abort_error_rate=0.5,
+        dispatch=lambda load_id, shard_index: dispatched.append(shard_index),
+        extra={"request_id": 3},
+    )
+    return meta, dispatched
+
+
+def test_shard_phases_merge_into_single_schedule():
+    stages = [{"duration": 2, "target_rps": 30}, {"duration": 1, "target_rps": 30}]
+    single = list(iter_arrival_offsets(stages, 6))
+
+    shard_stages, shard_start_rps = split_load_profile(stages, 6, 3)
+    merged = sorted(
+        offset for index in range(3) for offset in iter_arrival_offsets(shard_stages, shard_start_rps, phase=index / 3)
+    )
+
+    assert merged == pytest.approx(single)
+
+
+def test_distributed_load_merges_shard_histograms(monkeypatch: pytest.MonkeyPatch):
+    _patch_send(monkeypatch, ok=True)
+    redis = FakeRedis()
+
+    async def _run():
+        meta, dispatched = await _start(redis, 2, [{"duration": 0.5, "target_rps": 40}], 40)
+        shard_results = await asyncio.gather(*(run_load_shard(redis, meta["load_id"], index) for index in dispatched))
+        report = await coordinate_load_run(redis, meta["load_id"], poll_interval=0.01)
+        return meta, dispatched, shard_results, report
+
+    meta, dispatched, shard_results, report = asyncio.run(_run())
+
+    assert dispatched == [0, 1]
+    assert meta["shard_stages"] == [{"duration": 0.5, "target_rps": 20.0}]
+    assert [item["status"] for item in shard_results] == ["done", "done"]
+    assert report["status"] == "completed"
+    assert report["request_id"] == 3
+    assert report["summary"]["requests"] == 20
+    assert report["summary"]["errors"] == 0
+    assert report["shard_status"] == {"0": "done", "1": "done"}
+    # 最终报告落到 Redis, 后续查询直接返回
+    assert load_key(meta["load_id"], "report") in redis.values
+
+
+def test_coordinator_aborts_all_shards_on_error_rate(monkeypatch: pytest.MonkeyPatch):
+    _patch_send(monkeypatch, ok=False)
+    redis = FakeRedis()
+
+    async def _run():
+        meta, dispatched = await _start(redis, 2, [{"duration": 3, "target_rps": 40}], 40)
+        coordinator = asyncio.create_task(coordinate_load_run(redis, meta["load_id"], poll_interval=0.05))
+        shard_results = await asyncio.gather(*(run_load_shard(redis, meta["load_id"], index) for index in dispatched))
+        return shard_results, await coordinator
+
+    started_at = time.perf_counter()
+    shard_results, report = asyncio.run(_run())
+
+    assert time.perf_counter() - started_at < 2.5
+    assert [item["status"] for item in shard_results] == ["aborted", "aborted"]
+    assert report["status"] == "aborted"
+    assert "错误率" in report["abort_reason"]
+    assert 0 < report["summary"]["requests"] < 120
+    assert report["summary"]["error_rate"] == 1.0
+
+
+def test_late_shard_is_skipped(monkeypatch: pytest.MonkeyPatch):
+    _patch_send(monkeypatch, ok=True)
+    redis = FakeRedis()
+
+    async def _run():
+        meta, _ = await _start(redis, 1, [{"duration": 1, "target_rps": 10}], 10)
+        stored = await get_load_meta(redis, meta["load_id"])
+        stored["start_at"] = time.time() - distributed_load.project_config.LOAD_TEST_SHARD_MAX_SKEW - 1
+        await redis.set(load_key(meta["load_id"], "meta"), json.dumps(stored))
+        return await run_load_shard(redis, meta["load_id"], 0)
+
+    result = asyncio.run(_run())
+
+    assert result["status"] == "late"
+
+
+def test_coordinator_failure_marks_status_and_aborts_shards(monkeypatch: pytest.MonkeyPatch):
+    redis = FakeRedis()
+
+    async def _broken_collect(redis, load_id):
+        raise RuntimeError("redis gone")
+
+    monkeypatch.setattr(distributed_load, "collect_load_report", _broken_collect)
+
+    async def _run():
+        meta, _ = await _start(redis, 1, [{"duration": 1, "target_rps": 10}], 10)
+        return meta, await run_load_coordinator(redis, meta["load_id"], poll_interval=0.01)
+
+    meta, report = asyncio.run(_run())
+
+    assert report is None
+    assert redis.hashes[load_key(meta["load_id"], "status")]["coordinator"] == "failed"
+    assert "redis gone" in redis.values[load_key(meta["load_id"], "abort")]
+
+
+def test_coordinator_is_routed_to_its_own_queue():
+    from app.tasks.celery_app import celery_app
+    from app.tasks.load_tasks import run_load_coordinator_task, run_load_shard_task
+
+    config = distributed_load.project_config
+    routes = celery_app.conf.task_routes
+    assert routes[run_load_coordinator_task.name] == {"queue": config.CELERY_LOAD_COORDINATOR_QUEUE}
+    # 分片仍进入默认队列, 不会与协调端共用执行槽位
+    assert run_load_shard_task.name not in routes
+    assert config.CELERY_LOAD_COORDINATOR_QUEUE != config.CELERY_TASK_QUEUE
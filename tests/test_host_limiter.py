@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from app.core import metrics
+from app.services.host_limiter import HostConcurrencyLimiter, HostLimit, host_key
+
+
+def _limit(**kwargs) -> HostLimit:
+    options = {
+        "initial": 4,
+        "min_limit": 1,
+        "max_limit": 20,
+        "backoff": 0.5,
+        "error_rate": 0.1,
+        "latency_tolerance": 2.0,
+        "latency_slack_ms": 50,
+        "window_min_samples": 4,
+    }
+    options.update(kwargs)
+    return HostLimit("example.com", **options)
+
+
+def test_host_key_includes_port():
+    assert host_key("https://Example.com/a?b=1") == "example.com"
+    assert host_key("http://127.0.0.1:8080/x") == "127.0.0.1:8080"
+    assert host_key("/relative") is None
+    assert host_key(None) is None
+
+
+def test_additive_increase_only_when_saturated():
+    limit = _limit()
+
+    for _ in range(4):
+        limit.record(10, failed=False)
+    assert limit.effective_limit == 4
+
+    limit._window_saturated = True
+    for _ in range(4):
+        limit.record(10, failed=False)
+    assert limit.effective_limit == 5
+    assert limit.increases == 1
+
+
+def test_multiplicative_decrease_on_errors_and_latency():
+    limit = _limit(initial=8)
+
+    for failed in (True, False, False, False, False, False, False, False):
+        limit.record(10, failed=failed)
+    assert limit.effective_limit == 4
+
+    limit.record(10, failed=False)  # 基准 10ms
+    for _ in range(3):
+        limit.record(500, failed=False)
+    assert limit.effective_limit == 2
+    assert limit.decreases == 2
+
+    for _ in range(10):
+        for _ in range(4):
+            limit.record(10, failed=True)
+    assert limit.effective_limit == 1
+
+
+def test_environment_cap_does_not_bound_adaptive_limit():
+    limit = _limit(initial=10)
+
+    limit._window_saturated = True
+    for _ in range(10):
+        limit.record(10, failed=False)
+    assert limit.effective_limit == 11
+
+
+def test_environment_caps_are_per_host_and_environment():
+    limiter = HostConcurrencyLimiter(initial=20, window_min_samples=100)
+    active: dict[str, int] = {"capped": 0, "other": 0, "uncapped": 0}
+    peak: dict[str, int] = dict(active)
+
+    async def _request(kind: str, cap: int | None, env_id: int | None):
+        async with limiter.slot("http://target/x", cap, env_id=env_id):
+            active[kind] += 1
+            peak[kind] = max(peak[kind], active[kind])
+            await asyncio.sleep(0.01)
+            active[kind] -= 1
+
+    async def _run():
+        # 交替调用: 后来者的上限(含 None)不能覆盖其他环境的上限
+        calls = []
+        for _ in range(6):
+            calls.append(_request("capped", 2, 1))
+            calls.append(_request("other", 3, 2))
+            calls.append(_request("uncapped", None, None))
+        await asyncio.gather(*calls)
+
+    asyncio.run(_run())
+
+    assert peak == {"capped": 2, "other": 3, "uncapped": 6}
+    state = limiter.snapshot()[0]
+    assert state["in_flight"] == 0
+    assert sorted((item["env_id"], item["cap"], item["in_flight"]) for item in state["caps"]) == [
+        (1, 2, 0),
+        (2, 3, 0),
+    ]
+
+
+def test_slot_queues_beyond_limit():
+    limiter = HostConcurrencyLimiter(initial=2, window_min_samples=100)
+    peak = 0
+    active = 0
+
+    async def _request():
+        nonlocal peak, active
+        async with limiter.slot("http://target:9000/x") as slot:
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            slot.record_response(200)
+
+    async def _run():
+        await asyncio.gather(*(_request() for _ in range(10)))
+
+    asyncio.run(_run())
+
+    state = limiter.get("target:9000")
+    assert peak == 2
+    assert state.in_flight == 0
+    assert state.waiting == 0
+
+
+def test_cancelled_waiter_releases_slot():
+    limiter = HostConcurrencyLimiter(initial=1)
+
+    async def _run():
+        limit = limiter.get("target")
+        await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        limit.release()  # 槽位交给 waiter, 但 waiter 在唤醒前被取消
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limit
+
+    limit = asyncio.run(_run())
+
+    assert limit.in_flight == 0
+    assert limit.waiting == 0
+
+
+def test_limit_is_shared_across_event_loops():
+    limiter = HostConcurrencyLimiter(initial=1, window_min_samples=100)
+    limit = limiter.get("target")
+    holder_ready = threading.Event()
+    release_holder = threading.Event()
+    order: list[str] = []
+
+    def _holder():
+        async def _hold():
+            await limit.acquire()
+            holder_ready.set()
+            await asyncio.get_running_loop().run_in_executor(None, release_holder.wait)
+            order.append("holder")
+            limit.release()
+
+        asyncio.run(_hold())
+
+    thread = threading.Thread(target=_holder)
+    thread.start()
+    holder_ready.wait(5)
+
+    async def _wait():
+        release_task = asyncio.get_running_loop().call_later(0.05, release_holder.set)
+        await asyncio.wait_for(limit.acquire(), timeout=5)
+        order.append("waiter")
+        limit.release()
+        release_task.cancel()
+
+    asyncio.run(_wait())
+    thread.join(5)
+
+    assert order == ["holder", "waiter"]
+    assert limit.in_flight == 0
+
+
+def test_slot_records_transport_errors_only():
+    limiter = HostConcurrencyLimiter(initial=4)
+
+    async def _run():
+        async with limiter.slot("http://target/x") as slot:
+            slot.record_error(httpx.ConnectTimeout("timeout"))
+        async with limiter.slot("http://target/x") as slot:
+            slot.record_error(ValueError("bad body"))
+        async with limiter.slot("http://target/x") as slot:
+            slot.record_response(503)
+
+    asyncio.run(_run())
+
+    assert limiter.get("target")._window_samples == 2
+    assert limiter.get("target")._window_errors == 2
+
+
+def test_slot_updates_host_metrics(monkeypatch: pytest.MonkeyPatch):
+    limiter = HostConcurrencyLimiter(initial=3)
+    monkeypatch.setattr(metrics, "_executor_hosts", set())
+
+    async def _run():
+        async with limiter.slot("http://metrics-host/x") as slot:
+            assert metrics.HOST_IN_FLIGHT.labels(host="metrics-host")._value.get() == 1
+            slot.record_response(200)
+
+    asyncio.run(_run())
+
+    assert metrics.HOST_CONCURRENCY_LIMIT.labels(host="metrics-host")._value.get() == 3
+    assert metrics.HOST_IN_FLIGHT.labels(host="metrics-host")._value.get() == 0
+    assert limiter.snapshot()[0]["host"] == "metrics-host"
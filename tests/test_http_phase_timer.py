@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import http_phase_timer as phase_timer_module
+from app.services.api_request_executor import _execute_http_request
+from app.services.http_phase_timer import HttpPhaseTimer, average_phase_timings
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"ok" * 1000
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        return None
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_phase_timer_accumulates_trace_events(monkeypatch):
+    clock = iter([0.0, 0.010, 0.015, 0.045, 0.050, 0.060, 0.061, 0.200, 0.201, 0.230, 0.240])
+    monkeypatch.setattr(phase_timer_module.time, "perf_counter", lambda: next(clock))
+
+    timer = HttpPhaseTimer()
+
+    async def feed():
+        for event in (
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "connection.start_tls.started",
+            "connection.start_tls.complete",
+            "http11.send_request_headers.started",
+            "http11.send_request_body.complete",
+            "http11.receive_response_headers.complete",
+            "http11.receive_response_body.started",
+            "http11.receive_response_body.complete",
+        ):
+            await timer.trace(event, {})
+
+    asyncio.run(feed())
+    assert timer.finish() == {
+        "setup": 10.0,
+        "connect": 5.0,
+        "tls": 5.0,
+        "send": 1.0,
+        "ttfb": 139.0,
+        "download": 29.0,
+        "total": 240.0,
+    }
+
+
+def test_execute_http_request_records_phase_timings(http_server):
+    result = asyncio.run(_execute_http_request({"method": "GET", "url": f"{http_server}/x", "timeout_ms": 5000}))
+
+    timings = result["phase_timings"]
+    assert result["response_status_code"] == 200
+    assert {"setup", "connect", "send", "ttfb", "download", "total"} <= set(timings)
+    assert "tls" not in timings
+    assert timings["total"] >= timings["ttfb"]
+
+
+def test_average_phase_timings_skips_missing_phases():
+    assert average_phase_timings([None, {}]) is None
+    assert average_phase_timings(
+        [
+            {"connect": 10, "ttfb": 100, "total": 120},
+            {"ttfb": 200, "total": 210},
+            None,
+        ]
+    ) == {"connect": 10.0, "ttfb": 150.0, "total": 165.0}
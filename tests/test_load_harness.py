@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import tracemalloc
+
+import httpx
+
+from app.api.v1.routers import scenario as scenario_router
+from benchmarks.load import harness, soak
+from benchmarks.load.harness import InlineWorkerPool, percentiles
+from benchmarks.load.stub_target import StubTarget
+
+
+def test_stub_target_status_and_payload_overrides():
+    target = StubTarget(payload_bytes=10, error_rate=1.0, seed=1)
+
+    async def call():
+        transport = httpx.ASGITransport(app=target)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            failed = await client.post("/load/1", json={"a": 1})
+            forced = await client.get("/load/2", params={"status": 200, "payload_bytes": 3})
+        return failed, forced
+
+    failed, forced = asyncio.run(call())
+
+    assert failed.status_code == 500
+    assert failed.json()["padding"] == "x" * 10
+    assert forced.status_code == 200
+    assert forced.json()["padding"] == "xxx"
+    assert (target.requests, target.errors) == (2, 1)
+
+
+def test_percentiles_nearest_rank():
+    result = percentiles([i / 1000 for i in range(1, 101)])
+
+    assert result == {"p50": 50.0, "p90": 90.0, "p99": 99.0, "max": 100.0, "count": 100}
+    assert percentiles([])["p99"] is None
+
+
+def test_inline_worker_pool_intercepts_dispatch(monkeypatch):
+    processed = []
+
+    async def _fake_process(payload):
+        processed.append(payload["scenario_run_id"])
+        return True
+
+    monkeypatch.setattr(harness, "process_scenario_run_message", _fake_process)
+    original_dispatch = scenario_router.dispatch_scenario_run_task
+
+    async def run():
+        pool = InlineWorkerPool(size=2)
+        pool.start()
+        assert scenario_router.dispatch_scenario_run_task(7) is None
+        scenario_router.dispatch_scenario_run_task(8)
+        await pool.queue.join()
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+
+    assert sorted(processed) == [7, 8]
+    assert set(pool.finished_at) == {7, 8}
+    assert scenario_router.dispatch_scenario_run_task is original_dispatch
+
+
+def test_soak_slope_and_allocation_diff():
+    assert soak.linear_slope([(0, 100), (1, 102), (2, 104)]) == 2
+    assert soak.linear_slope([(1, 100)]) == 0
+    assert soak.current_rss_bytes() > 0
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.take_snapshot()
+        leaked = [bytearray(1024) for _ in range(200)]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    diff = soak.allocation_diff(snapshot, baseline, top=5)
+
+    assert leaked
+    assert diff["by_line"][0]["location"].startswith(__file__)
+    assert diff["by_line"][0]["size_diff_kb"] >= 200
+    assert diff["by_module"][0]["location"] == __file__
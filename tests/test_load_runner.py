@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.routers import api_request as api_request_router
+from app.core.exception_handlers import register_exception_handlers
+from app.core.security import check_admin_existence
+from app.db.session import get_db_session
+from app.models.admin import Admin
+from app.models.api_request import ApiEnvironment, ApiRequest
+from app.services import load_runner
+from app.services.circuit_breaker import CircuitOpenError
+from app.services.load_runner import (
+    LoadTestRecorder,
+    build_load_report,
+    iter_arrival_offsets,
+    run_open_loop,
+)
+from app.utils.hdr_histogram import HdrHistogram
+
+
+class FakeDBSession:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_iter_arrival_offsets_ramp_then_hold():
+    stages = [{"duration": 2, "target_rps": 10}, {"duration": 3, "target_rps": 10}]
+    offsets = list(iter_arrival_offsets(stages))
+
+    # 爬升阶段平均 5 RPS * 2s + 保持阶段 10 RPS * 3s
+    assert len(offsets) == 40
+    assert offsets == sorted(offsets)
+    assert len([item for item in offsets if item <= 2]) == 10
+    # 保持阶段间隔均匀
+    hold = [item for item in offsets if item > 2]
+    assert hold[1] - hold[0] == pytest.approx(0.1)
+
+
+def test_iter_arrival_offsets_constant_rate():
+    offsets = list(iter_arrival_offsets([{"duration": 1, "target_rps": 4}], start_rps=4))
+
+    assert offsets == pytest.approx([0.25, 0.5, 0.75, 1.0])
+
+
+def test_hdr_histogram_percentiles_within_precision():
+    histogram = HdrHistogram()
+    for value in range(1, 10001):
+        histogram.record(value * 100)
+
+    assert histogram.total == 10000
+    assert histogram.value_at_percentile(50) == pytest.approx(500_000, rel=0.01)
+    assert histogram.value_at_percentile(99) == pytest.approx(990_000, rel=0.01)
+    assert histogram.value_at_percentile(100) == 1_000_000
+    assert histogram.mean == pytest.approx(500_050)
+
+
+def test_hdr_histogram_merge_and_round_trip():
+    left, right = HdrHistogram(), HdrHistogram()
+    for value in range(1000):
+        left.record(1000)
+        right.record(9000)
+
+    merged = HdrHistogram.from_dict(left.to_dict())
+    merged.merge(HdrHistogram.from_dict(right.to_dict()))
+
+    assert merged.total == 2000
+    assert merged.min == 1000
+    assert merged.max == 9000
+    assert merged.value_at_percentile(50) == pytest.approx(1000, rel=0.01)
+    assert merged.value_at_percentile(75) == pytest.approx(9000, rel=0.01)
+    with pytest.raises(ValueError):
+        merged.merge(HdrHistogram(significant_figures=3))
+
+
+def test_run_open_loop_counts_queueing_delay():
+    async def _slow_send(seq: int) -> bool:
+        await asyncio.sleep(0.05)
+        return seq % 2 == 0
+
+    # 20 RPS(间隔 50ms) 但只允许 1 个并发, 服务耗时同为 50ms: 排队时间必须计入延迟
+    recorder = asyncio.run(
+        run_open_loop(_slow_send, [{"duration": 0.5, "target_rps": 20}], start_rps=20, max_in_flight=1)
+    )
+    report = build_load_report(recorder, 0.5)
+
+    assert recorder.sent == 10
+    assert recorder.errors == 5
+    assert report["summary"]["error_rate"] == 0.5
+    assert report["summary"]["p50_ms"] >= 45
+    assert report["timeline"][0]["second"] == 0
+
+
+def test_run_open_loop_does_not_wait_for_slow_responses():
+    async def _slow_send(seq: int) -> bool:
+        await asyncio.sleep(0.3)
+        return True
+
+    async def _run():
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        recorder = await run_open_loop(
+            _slow_send, [{"duration": 0.2, "target_rps": 50}], start_rps=50, max_in_flight=100
+        )
+        return recorder, loop.time() - started_at
+
+    recorder, elapsed = asyncio.run(_run())
+
+    # 闭环模型需要 10 * 0.3s, 开放模型按到达时间发送, 总时长约等于 0.2s + 0.3s
+    assert recorder.sent == 10
+    assert elapsed < 1.0
+    assert recorder.total.value_at_percentile(50) < 400_000
+
+
+def test_load_recorder_buckets_by_intended_second():
+    recorder = LoadTestRecorder()
+    recorder.record(0.2, 1000, True)
+    recorder.record(1.7, 2000, False)
+
+    report = build_load_report(recorder, 2.0)
+
+    assert [item["second"] for item in report["timeline"]] == [0, 1]
+    assert report["timeline"][1]["errors"] == 1
+    assert report["summary"]["requests"] == 2
+    assert report["summary"]["rps"] == 1.0
+
+
+def _build_admin() -> Admin:
+    admin = Admin(username="tester", password="hashed")
+    admin.id = 1
+    return admin
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDBSession()
+
+
+@pytest.fixture
+def client(fake_db):
+    app = FastAPI()
+    register_exception_handlers(app, debug=True)
+    app.include_router(api_request_router.router, prefix="/api/case")
+
+    admin = _build_admin()
+
+    async def _override_admin():
+        return admin
+
+    async def _override_db() -> AsyncGenerator[FakeDBSession, None]:
+        yield fake_db
+
+    app.dependency_overrides[check_admin_existence] = _override_admin
+    app.dependency_overrides[get_db_session] = _override_db
+
+    with TestClient(app) as c:
+        yield c
+
+
+def test_load_run_rejects_rps_over_limit(client: TestClient):
+    payload = {
+        "request_id": 1,
+        "stages": [{"duration": 1, "target_rps": api_request_router.project_config.LOAD_TEST_MAX_RPS + 1}],
+    }
+    resp = client.post("/api/case/load_run", json=payload)
+    body = resp.json()
+
+    assert body["code"] == 10005
+    assert "RPS" in body["message"]
+
+
+def test_load_run_rejects_duration_over_limit(client: TestClient):
+    max_duration = api_request_router.project_config.LOAD_TEST_MAX_DURATION
+    payload = {
+        "request_id": 1,
+        "stages": [{"duration": max_duration, "target_rps": 1}, {"duration": 1, "target_rps": 1}],
+    }
+    resp = client.post("/api/case/load_run", json=payload)
+
+    assert resp.json()["code"] == 10005
+
+
+def test_load_run_dispatches_single_shard(monkeypatch: pytest.MonkeyPatch, client: TestClient, fake_db: FakeDBSession):
+    request_obj = ApiRequest(name="case-demo", method="GET", url="https://example.com/api", env_id=None)
+    request_obj.id = 7
+    environment_obj = ApiEnvironment(name="staging", max_concurrency=4, rate_limit_rps=50)
+    environment_obj.id = 3
+    captured: dict[str, Any] = {}
+    coordinators: list[str] = []
+
+    async def _fake_load_targets(db, request_data):
+        return request_obj, [], environment_obj
+
+    async def _fake_get_redis_pool():
+        return "redis"
+
+    async def _fake_start(redis, **kwargs):
+        captured.update(kwargs)
+        return {"load_id": "abc", "shards": kwargs["shards"], "start_at": 1.0}
+
+    monkeypatch.setattr(api_request_router, "_load_targets", _fake_load_targets)
+    monkeypatch.setattr(api_request_router, "get_redis_pool", _fake_get_redis_pool)
+    monkeypatch.setattr(api_request_router, "start_distributed_load", _fake_start)
+    monkeypatch.setattr(api_request_router, "dispatch_load_coordinator_task", coordinators.append)
+
+    payload = {"request_id": 7, "start_rps": 1, "stages": [{"duration": 3, "target_rps": 1}], "max_in_flight": 5}
+    resp = client.post("/api/case/load_run", json=payload)
+    body = resp.json()
+
+    # 压测交给 Celery worker 执行, 接口立即返回 load_id
+    assert body["code"] == 200
+    assert body["data"] == {"load_id": "abc", "shards": 1, "start_at": 1.0}
+    assert coordinators == ["abc"]
+    assert captured["stages"] == [{"duration": 3, "target_rps": 1}]
+    assert captured["max_in_flight"] == 5
+    assert captured["extra"]["host_cap"] == 4
+    assert captured["extra"]["rate_limit_rps"] == 50
+    assert fake_db.closed is True
+
+
+def test_snapshot_load_requests_go_through_request_guard(monkeypatch: pytest.MonkeyPatch):
+    guarded: list[tuple] = []
+
+    @asynccontextmanager
+    async def _open_circuit(snapshot, host_cap=None, rate_limit_rps=None):
+        guarded.append((snapshot["url"], host_cap, rate_limit_rps))
+        raise CircuitOpenError("熔断中")
+        yield
+
+    monkeypatch.setattr(load_runner, "request_guard", _open_circuit)
+
+    recorder = asyncio.run(
+        load_runner.run_snapshot_load(
+            [{"method": "GET", "url": "http://stub.invalid/x", "env_id": 3}],
+            [{"duration": 0.2, "target_rps": 20}],
+            start_rps=20,
+            host_cap=4,
+            rate_limit_rps=50,
+        )
+    )
+
+    # 熔断打开时不发送请求, 计为错误
+    assert recorder.sent == 4
+    assert recorder.errors == 4
+    assert guarded == [("http://stub.invalid/x", 4, 50)] * 4
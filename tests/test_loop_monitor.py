@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+
+from loguru import logger
+from prometheus_client import REGISTRY
+
+from app.core.loop_monitor import LoopLagMonitor, run_with_loop_monitor
+
+
+def _blocking_handler():
+    time.sleep(0.3)
+
+
+def test_watchdog_logs_blocking_stack():
+    messages: list[str] = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="WARNING")
+
+    async def main():
+        monitor = LoopLagMonitor(role="test", interval=0.02, threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _blocking_handler()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    try:
+        asyncio.run(main())
+    finally:
+        logger.remove(handler_id)
+
+    stack_logs = [item for item in messages if "当前调用栈" in item]
+    assert len(stack_logs) == 1
+    assert "_blocking_handler" in stack_logs[0]
+    assert REGISTRY.get_sample_value("exile_event_loop_lag_seconds_count", {"role": "test"}) >= 1
+
+
+def test_check_reports_each_stall_once():
+    monitor = LoopLagMonitor(role="test", interval=1, threshold=0.1)
+    monitor._deadline = 10.0
+
+    assert monitor.check(now=10.05) is False
+    assert monitor.check(now=10.2) is True
+    assert monitor.check(now=10.5) is False
+
+
+def test_run_with_loop_monitor_returns_result():
+    async def work():
+        await asyncio.sleep(0)
+        return 42
+
+    assert run_with_loop_monitor(work(), role="test") == 42
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core import metrics as metrics_module
+from app.core.metrics import PrometheusMiddleware, metrics_router, observe_executor_request, status_class
+from app.services import api_request_executor
+
+
+def _sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _build_client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/api/case/{case_id}")
+    async def get_case(case_id: int):
+        return {"id": case_id}
+
+    app.add_middleware(PrometheusMiddleware, exclude_paths=["/metrics"])
+    app.include_router(metrics_router)
+    return TestClient(app)
+
+
+def test_status_class():
+    assert status_class(204) == "2xx"
+    assert status_class(503) == "5xx"
+    assert status_class(None) == "error"
+
+
+def test_route_histogram_uses_route_template():
+    labels = {"method": "GET", "route": "/api/case/{case_id}", "status_class": "2xx"}
+    before = _sample("exile_http_request_duration_seconds_count", labels)
+    client = _build_client()
+
+    client.get("/api/case/1")
+    client.get("/api/case/2")
+    client.get("/not-found")
+
+    assert _sample("exile_http_request_duration_seconds_count", labels) == before + 2
+    assert _sample(
+        "exile_http_request_duration_seconds_count",
+        {"method": "GET", "route": "<unmatched>", "status_class": "4xx"},
+    ) >= 1
+    assert _sample("exile_http_requests_in_progress", {"method": "GET"}) == 0
+
+
+def test_metrics_endpoint_exposes_pool_gauges():
+    resp = _build_client().get("/metrics")
+
+    assert resp.status_code == 200
+    assert "exile_http_request_duration_seconds" in resp.text
+    assert "exile_db_pool_checked_out" in resp.text
+    assert "exile_executor_request_duration_seconds" in resp.text
+
+
+def test_executor_host_label_is_capped(monkeypatch):
+    monkeypatch.setattr(metrics_module, "_executor_hosts", set())
+    monkeypatch.setattr(metrics_module.project_config, "METRICS_MAX_EXECUTOR_HOSTS", 1)
+    before = _sample("exile_executor_request_duration_seconds_count", {"host": "<other>", "status_class": "error"})
+
+    observe_executor_request("https://a.example.com/x", 200, 0.1)
+    observe_executor_request("https://b.example.com/x", None, 0.1)
+
+    assert _sample("exile_executor_request_duration_seconds_count", {"host": "a.example.com", "status_class": "2xx"}) >= 1
+    assert _sample(
+        "exile_executor_request_duration_seconds_count", {"host": "<other>", "status_class": "error"}
+    ) == before + 1
+
+
+def test_executor_records_failed_request(monkeypatch):
+    observed: list[tuple] = []
+    monkeypatch.setattr(
+        api_request_executor,
+        "observe_executor_request",
+        lambda url, status_code, elapsed: observed.append((url, status_code)),
+    )
+
+    result = asyncio.run(
+        api_request_executor._execute_http_request({"method": "GET", "url": "http://127.0.0.1:1/x", "timeout_ms": 200})
+    )
+
+    assert result["is_success"] is False
+    assert observed == [("http://127.0.0.1:1/x", None)]
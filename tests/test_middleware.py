@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import io
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from app.core import middleware as middleware_module
+from app.core.log_config import JsonAccessLogSink
+from app.core.middleware import PathPrefixTrie, RequestLoggingMiddleware
+
+
+@pytest.fixture
+def access_records():
+    records: list[dict] = []
+    handler_id = logger.add(
+        lambda message: records.append(dict(message.record["extra"])),
+        filter=lambda record: record["extra"].get("log_type") == "access",
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+def _build_client(**kwargs) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/api/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/api/boom")
+    async def boom():
+        return JSONResponse({"ok": False}, status_code=500)
+
+    @app.post("/api/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(RequestLoggingMiddleware, **kwargs)
+    return TestClient(app)
+
+
+def test_path_prefix_trie_exact_and_longest_prefix():
+    trie = PathPrefixTrie({"/static*": "static", "/api*": "api", "/api/health*": "health", "/docs": "docs"})
+
+    assert trie.match("/docs") == "docs"
+    assert trie.match("/docs/x") is None
+    assert trie.match("/static/a.js") == "static"
+    assert trie.match("/api/health/live") == "health"
+    assert trie.match("/api/user") == "api"
+    assert trie.match("/other", "default") == "default"
+
+
+def test_excluded_paths_are_not_logged(access_records):
+    client = _build_client(exclude_paths=["/api/health*"])
+    resp = client.get("/api/health")
+
+    assert resp.status_code == 200
+    assert "x-request-id" not in resp.headers
+    assert access_records == []
+
+
+def test_access_record_is_structured_and_reuses_request_id(access_records):
+    client = _build_client()
+    resp = client.get("/api/health?x=1", headers={"X-Request-Id": "rid-1", "X-Forwarded-For": "10.0.0.1, 10.0.0.2"})
+
+    assert resp.headers["x-request-id"] == "rid-1"
+    assert len(access_records) == 1
+    record = access_records[0]
+    assert record["method"] == "GET"
+    assert record["path"] == "/api/health"
+    assert record["query"] == "x=1"
+    assert record["status"] == 200
+    assert record["ip"] == "10.0.0.1"
+    assert record["request_id"] == "rid-1"
+
+
+def test_sampling_drops_fast_success_but_keeps_errors(access_records, monkeypatch):
+    monkeypatch.setattr(middleware_module.random, "random", lambda: 0.5)
+    client = _build_client(sample_rates="/api/health*:0.1,/api/boom:0")
+
+    client.get("/api/health")
+    client.get("/api/boom")
+
+    assert [record["path"] for record in access_records] == ["/api/boom"]
+    assert access_records[0]["status"] == 500
+    assert access_records[0]["sample_rate"] == 1.0
+
+
+def test_chunked_body_is_reassembled_for_downstream():
+    middleware = RequestLoggingMiddleware(app=None, log_body=True)
+    messages = [
+        {"type": "http.request", "body": b"ab", "more_body": True},
+        {"type": "http.request", "body": b"cd", "more_body": True},
+        {"type": "http.request", "body": b"e", "more_body": False},
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    assert asyncio.run(middleware._receive_body(receive)) == b"abcde"
+
+
+def test_body_logging_passes_body_downstream(access_records):
+    client = _build_client(log_body=True)
+    resp = client.post("/api/echo", json={"name": "x" * 100})
+
+    assert resp.json() == {"size": len(json.dumps({"name": "x" * 100}, separators=(",", ":")))}
+
+
+def test_json_access_sink_writes_single_line_json():
+    stream = io.StringIO()
+    handler_id = logger.add(
+        JsonAccessLogSink(stream),
+        format="{message}",
+        filter=lambda record: record["extra"].get("log_type") == "access",
+    )
+    try:
+        middleware_module.access_logger.info("{method} {path}", method="GET", path="/x", status=200)
+    finally:
+        logger.remove(handler_id)
+
+    payload = json.loads(stream.getvalue())
+    assert payload["method"] == "GET"
+    assert payload["path"] == "/x"
+    assert payload["status"] == 200
+    assert payload["level"] == "INFO"
+    assert "log_type" not in payload
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.db.redis_client as rp
+from app.api.v1.routers import admin_login as admin_login_router
+from app.core import password as password_module
+from app.core import security as security_module
+from app.core.exception_handlers import register_exception_handlers
+from app.core.exceptions import CustomException
+from app.core.password import hash_password, password_needs_rehash, verify_password_async
+from app.db.session import get_db_session
+from app.models.admin import Admin
+
+
+class _FakeScalarResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def first(self):
+        return self._items[0] if self._items else None
+
+
+class _FakeExecuteResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def scalars(self):
+        return _FakeScalarResult(self._items)
+
+
+class FakeDBSession:
+    def __init__(self, items: list[Any]):
+        self.items = items
+        self.commits = 0
+
+    async def execute(self, stmt):
+        return _FakeExecuteResult(self.items)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakeRedis:
+    """只实现 Redis 6 的命令: expire 不接受 nx/gt 等 Redis 7 选项"""
+
+    def __init__(self):
+        self.values: dict[str, int] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    async def expire(self, key, ttl):
+        self.ttls[key] = int(ttl)
+        return True
+
+    async def eval(self, script, numkeys, *args):
+        assert script == security_module.RECORD_LOGIN_FAILURE_SCRIPT
+        key, window = args[0], args[1]
+        failures = await self.incr(key)
+        if failures == 1:
+            await self.expire(key, window)
+        return failures
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def ttl(self, key):
+        return 120
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+@pytest.fixture(autouse=True)
+def low_rounds(monkeypatch):
+    monkeypatch.setattr(password_module.project_config, "PASSWORD_BCRYPT_ROUNDS", 4)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+    return redis
+
+
+@pytest.fixture
+def admin():
+    obj = Admin(username="tester", password=hash_password("secret"), status=1, login_type="many")
+    obj.id = 1
+    return obj
+
+
+@pytest.fixture
+def client(admin, fake_redis, monkeypatch):
+    app = FastAPI()
+    register_exception_handlers(app, debug=True)
+    app.include_router(admin_login_router.router, prefix="/api/admin")
+    db = FakeDBSession([admin])
+
+    async def _override_db() -> AsyncGenerator[FakeDBSession, None]:
+        yield db
+
+    async def fake_many_login(self, key, user_info_json_str):
+        self.token = "tk"
+
+    app.dependency_overrides[get_db_session] = _override_db
+    monkeypatch.setattr(admin_login_router.Token, "many_login", fake_many_login)
+
+    with TestClient(app) as c:
+        c.db = db
+        yield c
+
+
+def test_verify_password_runs_off_event_loop_thread(monkeypatch):
+    threads: list[int] = []
+    original = password_module.verify_password
+
+    def record_thread(password, hashed):
+        threads.append(threading.get_ident())
+        return original(password, hashed)
+
+    monkeypatch.setattr(password_module, "verify_password", record_thread)
+    hashed = hash_password("secret")
+
+    assert asyncio.run(verify_password_async("secret", hashed)) is True
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_password_executor_rejects_when_queue_full(monkeypatch):
+    monkeypatch.setattr(password_module.project_config, "PASSWORD_HASH_MAX_PENDING", 0)
+    with pytest.raises(CustomException) as exc_info:
+        asyncio.run(verify_password_async("secret", hash_password("secret")))
+    # 与"密码错误"(10005) 区分, 客户端可据此重试
+    assert exc_info.value.custom_code == 10008
+
+
+def test_password_needs_rehash_by_cost_factor(monkeypatch):
+    hashed = hash_password("secret")
+    assert password_needs_rehash(hashed) is False
+
+    monkeypatch.setattr(password_module.project_config, "PASSWORD_BCRYPT_ROUNDS", 5)
+    assert password_needs_rehash(hashed) is True
+    assert password_needs_rehash("not-a-bcrypt-hash") is False
+
+
+def test_login_rehashes_weaker_hash(client, admin, monkeypatch):
+    monkeypatch.setattr(password_module.project_config, "PASSWORD_BCRYPT_ROUNDS", 5)
+    old_hash = admin.password
+
+    resp = client.post("/api/admin/login", json={"username": "tester", "password": "secret"})
+
+    assert resp.json()["message"] == "登录成功"
+    assert admin.password != old_hash
+    assert admin.password.startswith("$2b$05$")
+    assert admin.update_timestamp is not None
+    assert client.db.commits == 1
+
+
+def test_login_throttled_after_repeated_failures(client, fake_redis, monkeypatch):
+    monkeypatch.setattr(password_module.project_config, "LOGIN_THROTTLE_MAX_FAILURES", 2)
+    verify_calls: list[str] = []
+    original = Admin.verify_password
+
+    async def counting_verify(self, raw_password):
+        verify_calls.append(raw_password)
+        return await original(self, raw_password)
+
+    monkeypatch.setattr(Admin, "verify_password", counting_verify)
+
+    for _ in range(2):
+        assert client.post("/api/admin/login", json={"username": "tester", "password": "bad"}).json()["code"] == 10005
+    blocked = client.post("/api/admin/login", json={"username": "tester", "password": "secret"}).json()
+
+    assert blocked["code"] == 10005
+    assert "120" in blocked["message"]
+    assert verify_calls == ["bad", "bad"]
+
+
+def test_login_success_resets_failures(client, fake_redis):
+    client.post("/api/admin/login", json={"username": "tester", "password": "bad"})
+    assert fake_redis.values == {"login_fail:tester": 1}
+
+    client.post("/api/admin/login", json={"username": "tester", "password": "secret"})
+    assert fake_redis.values == {}
+
+
+def test_record_login_failure_works_without_expire_nx(fake_redis, monkeypatch):
+    monkeypatch.setattr(security_module.project_config, "LOGIN_THROTTLE_WINDOW", 300)
+
+    assert asyncio.run(security_module.record_login_failure("tester")) == 1
+    fake_redis.ttls["login_fail:tester"] = 42  # 窗口已过去一部分
+    assert asyncio.run(security_module.record_login_failure("tester")) == 2
+
+    # 窗口从第一次失败开始, 后续失败不重置过期时间
+    assert fake_redis.ttls == {"login_fail:tester": 42}
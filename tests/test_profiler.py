@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.routers import profiler as profiler_router
+from app.core import profiler as profiler_module
+from app.core.exception_handlers import register_exception_handlers
+from app.core.exceptions import CustomException
+from app.core.security import check_admin_existence
+from app.models.admin import Admin
+from app.tasks import worker_control
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy_loop, args=(stop,), name="busy", daemon=True)
+    thread.start()
+    yield
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(profiler_router.project_config, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(profiler_router.project_config, "PROFILER_ADMIN_USERNAMES", "")
+
+
+def _build_client(admin: Admin) -> TestClient:
+    app = FastAPI()
+    register_exception_handlers(app, debug=True)
+    app.include_router(profiler_router.router, prefix="/api/admin")
+
+    async def _override_admin():
+        return admin
+
+    app.dependency_overrides[check_admin_existence] = _override_admin
+    return TestClient(app)
+
+
+def test_profile_collects_busy_thread_stacks(busy_thread):
+    result = profiler_module.profile(0.2, "collapsed", interval_ms=5)
+
+    assert result["samples"] > 5
+    busy_lines = [line for line in result["profile"].splitlines() if line.startswith("thread:busy;")]
+    assert any("_busy_loop (tests/test_profiler.py:" in line for line in busy_lines)
+
+
+def test_profile_rejects_concurrent_and_invalid_requests():
+    with pytest.raises(CustomException):
+        profiler_module.profile(0.1, "pstats")
+    with pytest.raises(CustomException):
+        profiler_module.profile(10_000)
+
+    profiler_module._profile_lock.acquire()
+    try:
+        with pytest.raises(CustomException) as exc_info:
+            profiler_module.profile(0.1)
+    finally:
+        profiler_module._profile_lock.release()
+    assert "已有采样任务" in exc_info.value.detail
+
+
+def test_speedscope_output_shares_frames():
+    stacks = profiler_module.Counter(
+        {
+            (("thread:main", "", 0), ("a", "x.py", 1), ("b", "x.py", 5)): 3,
+            (("thread:main", "", 0), ("a", "x.py", 1)): 1,
+        }
+    )
+
+    data = profiler_module.to_speedscope(stacks, interval_ms=10, name="test")
+
+    assert data["shared"]["frames"] == [
+        {"name": "thread:main"},
+        {"name": "a", "file": "x.py", "line": 1},
+        {"name": "b", "file": "x.py", "line": 5},
+    ]
+    assert data["profiles"][0]["samples"] == [[0, 1, 2], [0, 1]]
+    assert data["profiles"][0]["weights"] == [30, 10]
+    assert data["profiles"][0]["endValue"] == 40
+
+
+def test_profile_endpoint_returns_speedscope(enabled):
+    resp = _build_client(Admin(id=1, username="root", is_tourist=1)).post(
+        "/api/admin/profile", params={"seconds": 0.1, "fmt": "speedscope"}
+    )
+
+    assert resp.status_code == 200
+    assert "speedscope.json" in resp.headers["content-disposition"]
+    assert resp.json()["profiles"][0]["type"] == "sampled"
+
+
+def test_profile_endpoint_requires_permission(monkeypatch, enabled):
+    tourist_resp = _build_client(Admin(id=2, username="guest", is_tourist=0)).post("/api/admin/profile")
+    monkeypatch.setattr(profiler_router.project_config, "PROFILER_ADMIN_USERNAMES", "ops")
+    not_listed_resp = _build_client(Admin(id=1, username="root", is_tourist=1)).post("/api/admin/profile")
+
+    assert tourist_resp.json()["code"] == 10005
+    assert not_listed_resp.json()["code"] == 10005
+
+
+def test_profile_endpoint_disabled_by_default():
+    resp = _build_client(Admin(id=1, username="root", is_tourist=1)).post("/api/admin/profile")
+
+    assert resp.json()["code"] == 10005
+
+
+def test_profile_endpoint_forwards_to_worker(monkeypatch, enabled):
+    calls = []
+
+    def _fake_request(worker, seconds, fmt):
+        calls.append((worker, seconds, fmt))
+        return {"pid": 99, "seconds": seconds, "samples": 1, "format": fmt, "profile": "thread:main 1"}
+
+    monkeypatch.setattr(profiler_router, "request_worker_profile", _fake_request)
+
+    resp = _build_client(Admin(id=1, username="root", is_tourist=1)).post(
+        "/api/admin/profile", params={"seconds": 5, "worker": "celery@w1"}
+    )
+
+    assert resp.text == "thread:main 1"
+    assert resp.headers["x-profile-pid"] == "99"
+    assert calls == [("celery@w1", 5, "collapsed")]
+
+
+def test_worker_control_command_reports_errors(monkeypatch):
+    monkeypatch.setattr(worker_control.project_config, "PROFILER_ENABLED", True)
+
+    assert "error" in worker_control.profile_worker(None, seconds=0.05, fmt="bad")
+    assert worker_control.profile_worker(None, seconds=0.05)["ok"]["format"] == "collapsed"
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+from app.db.query_stats import QueryStatsMiddleware, get_query_stats, install_query_stats, track_queries
+
+
+@pytest.fixture
+def engine():
+    sync_engine = create_engine("sqlite://")
+    install_query_stats(sync_engine)
+    install_query_stats(sync_engine)
+    yield sync_engine
+    sync_engine.dispose()
+
+
+@pytest.fixture
+def warnings():
+    messages: list[str] = []
+    handler_id = logger.add(lambda message: messages.append(message.record["message"]), level="WARNING")
+    yield messages
+    logger.remove(handler_id)
+
+
+def test_track_queries_counts_statements(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with track_queries("outer") as outer:
+            conn.execute(text("SELECT 1"))
+            with track_queries("inner") as inner:
+                conn.execute(text("SELECT 2"))
+                conn.execute(text("SELECT 2"))
+            assert get_query_stats() is outer
+
+    assert get_query_stats() is None
+    assert inner.queries == 2
+    assert outer.queries == 3
+    assert outer.statements == {"SELECT 1": 1, "SELECT 2": 2}
+    assert outer.elapsed >= inner.elapsed > 0
+
+
+def test_repeated_statement_warns_once(engine, warnings):
+    with engine.connect() as conn, track_queries("GET /api/case") as stats:
+        stats.threshold = 3
+        for i in range(6):
+            conn.execute(text("SELECT :id"), {"id": i})
+
+    assert len([item for item in warnings if "N+1" in item]) == 1
+    assert "SELECT ?" in warnings[0]
+
+
+def _build_client(engine, expose_headers: bool) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/case")
+    def list_case():
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    app.add_middleware(QueryStatsMiddleware, expose_headers=expose_headers)
+    return TestClient(app)
+
+
+def test_middleware_exposes_headers(engine):
+    resp = _build_client(engine, expose_headers=True).get("/case")
+
+    assert resp.headers["x-db-queries"] == "3"
+    assert float(resp.headers["x-db-time"]) >= 0
+
+
+def test_middleware_hides_headers_when_disabled(engine):
+    resp = _build_client(engine, expose_headers=False).get("/case")
+
+    assert resp.status_code == 200
+    assert "x-db-queries" not in resp.headers
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import math
+import threading
+import time
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import app.db.redis_client as rp
+from app.services import api_request_executor
+from app.services.rate_limiter import DistributedRateLimiter, RateLimitTimeout, rate_limiter
+
+
+class FakeTokenBucketScript:
+    """与 TOKEN_BUCKET_LUA 相同的令牌桶计算"""
+
+    def __init__(self, server: "FakeRedis"):
+        self.server = server
+
+    async def __call__(self, keys, args, client=None):
+        self.server.calls += 1
+        if self.server.error:
+            raise self.server.error
+        rate, burst, requested = float(args[0]), float(args[1]), int(args[2])
+        now = time.monotonic() * 1000
+        tokens, ts = self.server.buckets.get(keys[0], (burst, now))
+        tokens = min(burst, tokens + max(now - ts, 0) * rate / 1000)
+        granted = min(requested, math.floor(tokens))
+        wait_ms = 0
+        if granted > 0:
+            tokens -= granted
+        else:
+            wait_ms = math.ceil((1 - tokens) * 1000 / rate)
+        self.server.buckets[keys[0]] = (tokens, now)
+        return [granted, wait_ms]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.calls = 0
+        self.error: Exception | None = None
+        self.closed = False
+
+    def register_script(self, script: str):
+        return FakeTokenBucketScript(self)
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_redis(monkeypatch: pytest.MonkeyPatch) -> FakeRedis:
+    redis = FakeRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+    return redis
+
+
+def test_resolve_buckets_from_environment_and_host_rules():
+    limiter = DistributedRateLimiter(host_rules={"*.staging.example.com": 200, "other.com": 5})
+
+    buckets = limiter.resolve_buckets("https://api.staging.example.com:8443/x", env_id=3, env_rps=50)
+
+    assert buckets == [
+        ("rate_limit:env:3:api.staging.example.com:8443", 50.0),
+        ("rate_limit:host:*.staging.example.com", 200.0),
+    ]
+    assert limiter.resolve_buckets("https://unlisted.com/x") == []
+    assert limiter.resolve_buckets("https://other.com/x", env_id=3, env_rps=None) == [("rate_limit:host:other.com", 5.0)]
+
+
+def test_local_batching_reduces_redis_round_trips(fake_redis: FakeRedis):
+    limiter = DistributedRateLimiter(host_rules={"target": 200}, batch_fraction=0.05, batch_max=20)
+
+    async def _run():
+        for _ in range(25):
+            await limiter.acquire("http://target/x")
+
+    asyncio.run(_run())
+
+    # 每次批量取 10 个令牌
+    assert limiter.batch_size(200) == 10
+    assert fake_redis.calls == 3
+
+
+def test_rate_is_enforced_across_processes(fake_redis: FakeRedis):
+    # 两个限流器实例模拟两个 worker 共用同一个 Redis 令牌桶
+    workers = [
+        DistributedRateLimiter(host_rules={"target": 50}, burst_seconds=0.1, batch_fraction=0.1) for _ in range(2)
+    ]
+
+    async def _run():
+        started_at = time.monotonic()
+        await asyncio.gather(*(workers[index % 2].acquire("http://target/x") for index in range(25)))
+        return time.monotonic() - started_at
+
+    elapsed = asyncio.run(_run())
+
+    # 容量 5 个, 其余 20 个按 50/s 发放
+    assert elapsed >= 0.35
+
+
+def test_expired_local_tokens_are_dropped(fake_redis: FakeRedis):
+    limiter = DistributedRateLimiter(host_rules={"target": 200}, local_ttl=0.01)
+
+    async def _run():
+        await limiter.acquire("http://target/x")
+        await asyncio.sleep(0.02)
+        await limiter.acquire("http://target/x")
+
+    asyncio.run(_run())
+
+    assert fake_redis.calls == 2
+
+
+def test_redis_error_fails_open_or_closed(fake_redis: FakeRedis):
+    fake_redis.error = RedisConnectionError("down")
+
+    assert asyncio.run(DistributedRateLimiter(host_rules={"target": 1}).acquire("http://target/x")) >= 0
+
+    with pytest.raises(RedisConnectionError):
+        asyncio.run(DistributedRateLimiter(host_rules={"target": 1}, fail_open=False).acquire("http://target/x"))
+
+
+def test_wait_timeout_raises(fake_redis: FakeRedis):
+    limiter = DistributedRateLimiter(host_rules={"target": 1}, max_wait=0.05)
+
+    async def _run():
+        await limiter.acquire("http://target/x")
+        await limiter.acquire("http://target/x")
+
+    with pytest.raises(RateLimitTimeout):
+        asyncio.run(_run())
+
+
+def test_executor_returns_failure_on_rate_limit_timeout(monkeypatch: pytest.MonkeyPatch):
+    async def _timeout(url, env_id=None, env_rps=None):
+        assert env_rps == 5
+        raise RateLimitTimeout("等待限流令牌超时")
+
+    monkeypatch.setattr(rate_limiter, "acquire", _timeout)
+
+    result = asyncio.run(
+        api_request_executor._execute_http_request({"method": "GET", "url": "http://target/x"}, rate_limit_rps=5)
+    )
+
+    assert result["is_success"] is False
+    assert result["error_message"] == "等待限流令牌超时"
+
+
+def test_worker_redis_pool_is_per_task_event_loop(monkeypatch: pytest.MonkeyPatch):
+    # --pool=threads: 多个任务在各自线程中 asyncio.run, 连接池不能共享
+    global_pool = FakeRedis()
+    created: list[FakeRedis] = []
+    monkeypatch.setattr(rp, "redis_pool", global_pool)
+    monkeypatch.setattr(rp, "build_connection_pool", lambda: object())
+
+    def _from_pool(pool):
+        redis = FakeRedis()
+        created.append(redis)
+        return redis
+
+    monkeypatch.setattr(rp.Redis, "from_pool", staticmethod(_from_pool))
+    seen: list[tuple[FakeRedis, bool]] = []
+    barrier = threading.Barrier(4)
+
+    async def _task():
+        async with rp.worker_redis_pool() as redis:
+            async with rp.worker_redis_pool() as nested:
+                assert nested is redis
+            assert rp.current_redis() is redis
+            await asyncio.to_thread(barrier.wait)
+            seen.append((redis, redis.closed))
+
+    threads = [threading.Thread(target=lambda: asyncio.run(_task())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(redis) for redis, _ in seen}) == 4
+    # 其它任务仍在运行时没有被关闭
+    assert not any(closed for _, closed in seen)
+    assert all(redis.closed for redis in created)
+    assert rp.redis_pool is global_pool and global_pool.closed is False
+    assert rp.current_redis() is global_pool
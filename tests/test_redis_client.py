@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+import app.db.redis_client as rp
+from app.db.redis_client import build_connection_pool, get_values, set_values
+from app.db.redis_client_cache import INVALIDATE_CHANNEL, RedisClientCache
+
+
+class FakeConnection:
+    def __init__(self, server: "FakeServer"):
+        self.server = server
+        self.pending: list[tuple] = []
+        self.disconnected = False
+
+    async def connect(self):
+        self.server.connections.append(self)
+
+    async def disconnect(self):
+        self.disconnected = True
+        self.server.pushes.put_nowait(ConnectionError("closed"))
+
+    async def send_command(self, *args):
+        self.pending.append(args)
+
+    async def read_response(self, timeout=None, disconnect_on_error=True):
+        if not self.pending:
+            message = await self.server.pushes.get()
+            if isinstance(message, Exception):
+                raise message
+            return message
+        command = self.pending.pop(0)
+        self.server.commands.append(command)
+        if command == ("CLIENT", "ID"):
+            return 42
+        if command[0] == "GET":
+            return self.server.values.get(command[1])
+        return b"OK"
+
+
+class FakeServer:
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.commands: list[tuple] = []
+        self.connections: list[FakeConnection] = []
+        self.pushes: asyncio.Queue = asyncio.Queue()
+        self.pool_gets: list[str] = []
+
+    def invalidate(self, *keys):
+        self.pushes.put_nowait([b"message", INVALIDATE_CHANNEL.encode(), [key.encode() for key in keys]])
+
+
+class FakeRedis:
+    def __init__(self, server: FakeServer):
+        self.server = server
+        self.connection_pool = self
+
+    @property
+    def connection_kwargs(self):
+        return {"server": self.server}
+
+    @staticmethod
+    def connection_class(server, **kwargs):
+        conn = FakeConnection(server)
+        conn.kwargs = kwargs
+        return conn
+
+    async def get(self, key):
+        self.server.pool_gets.append(key)
+        return self.server.values.get(key)
+
+
+async def _wait_ready(cache: RedisClientCache):
+    for _ in range(100):
+        if cache.ready:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("client cache not ready")
+
+
+def test_client_cache_tracks_reads_and_applies_invalidation():
+    async def scenario():
+        server = FakeServer()
+        server.values["tk"] = '{"id": 1}'
+        cache = RedisClientCache(FakeRedis(server), maxsize=10, ttl=60)
+        cache.start()
+        await _wait_ready(cache)
+
+        first = await cache.get("tk")
+        second = await cache.get("tk")
+        gets_before_invalidate = [c for c in server.commands if c[0] == "GET"]
+
+        server.values["tk"] = '{"id": 2}'
+        server.invalidate("tk")
+        await asyncio.sleep(0)
+        third = await cache.get("tk")
+        await cache.stop()
+        return server, first, second, third, gets_before_invalidate
+
+    server, first, second, third, gets_before_invalidate = asyncio.run(scenario())
+
+    assert ("CLIENT", "TRACKING", "ON", "REDIRECT", 42) in server.commands
+    assert ("SUBSCRIBE", INVALIDATE_CHANNEL) in server.commands
+    assert first == second == '{"id": 1}'
+    assert gets_before_invalidate == [("GET", "tk")]
+    assert third == '{"id": 2}'
+
+
+def test_client_cache_falls_back_to_pool_when_not_ready():
+    async def scenario():
+        server = FakeServer()
+        server.values["tk"] = "v"
+        cache = RedisClientCache(FakeRedis(server), maxsize=10, ttl=60)
+        value = await cache.get("tk")
+        return server, value
+
+    server, value = asyncio.run(scenario())
+
+    assert value == "v"
+    assert server.pool_gets == ["tk"]
+
+
+def test_client_cache_clears_on_listener_disconnect():
+    async def scenario():
+        server = FakeServer()
+        server.values["tk"] = "v"
+        cache = RedisClientCache(FakeRedis(server), maxsize=10, ttl=60, retry_interval=60)
+        cache.start()
+        await _wait_ready(cache)
+        await cache.get("tk")
+        cached = len(cache)
+
+        server.pushes.put_nowait(ConnectionError("boom"))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        state = (cache.ready, len(cache))
+        await cache.stop()
+        return cached, state
+
+    cached, (ready, size) = asyncio.run(scenario())
+
+    assert cached == 1
+    assert ready is False
+    assert size == 0
+
+
+def test_build_connection_pool_is_bounded():
+    pool = build_connection_pool()
+
+    assert pool.max_connections == rp.project_config.REDIS_MAX_CONNECTIONS
+    assert pool.connection_kwargs["socket_timeout"] == rp.project_config.REDIS_SOCKET_TIMEOUT
+    assert pool.connection_kwargs["health_check_interval"] == rp.project_config.REDIS_HEALTH_CHECK_INTERVAL
+
+
+class FakePipeline:
+    def __init__(self, calls: list):
+        self.calls = calls
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.calls.append(("set", key, value, ex))
+
+    async def execute(self):
+        self.calls.append(("execute",))
+
+
+class FakeBatchRedis:
+    def __init__(self):
+        self.calls: list = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.calls)
+
+    async def mget(self, keys):
+        self.calls.append(("mget", keys))
+        return [None for _ in keys]
+
+
+@pytest.fixture
+def fake_batch_redis(monkeypatch):
+    redis = FakeBatchRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+    return redis
+
+
+def test_batch_helpers_use_single_round_trip(fake_batch_redis):
+    asyncio.run(set_values({"a": 1, "b": 2}, ex=10))
+    values = asyncio.run(get_values(["a", "b"]))
+
+    assert values == [None, None]
+    assert fake_batch_redis.calls == [
+        ("set", "a", 1, 10),
+        ("set", "b", 2, 10),
+        ("execute",),
+        ("mget", ["a", "b"]),
+    ]
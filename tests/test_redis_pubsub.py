@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+
+import pytest
+
+from app.db import redis_pubsub
+from app.db.redis_pubsub import RedisChannelSubscriber
+
+
+class FakePubSub:
+    """空闲时 get_message(timeout=...) 返回 None, 与 redis-py 一致"""
+
+    def __init__(self, messages: list[dict]):
+        self.messages = list(messages)
+        self.subscribe_calls = 0
+        self.timeouts: list[float | None] = []
+
+    async def subscribe(self, channel: str):
+        self.subscribe_calls += 1
+
+    async def get_message(self, timeout=None):
+        self.timeouts.append(timeout)
+        await asyncio.sleep(0)
+        if len(self.timeouts) % 3 == 0 and self.messages:
+            return self.messages.pop(0)
+        return None
+
+    async def listen(self):
+        raise AssertionError("listen() 受 socket_timeout 影响, 不应使用")
+        yield
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self, pubsub: FakePubSub):
+        self._pubsub = pubsub
+
+    def pubsub(self) -> FakePubSub:
+        return self._pubsub
+
+
+def test_idle_subscription_does_not_reconnect(monkeypatch: pytest.MonkeyPatch):
+    pubsub = FakePubSub(
+        [
+            {"type": "subscribe", "data": 1},
+            {"type": "message", "data": json.dumps({"n": 1}).encode()},
+            {"type": "message", "data": json.dumps({"n": 2})},
+        ]
+    )
+
+    async def _get_pool():
+        return FakeRedis(pubsub)
+
+    monkeypatch.setattr(redis_pubsub, "get_redis_pool", _get_pool)
+    received: list[dict] = []
+
+    async def _handler(data: dict):
+        received.append(data)
+
+    async def _run():
+        subscriber = RedisChannelSubscriber("channel", _handler, poll_timeout=0.5)
+        subscriber.start()
+        for _ in range(100):
+            if len(received) == 2:
+                break
+            await asyncio.sleep(0)
+        await subscriber.stop()
+
+    asyncio.run(_run())
+
+    assert received == [{"n": 1}, {"n": 2}]
+    assert pubsub.subscribe_calls == 1
+    assert set(pubsub.timeouts) == {0.5}
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.request_coalescer import RequestCoalescer, coalesce_key
+
+
+def _snapshot(**kwargs) -> dict:
+    snapshot = {
+        "request_id": 1,
+        "dataset_id": None,
+        "env_id": 1,
+        "method": "GET",
+        "url": "http://t/config",
+        "headers": {"X-Env": "staging"},
+        "variables": {},
+    }
+    snapshot.update(kwargs)
+    return snapshot
+
+
+class CountingSend:
+    def __init__(self, delay: float = 0.05, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"response_status_code": 200, "response_headers": {"a": "1"}, "calls": self.calls}
+
+
+def test_key_ignores_request_identity_but_not_wire_fields():
+    base = coalesce_key(_snapshot())
+    assert coalesce_key(_snapshot(request_id=2, dataset_id=9, variables={"x": 1})) == base
+    assert coalesce_key(_snapshot(headers={"X-Env": "prod"})) != base
+    assert coalesce_key(_snapshot(env_id=2)) != base
+    assert coalesce_key(_snapshot(), extra={"max_attempts": 3}) != base
+
+
+def test_concurrent_identical_requests_share_one_call():
+    coalescer = RequestCoalescer(window_ms=0)
+    send = CountingSend()
+
+    async def _run():
+        return await asyncio.gather(*(coalescer.run(_snapshot(request_id=i), send) for i in range(5)))
+
+    results = asyncio.run(_run())
+
+    assert send.calls == 1
+    assert sorted(item["coalesced"] for item in results) == [False, True, True, True, True]
+    # 每个调用方拿到独立副本
+    results[0]["response_headers"]["a"] = "changed"
+    assert results[1]["response_headers"]["a"] == "1"
+
+
+def test_non_idempotent_and_disabled_are_not_coalesced():
+    send = CountingSend(delay=0.01)
+
+    async def _run(coalescer, method):
+        return await asyncio.gather(*(coalescer.run(_snapshot(method=method), send) for _ in range(3)))
+
+    asyncio.run(_run(RequestCoalescer(), "POST"))
+    asyncio.run(_run(RequestCoalescer(enabled=False), "GET"))
+
+    assert send.calls == 6
+
+
+def test_window_reuses_recent_result_then_expires():
+    coalescer = RequestCoalescer(window_ms=50)
+    send = CountingSend(delay=0)
+
+    async def _run():
+        first = await coalescer.run(_snapshot(), send)
+        second = await coalescer.run(_snapshot(), send)
+        await asyncio.sleep(0.08)
+        third = await coalescer.run(_snapshot(), send)
+        return first, second, third
+
+    first, second, third = asyncio.run(_run())
+
+    assert (first["coalesced"], second["coalesced"], third["coalesced"]) == (False, True, False)
+    assert send.calls == 2
+
+
+def test_waiters_send_themselves_when_leader_fails():
+    coalescer = RequestCoalescer(window_ms=0)
+    failing = CountingSend(error=RuntimeError("boom"))
+    fallback = CountingSend(delay=0)
+
+    async def _run():
+        leader = asyncio.create_task(coalescer.run(_snapshot(), failing))
+        await asyncio.sleep(0)
+        follower = await coalescer.run(_snapshot(), fallback)
+        with pytest.raises(RuntimeError):
+            await leader
+        return follower
+
+    follower = asyncio.run(_run())
+
+    assert follower["coalesced"] is False
+    assert fallback.calls == 1
+
+
+def test_shares_across_event_loops():
+    coalescer = RequestCoalescer(window_ms=0)
+    send = CountingSend(delay=0.1)
+    results: list[dict] = []
+
+    def _worker():
+        results.append(asyncio.run(coalescer.run(_snapshot(), send)))
+
+    threads = [threading.Thread(target=_worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert send.calls == 1
+    assert sorted(item["coalesced"] for item in results) == [False, True, True]
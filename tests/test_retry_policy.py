@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.api_request import ApiRetryPolicy
+from app.services import api_request_executor
+from app.services.retry_policy import LatencyTracker, RetryPolicy, execute_with_retry, resolve_retry_policy
+
+
+def _response(status_code: int, elapsed_ms: int = 1) -> dict:
+    return {
+        "is_success": 200 <= status_code < 300,
+        "response_status_code": status_code,
+        "response_time_ms": elapsed_ms,
+        "error_message": None,
+    }
+
+
+def _error(exc: Exception) -> dict:
+    return {
+        "is_success": False,
+        "response_status_code": None,
+        "response_time_ms": 0,
+        "error_message": str(exc),
+        "error_type": type(exc).__name__,
+    }
+
+
+class FakeSend:
+    """依次返回预设结果, 可选每次调用的延迟(秒)"""
+
+    def __init__(self, results: list[dict], delays: list[float] | None = None):
+        self.results = list(results)
+        self.delays = list(delays or [])
+        self.snapshots: list[dict] = []
+
+    async def __call__(self, snapshot: dict) -> dict:
+        index = len(self.snapshots)
+        self.snapshots.append(snapshot)
+        if index < len(self.delays):
+            await asyncio.sleep(self.delays[index])
+        return self.results[index]
+
+
+def _policy(**kwargs) -> RetryPolicy:
+    options = {"max_attempts": 3, "backoff_ms": 1, "jitter": False}
+    options.update(kwargs)
+    return RetryPolicy(**options)
+
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(backoff_ms=100, backoff_multiplier=2, max_backoff_ms=300, jitter=False)
+    assert [policy.backoff_for(n) for n in (1, 2, 3)] == [100, 200, 300]
+
+    jittered = RetryPolicy(backoff_ms=100, max_backoff_ms=300)
+    assert all(0 <= jittered.backoff_for(3) <= 300 for _ in range(20))
+
+
+def test_retries_retryable_status_until_success():
+    send = FakeSend([_response(502), _response(503), _response(200)])
+
+    result = asyncio.run(execute_with_retry({"method": "POST", "url": "http://t/x"}, _policy(), send))
+
+    assert result["response_status_code"] == 200
+    assert [item["status"] for item in result["attempts"]] == [502, 503, 200]
+    assert result["attempts"][0]["backoff_ms"] == 1
+
+
+def test_retries_matching_exception_including_subclasses():
+    send = FakeSend([_error(httpx.ConnectTimeout("timeout")), _error(httpx.ConnectError("refused"))])
+
+    result = asyncio.run(
+        execute_with_retry({"url": "http://t/x"}, _policy(max_attempts=2, retry_exceptions=["TransportError"]), send)
+    )
+
+    assert [item["error"] for item in result["attempts"]] == ["ConnectTimeout", "ConnectError"]
+    assert result["error_message"] == "refused (共尝试 2 次)"
+
+
+def test_non_retryable_result_is_returned_immediately():
+    send = FakeSend([_response(404), _error(ValueError("bad"))])
+
+    result = asyncio.run(execute_with_retry({"url": "http://t/x"}, _policy(), send))
+    assert result["attempts"] == [{"n": 1, "status": 404, "ms": 1}]
+
+    send = FakeSend([_error(httpx.ReadTimeout("slow"))])
+    result = asyncio.run(execute_with_retry({"url": "http://t/x"}, _policy(), send))
+    assert len(result["attempts"]) == 1
+
+
+def test_deadline_limits_backoff_and_attempt_timeout():
+    send = FakeSend([_response(503), _response(503), _response(200)])
+    policy = _policy(backoff_ms=40, deadline_ms=60)
+
+    started_at = time.monotonic()
+    result = asyncio.run(execute_with_retry({"url": "http://t/x", "timeout_ms": 30000}, policy, send))
+
+    assert time.monotonic() - started_at < 0.2
+    assert [item["status"] for item in result["attempts"]] == [503, 503]
+    assert result["attempts"][-1]["stop"] == "deadline"
+    # 每次尝试的超时不超过剩余时间
+    assert all(snapshot["timeout_ms"] <= 60 for snapshot in send.snapshots)
+
+
+def test_hedged_get_takes_first_response():
+    send = FakeSend([_response(200, 500), _response(200, 5)], delays=[0.5, 0.005])
+
+    started_at = time.monotonic()
+    result = asyncio.run(
+        execute_with_retry({"method": "GET", "url": "http://t/x"}, _policy(hedge=True, hedge_delay_ms=20), send)
+    )
+
+    assert time.monotonic() - started_at < 0.3
+    assert result["response_time_ms"] == 5
+    assert result["attempts"] == [{"n": 1, "status": 200, "ms": 5, "hedged": True, "winner": "hedge"}]
+
+
+def test_hedge_skips_non_idempotent_methods():
+    send = FakeSend([_response(200)], delays=[0.05])
+
+    result = asyncio.run(
+        execute_with_retry({"method": "POST", "url": "http://t/x"}, _policy(hedge=True, hedge_delay_ms=1), send)
+    )
+
+    assert len(send.snapshots) == 1
+    assert "hedged" not in result["attempts"][0]
+
+
+def test_latency_tracker_p95_requires_min_samples():
+    tracker = LatencyTracker(window=100, min_samples=20)
+    for elapsed_ms in range(1, 20):
+        tracker.record("http://t:8080/x", elapsed_ms)
+    assert tracker.p95("http://t:8080/y") is None
+
+    tracker.record("http://t:8080/x", 20)
+    assert tracker.p95("http://t:8080/y") == 20
+    assert tracker.p95("http://other/y") is None
+
+
+def test_case_policy_overrides_request_policy():
+    assert resolve_retry_policy(None, None) is None
+
+    policy = resolve_retry_policy(
+        {"max_attempts": 3, "retry_status_codes": [503], "hedge": True},
+        {"max_attempts": 1, "hedge": None},
+    )
+
+    assert (policy.max_attempts, policy.retry_status_codes, policy.hedge) == (1, [503], True)
+
+
+def test_schema_rejects_unknown_exception_names():
+    assert ApiRetryPolicy(retry_exceptions=["ReadTimeout"]).model_dump(exclude_unset=True) == {
+        "retry_exceptions": ["ReadTimeout"]
+    }
+    with pytest.raises(ValidationError):
+        ApiRetryPolicy(retry_exceptions=["NotAnError"])
+
+
+def test_execute_api_request_records_attempts(monkeypatch: pytest.MonkeyPatch):
+    send = FakeSend([_response(503), _response(200)])
+
+    async def _fake_execute(snapshot, host_cap=None, rate_limit_rps=None):
+        return {**await send(snapshot), "response_headers": {}, "response_body": None, "phase_timings": None}
+
+    monkeypatch.setattr(api_request_executor, "_execute_http_request", _fake_execute)
+    request_obj = SimpleNamespace(
+        id=1,
+        env_id=None,
+        method="GET",
+        url="http://t/x",
+        base_query_params={},
+        base_headers={},
+        base_cookies={},
+        base_body_data={},
+        base_body_raw=None,
+        body_type="none",
+        timeout_ms=1000,
+        follow_redirects=True,
+        verify_ssl=True,
+        proxy_url=None,
+        retry_policy={"max_attempts": 1},
+        coalesce_enabled=False,
+    )
+
+    result = asyncio.run(
+        api_request_executor.execute_api_request(
+            request_obj, retry_policy_override={"max_attempts": 2, "backoff_ms": 1}
+        )
+    )
+
+    assert result["response_status_code"] == 200
+    assert [item["status"] for item in result["attempts"]] == [503, 200]
+    assert "error_type" not in result
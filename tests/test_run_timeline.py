@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from app.services import run_timeline as run_timeline_module
+from app.services.run_timeline import RunTimeline
+
+
+def test_span_records_offsets_and_extra_args(monkeypatch):
+    clock = iter([100.0, 100.010, 100.050])
+    monkeypatch.setattr(run_timeline_module.time, "perf_counter", lambda: next(clock))
+
+    timeline = RunTimeline()
+    with timeline.span("request", "http", request_id=1) as span_args:
+        span_args["status_code"] = 200
+
+    assert timeline.spans == [
+        {"name": "request", "cat": "http", "start_ms": 10.0, "dur_ms": 40.0, "args": {"request_id": 1, "status_code": 200}}
+    ]
+
+
+def test_phase_spans_are_laid_out_sequentially():
+    timeline = RunTimeline()
+    timeline.add_phase_spans(10.0, {"setup": 1.0, "connect": 2.0, "ttfb": 30.0, "download": 0, "total": 40.0})
+
+    assert [(item["name"], item["start_ms"], item["dur_ms"]) for item in timeline.spans] == [
+        ("setup", 10.0, 1.0),
+        ("connect", 11.0, 2.0),
+        ("ttfb", 13.0, 30.0),
+    ]
+
+
+def test_span_limit_counts_dropped():
+    timeline = RunTimeline(max_spans=1)
+    timeline.add("a", "db", 0, 1)
+    timeline.add("b", "db", 1, 1)
+
+    assert timeline.to_dict() == {"spans": [{"name": "a", "cat": "db", "start_ms": 0, "dur_ms": 1}], "dropped": 1}
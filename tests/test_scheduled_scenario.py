@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+import pytz
+from apscheduler.triggers.cron import CronTrigger
+
+from app.models.api_request import TestScenario, TestScenarioRun
+from app.tasks import tasks as tasks_module
+from app.tasks.scheduler import StableJitterTrigger, TaskHandler, stable_jitter_seconds
+
+
+class _FakeScalarResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def first(self):
+        return self._items[0] if self._items else None
+
+    def all(self):
+        return self._items
+
+
+class _FakeExecuteResult:
+    def __init__(self, items: list[Any]):
+        self._items = items
+
+    def scalars(self):
+        return _FakeScalarResult(self._items)
+
+    def scalar_one(self):
+        return self._items[0]
+
+
+class FakeDBSession:
+    def __init__(self):
+        self.added: list[Any] = []
+        self.commits = 0
+        self.execute_queue: list[_FakeExecuteResult] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def add(self, obj: Any):
+        if getattr(obj, "id", None) is None:
+            obj.id = 100 + len(self.added)
+        self.added.append(obj)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def refresh(self, obj: Any):
+        return None
+
+    async def execute(self, stmt):
+        return self.execute_queue.pop(0)
+
+    def queue_execute_result(self, items: list[Any]):
+        self.execute_queue.append(_FakeExecuteResult(items))
+
+
+def _build_scenario(scenario_id: int = 1) -> TestScenario:
+    obj = TestScenario(name="nightly", env_id=None, run_mode="sequence", stop_on_fail=True, sort=0, is_deleted=0)
+    obj.id = scenario_id
+    return obj
+
+
+def _patch_session(monkeypatch, db: FakeDBSession, dispatched: list[int]):
+    monkeypatch.setattr(tasks_module, "AsyncSessionLocal", lambda: db)
+
+    def fake_dispatch(scenario_run_id: int):
+        dispatched.append(scenario_run_id)
+        return "celery-task-id"
+
+    monkeypatch.setattr(tasks_module, "dispatch_scenario_run_task", fake_dispatch)
+
+
+def test_run_scenario_creates_schedule_run_and_dispatches(monkeypatch):
+    db = FakeDBSession()
+    db.queue_execute_result([_build_scenario()])
+    db.queue_execute_result([0])
+    dispatched: list[int] = []
+    _patch_session(monkeypatch, db, dispatched)
+
+    scenario_run_id = asyncio.run(tasks_module.run_scenario(1, initial_variables={"k": "v"}))
+
+    run_obj = db.added[0]
+    assert isinstance(run_obj, TestScenarioRun)
+    assert run_obj.trigger_type == "schedule"
+    assert run_obj.run_status == "queued"
+    assert run_obj.runtime_variables == {"k": "v"}
+    assert scenario_run_id == run_obj.id
+    assert dispatched == [run_obj.id]
+
+
+def test_run_scenario_skips_when_max_concurrent_runs_reached(monkeypatch):
+    db = FakeDBSession()
+    db.queue_execute_result([_build_scenario()])
+    db.queue_execute_result([2])
+    dispatched: list[int] = []
+    _patch_session(monkeypatch, db, dispatched)
+
+    scenario_run_id = asyncio.run(tasks_module.run_scenario(1, max_concurrent_runs=2))
+
+    assert scenario_run_id is None
+    assert db.added == []
+    assert dispatched == []
+
+
+class _LockingDatabase:
+    """模拟数据库行锁: FOR UPDATE 查询场景时加锁, 提交或关闭会话时释放"""
+
+    def __init__(self, scenario: TestScenario):
+        self.scenario = scenario
+        self.runs: list[TestScenarioRun] = []
+        self.row_lock = asyncio.Lock()
+
+    def session(self) -> "_LockingSession":
+        return _LockingSession(self)
+
+
+class _LockingSession:
+    def __init__(self, database: _LockingDatabase):
+        self.database = database
+        self.pending: list[Any] = []
+        self.executed = 0
+        self.locked = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self._release()
+        return False
+
+    def _release(self):
+        if self.locked:
+            self.locked = False
+            self.database.row_lock.release()
+
+    async def execute(self, stmt):
+        self.executed += 1
+        if self.executed == 1:
+            if stmt._for_update_arg is not None:
+                await self.database.row_lock.acquire()
+                self.locked = True
+            return _FakeExecuteResult([self.database.scenario])
+        count = len(self.database.runs)
+        await asyncio.sleep(0.01)  # 计数与新增之间让出事件循环, 放大竞争窗口
+        return _FakeExecuteResult([count])
+
+    def add(self, obj: Any):
+        obj.id = 200 + len(self.database.runs) + len(self.pending)
+        self.pending.append(obj)
+
+    async def commit(self):
+        self.database.runs.extend(self.pending)
+        self.pending = []
+        self._release()
+
+    async def refresh(self, obj: Any):
+        return None
+
+
+def test_run_scenario_limit_holds_under_concurrent_triggers(monkeypatch):
+    database = _LockingDatabase(_build_scenario())
+    dispatched: list[int] = []
+    monkeypatch.setattr(tasks_module, "AsyncSessionLocal", database.session)
+    monkeypatch.setattr(tasks_module, "dispatch_scenario_run_task", lambda run_id: dispatched.append(run_id) or "t")
+
+    async def _run():
+        return await asyncio.gather(*(tasks_module.run_scenario(1, max_concurrent_runs=1) for _ in range(3)))
+
+    results = asyncio.run(_run())
+
+    assert len(database.runs) == 1
+    assert [item for item in results if item is not None] == [database.runs[0].id]
+    assert dispatched == [database.runs[0].id]
+
+
+def test_stable_jitter_is_deterministic_and_bounded():
+    offsets = {stable_jitter_seconds(f"scenario_{i}", 60) for i in range(200)}
+    assert stable_jitter_seconds("scenario_1", 60) == stable_jitter_seconds("scenario_1", 60)
+    assert all(0 <= item <= 60 for item in offsets)
+    assert len(offsets) > 1
+    assert stable_jitter_seconds("scenario_1", 0) == 0
+
+
+def test_stable_jitter_trigger_shifts_fire_time():
+    tz = pytz.timezone("Asia/Shanghai")
+    trigger = StableJitterTrigger(CronTrigger.from_crontab("0 2 * * *", timezone=tz), 30)
+    now = tz.localize(datetime(2026, 10, 19, 1, 0, 0))
+
+    first = trigger.get_next_fire_time(None, now)
+    second = trigger.get_next_fire_time(first, first)
+
+    assert first == tz.localize(datetime(2026, 10, 19, 2, 0, 30))
+    assert second - first == timedelta(days=1)
+
+
+def test_task_handler_wraps_cron_trigger_with_jitter():
+    handler = TaskHandler(
+        task_id="nightly_scenario_1",
+        trigger_type="cron",
+        cron_expression="0 2 * * *",
+        task_function_name="run_scenario",
+        jitter=120,
+    )
+    trigger = handler.get_trigger()
+    assert handler.trigger_param == {"cron_expression": "0 2 * * *", "jitter": 120}
+    if stable_jitter_seconds("nightly_scenario_1", 120):
+        assert isinstance(trigger, StableJitterTrigger)
+
+
+def test_scheduler_init_skips_broken_tasks(monkeypatch):
+    from app.models.aps_task import ApsTask
+    from app.tasks import scheduler as scheduler_module
+
+    def _task(task_id: str, **kwargs) -> ApsTask:
+        options = {
+            "task_id": task_id,
+            "trigger_type": "interval",
+            "trigger_param": {"interval_kw": {"minutes": 5}},
+            "task_function_name": "run_scenario",
+            "task_function_args": [],
+            "task_function_kwargs": {},
+            "is_deleted": 0,
+        }
+        options.update(kwargs)
+        return ApsTask(**options)
+
+    db = FakeDBSession()
+    db.queue_execute_result(
+        [
+            _task("removed_function", task_function_name="no_such_task"),
+            _task("bad_cron", trigger_type="cron", trigger_param={"cron_expression": "not a cron"}),
+            _task("nightly"),
+        ]
+    )
+    added: list[str] = []
+    started: list[bool] = []
+    monkeypatch.setattr(scheduler_module, "AsyncSessionLocal", lambda: db)
+    monkeypatch.setattr(scheduler_module.scheduler, "add_job", lambda func, **kwargs: added.append(kwargs["id"]))
+    monkeypatch.setattr(scheduler_module.scheduler, "start", lambda: started.append(True))
+
+    asyncio.run(scheduler_module.scheduler_init())
+
+    assert added == ["nightly"]
+    assert started == [True]
+
+
+def test_get_task_function_only_resolves_registered_tasks():
+    assert TaskHandler(task_id="t", trigger_type="cron", task_function_name="run_scenario").get_task_function() is (
+        tasks_module.run_scenario
+    )
+    # 模块中的其他属性(导入的对象等)不能被调度
+    with pytest.raises(AttributeError):
+        TaskHandler(task_id="t", trigger_type="cron", task_function_name="AsyncSessionLocal").get_task_function()
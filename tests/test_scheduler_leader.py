@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import app.db.redis_client as redis_module
+from app.tasks import scheduler_leader as leader_module
+from app.tasks.scheduler_leader import SchedulerLeaderElector, build_job_fire_token, claim_job_fire_token
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store: dict[str, str] = {}
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        return True
+
+    async def eval(self, script, numkeys, key, instance_id, *args):
+        if self.store.get(key) != instance_id:
+            return 0
+        if script == leader_module.RELEASE_LEASE_SCRIPT:
+            self.store.pop(key)
+        return 1
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_module, "redis_pool", redis)
+    return redis
+
+
+def _build_elector(instance_id: str, events: list[str]) -> SchedulerLeaderElector:
+    async def on_elected():
+        events.append(f"{instance_id}:elected")
+
+    async def on_revoked():
+        events.append(f"{instance_id}:revoked")
+
+    return SchedulerLeaderElector(
+        on_elected=on_elected,
+        on_revoked=on_revoked,
+        key="ut:scheduler:leader",
+        lease_ttl=15,
+        renew_interval=5,
+        instance_id=instance_id,
+    )
+
+
+def test_only_one_instance_becomes_leader(fake_redis):
+    events: list[str] = []
+    first = _build_elector("a", events)
+    second = _build_elector("b", events)
+
+    asyncio.run(first.tick())
+    asyncio.run(second.tick())
+
+    assert first.is_leader is True
+    assert second.is_leader is False
+    assert events == ["a:elected"]
+
+
+def test_follower_takes_over_after_lease_lost(fake_redis):
+    events: list[str] = []
+    first = _build_elector("a", events)
+    second = _build_elector("b", events)
+    asyncio.run(first.tick())
+
+    # 模拟 leader 租约过期后被 follower 抢占
+    fake_redis.store.pop("ut:scheduler:leader")
+    asyncio.run(second.tick())
+    asyncio.run(first.tick())
+
+    assert second.is_leader is True
+    assert first.is_leader is False
+    assert events == ["a:elected", "b:elected", "a:revoked"]
+
+
+def test_stop_releases_lease(fake_redis):
+    events: list[str] = []
+    first = _build_elector("a", events)
+    asyncio.run(first.tick())
+    asyncio.run(first.stop())
+
+    assert "ut:scheduler:leader" not in fake_redis.store
+    assert events == ["a:elected", "a:revoked"]
+
+
+def test_job_fire_token_claimed_once(fake_redis):
+    run_time = datetime(2026, 10, 19, 2, 0, 0)
+    assert asyncio.run(claim_job_fire_token("nightly", run_time)) is True
+    assert asyncio.run(claim_job_fire_token("nightly", run_time)) is False
+    assert build_job_fire_token("nightly", run_time) in fake_redis.store
@@ -452,8 +452,9 @@ def test_run_scenario_enqueue_success(
     scenario_obj = _build_scenario(id=20)
     called = {"run_id": None, "task_id": None}
 
-    async def _fake_get_scenario(db, scenario_id: int):
+    async def _fake_get_scenario(db, scenario_id: int, for_update: bool = False):
         assert scenario_id == 20
+        assert for_update is True  # 新增运行记录前锁定场景行
         return scenario_obj
 
     def _fake_dispatch(run_id: int):
@@ -499,6 +500,55 @@ def test_scenario_run_detail_success(monkeypatch: pytest.MonkeyPatch, client: Te
     assert body["data"]["total_request_runs"] == 3
 
 
+def test_scenario_run_trace_export(monkeypatch: pytest.MonkeyPatch, client: TestClient):
+    run_obj = _build_scenario_run(
+        id=93,
+        timeline={
+            "spans": [
+                {"name": "step 1", "cat": "step", "start_ms": 1.5, "dur_ms": 120.0, "args": {"scenario_case_id": 1}},
+                {"name": "request", "cat": "http", "start_ms": 2.0, "dur_ms": 100.25},
+            ],
+            "dropped": 0,
+        },
+    )
+
+    async def _fake_get_scenario_run(db, scenario_run_id: int):
+        return run_obj
+
+    monkeypatch.setattr(scenario_router, "_get_scenario_run_or_404", _fake_get_scenario_run)
+
+    resp = client.get("/api/scenario/run/93/trace")
+    body = resp.json()
+
+    assert resp.status_code == 200
+    assert "scenario_run_93.trace.json" in resp.headers["content-disposition"]
+    complete_events = [item for item in body["traceEvents"] if item["ph"] == "X"]
+    assert complete_events[0] == {
+        "name": "step 1",
+        "cat": "step",
+        "ph": "X",
+        "ts": 1500.0,
+        "dur": 120000.0,
+        "pid": 1,
+        "tid": 1,
+        "args": {"scenario_case_id": 1},
+    }
+    assert complete_events[1]["dur"] == 100250.0
+
+
+def test_scenario_run_trace_export_without_timeline(monkeypatch: pytest.MonkeyPatch, client: TestClient):
+    run_obj = _build_scenario_run(id=95)
+
+    async def _fake_get_scenario_run(db, scenario_run_id: int):
+        return run_obj
+
+    monkeypatch.setattr(scenario_router, "_get_scenario_run_or_404", _fake_get_scenario_run)
+
+    resp = client.get("/api/scenario/run/95/trace")
+
+    assert resp.json()["code"] == 10002
+
+
 def test_scenario_run_report_success(monkeypatch: pytest.MonkeyPatch, client: TestClient):
     scenario_run_obj = _build_scenario_run(id=94, scenario_id=24, run_status="failed", is_success=False)
     scenario_obj = _build_scenario(id=24, name="scenario-report")
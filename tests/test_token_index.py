@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+
+import pytest
+
+import app.db.redis_client as rp
+from app.api.v1.routers import admin as admin_router
+from app.core import auth_cache as auth_cache_module
+from app.core import security as security_module
+from app.core.security import (
+    MIGRATE_TOKEN_INDEX_SCRIPT,
+    REVOKE_USER_TOKENS_SCRIPT,
+    TOKEN_INDEX_MIGRATED_KEY,
+    Token,
+    build_token_index_key,
+    build_token_key_prefix,
+    migrate_legacy_token_index,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.commands: list[tuple] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return _queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(getattr(self.redis, f"_{name}")(*args, **kwargs))
+        self.commands.clear()
+        return results
+
+
+class FakeRedis:
+    """仅实现 Token 用到的命令, 不支持 KEYS"""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.round_trips = 0
+        self.scan_error: Exception | None = None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def keys(self, pattern=None):
+        raise AssertionError("KEYS must not be used")
+
+    async def get(self, key):
+        self.round_trips += 1
+        return self._get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self.round_trips += 1
+        if nx and key in self.values:
+            return None
+        return self._set(key, value, ex=ex)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        self.round_trips += 1
+        return self._eval(script, numkeys, *keys_and_args)
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        return self._delete(*keys)
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.values):
+            if self.scan_error is not None:
+                raise self.scan_error
+            if key.startswith(prefix):
+                yield key.encode()
+
+    def _eval(self, script, numkeys, *keys_and_args):
+        if script == MIGRATE_TOKEN_INDEX_SCRIPT:
+            index_key, token, expire_at, ttl = keys_and_args
+            self._zadd(index_key, {token: expire_at})
+            if self.ttls.get(index_key, -1) < ttl:
+                self.ttls[index_key] = ttl
+            return 1
+        assert script == REVOKE_USER_TOKENS_SCRIPT
+        index_key, prefix = keys_and_args
+        tokens = list(self.zsets.get(index_key, {}))
+        for token in tokens:
+            self._delete(token, f"{prefix}{token}")
+        self._delete(index_key)
+        return [token.encode() for token in tokens]
+
+    def _get(self, key):
+        return self.values.get(key)
+
+    def _set(self, key, value, ex=None):
+        self.values[key] = value
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def _ttl(self, key):
+        return self.ttls.get(key, -1) if key in self.values else -2
+
+    def _delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.zsets.pop(key, None)
+            self.ttls.pop(key, None)
+        return len(keys)
+
+    def _zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def _zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+        return len(members)
+
+    def _zremrangebyscore(self, key, min_score, max_score):
+        zset = self.zsets.get(key, {})
+        expired = [member for member, score in zset.items() if score <= max_score]
+        for member in expired:
+            zset.pop(member)
+        return len(expired)
+
+    def _expire(self, key, ttl):
+        self.ttls[key] = ttl
+        return True
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(rp, "redis_pool", redis)
+
+    async def fake_get_value(key):
+        return redis.values.get(key)
+
+    async def fake_publish(channel, data):
+        return 1
+
+    monkeypatch.setattr(security_module, "get_value", fake_get_value)
+    monkeypatch.setattr(auth_cache_module, "publish_message", fake_publish)
+    return redis
+
+
+def _user_info() -> str:
+    return json.dumps({"id": 1, "username": "tester"})
+
+
+def test_single_login_revokes_previous_tokens_without_keys(fake_redis):
+    key = build_token_key_prefix(1, "tester")
+
+    async def login_twice():
+        first, second = Token(), Token()
+        await first.many_login(key, _user_info())
+        await first.many_login(key, _user_info())
+        await second.single_login(key, _user_info())
+        return second.token
+
+    token = asyncio.run(login_twice())
+
+    assert list(fake_redis.zsets[build_token_index_key(key)]) == [token]
+    assert set(fake_redis.values) == {token, f"{key}{token}"}
+
+
+def test_save_token_is_single_round_trip_and_prunes_expired(fake_redis):
+    key = build_token_key_prefix(1, "tester")
+    index_key = build_token_index_key(key)
+    fake_redis.zsets[index_key] = {"expired": 1}
+
+    auth = Token()
+    asyncio.run(auth.many_login(key, _user_info()))
+
+    assert fake_redis.round_trips == 1
+    assert list(fake_redis.zsets[index_key]) == [auth.token]
+    assert fake_redis.ttls[index_key] == auth.timeout
+
+
+def test_revoke_single_token_removes_index_member(fake_redis):
+    key = build_token_key_prefix(1, "tester")
+
+    async def login_and_logout():
+        auth, other = Token(), Token()
+        await auth.many_login(key, _user_info())
+        await other.many_login(key, _user_info())
+        await Token.revoke(auth.token)
+        return auth.token, other.token
+
+    revoked, kept = asyncio.run(login_and_logout())
+
+    assert revoked not in fake_redis.values
+    assert f"{key}{revoked}" not in fake_redis.values
+    assert list(fake_redis.zsets[build_token_index_key(key)]) == [kept]
+
+
+def test_migrate_legacy_token_index_runs_once(fake_redis):
+    key = build_token_key_prefix(2, "legacy_user")
+    fake_redis._set(f"{key}abc_-123", "abc_-123", ex=100)
+    fake_redis._set("abc_-123", _user_info(), ex=100)
+
+    first = asyncio.run(migrate_legacy_token_index())
+    second = asyncio.run(migrate_legacy_token_index())
+
+    assert first == 1
+    assert second == 0
+    assert list(fake_redis.zsets[build_token_index_key(key)]) == ["abc_-123"]
+    assert fake_redis.ttls[build_token_index_key(key)] == 100
+
+
+def test_migrate_keeps_longest_ttl(fake_redis):
+    key = build_token_key_prefix(3, "multi")
+    for token, ttl in (("short", 50), ("long", 300), ("mid", 100)):
+        fake_redis._set(f"{key}{token}", token, ex=ttl)
+
+    assert asyncio.run(migrate_legacy_token_index()) == 3
+    assert fake_redis.ttls[build_token_index_key(key)] == 300
+
+
+def test_failed_migration_is_retried(fake_redis):
+    key = build_token_key_prefix(2, "legacy_user")
+    fake_redis._set(f"{key}abc", "abc", ex=100)
+    fake_redis.scan_error = ConnectionError("redis down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(migrate_legacy_token_index())
+    assert TOKEN_INDEX_MIGRATED_KEY not in fake_redis.values
+
+    fake_redis.scan_error = None
+    assert asyncio.run(migrate_legacy_token_index()) == 1
+    assert TOKEN_INDEX_MIGRATED_KEY in fake_redis.values
+
+
+class _FakeScalars:
+    def __init__(self, item):
+        self.item = item
+
+    def first(self):
+        return self.item
+
+
+class _FakeResult:
+    def __init__(self, item):
+        self.item = item
+
+    def scalars(self):
+        return _FakeScalars(self.item)
+
+
+class FakeDBSession:
+    def __init__(self, item):
+        self.item = item
+
+    async def execute(self, stmt):
+        return _FakeResult(self.item)
+
+    async def commit(self):
+        pass
+
+
+class FakeAdmin:
+    def __init__(self, admin_id: int, username: str):
+        self.id = admin_id
+        self.username = username
+
+    async def set_password(self, raw_password: str):
+        self.password = raw_password
+
+    def touch(self):
+        pass
+
+
+def test_reset_password_revokes_target_user_tokens(fake_redis, monkeypatch):
+    target_key = build_token_key_prefix(5, "target")
+    operator_key = build_token_key_prefix(1, "operator")
+
+    async def _noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(admin_router, "invalidate_admin", _noop)
+
+    async def _run():
+        target, operator = Token(), Token()
+        await target.many_login(target_key, json.dumps({"id": 5, "username": "target"}))
+        await operator.many_login(operator_key, json.dumps({"id": 1, "username": "operator"}))
+        request_data = admin_router.ResetPasswordReqData(user_id=5, new_password="Aa1!aaaa", raw_password="Aa1!aaaa")
+        await admin_router.reset_password(request_data, token=operator.token, db=FakeDBSession(FakeAdmin(5, "target")))
+        return target.token, operator.token
+
+    target_token, operator_token = asyncio.run(_run())
+
+    assert target_token not in fake_redis.values
+    assert build_token_index_key(target_key) not in fake_redis.zsets
+    assert operator_token in fake_redis.values